@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Batch Evaluator - Replay many recorded answer sequences through a decision tree at once.
+
+Each sequence is a vector of answer indices (0-based, one per question asked),
+padded with PADDING when sequences have different lengths. All sequences
+advance together one step at a time using NumPy arrays built from the tree's
+CSR answer tables, following the same rules as NavigationSession.select_answer:
+
+- a sequence stops when it reaches a result node or runs out of answers
+- an answer index outside the current node's answers (including a negative
+  one), or one that leads to an undefined node, is an invalid step and stops
+  the sequence
+
+Requires NumPy (``pip install numpy``).
+"""
+import os
+import sys
+import csv
+import argparse
+from collections import Counter
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from decision_tree import DecisionTree, FLAG_DEFINED, FLAG_RESULT
+from compiled_tree import load_tree
+
+# Sequences evaluated per chunk when reading from a file
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Marks the steps after the end of a shorter sequence. It is kept apart from
+# negative answers, which are invalid steps rather than the end of a sequence.
+PADDING = np.iinfo(np.int64).min
+
+# Padding value of NPY answer files, in the file's own numbering
+FILE_PADDING = -1
+
+
+class TransitionTable(NamedTuple):
+    """NumPy copy of a tree's transition structure."""
+    answer_starts: np.ndarray   # int64[node_count], first answer position of each node
+    answer_counts: np.ndarray   # int64[node_count], number of answers of each node
+    answer_targets: np.ndarray  # int64[answer_count], target node, -1 if undefined
+    is_result: np.ndarray       # bool[node_count]
+    start: int                  # Node index of the start node
+
+
+class BatchResult(NamedTuple):
+    """Outcome of every sequence in a batch."""
+    final_nodes: np.ndarray    # int64[n], node index where each sequence stopped
+    depths: np.ndarray         # int64[n], number of answers applied
+    invalid_steps: np.ndarray  # int64[n], position of the first invalid answer, -1 if none
+
+
+def compile_transitions(tree: DecisionTree) -> TransitionTable:
+    """
+    Build the NumPy transition table of a tree.
+
+    Args:
+        tree: The decision tree
+
+    Returns:
+        The transition table
+
+    Raises:
+        ValueError: If the tree has no start node
+    """
+    if tree.start_node_id is None:
+        raise ValueError("Decision tree has no start node")
+
+    flags = np.frombuffer(bytes(tree.node_flags), dtype=np.uint8)
+    targets = np.frombuffer(tree.answer_targets, dtype=np.uint32).astype(np.int64)
+    defined = (flags & FLAG_DEFINED) != 0
+    if targets.size:
+        targets[~defined[targets]] = -1
+
+    return TransitionTable(
+        answer_starts=np.frombuffer(tree.answer_starts, dtype=np.uint32).astype(np.int64),
+        answer_counts=np.frombuffer(tree.answer_counts, dtype=np.uint32).astype(np.int64),
+        answer_targets=targets,
+        is_result=(flags & FLAG_RESULT) != 0,
+        start=tree.index_of(tree.start_node_id)
+    )
+
+
+def evaluate(table: TransitionTable, answers: np.ndarray) -> BatchResult:
+    """
+    Advance a batch of answer sequences through the tree.
+
+    Args:
+        table: Transition table from compile_transitions
+        answers: Integer array of shape (sequences, steps), padded with PADDING
+
+    Returns:
+        The final node, depth and first invalid step of every sequence
+    """
+    answers = np.asarray(answers, dtype=np.int64)
+    if answers.ndim != 2:
+        raise ValueError(f"Expected a 2-D array of answers, got shape {answers.shape}")
+
+    count, steps = answers.shape
+    final_nodes = np.full(count, table.start, dtype=np.int64)
+    depths = np.zeros(count, dtype=np.int64)
+    invalid_steps = np.full(count, -1, dtype=np.int64)
+
+    # Indices of the sequences that are still moving
+    active = np.arange(count)
+    if table.is_result[table.start]:
+        active = active[:0]
+
+    for step in range(steps):
+        if not active.size:
+            break
+
+        choice = answers[active, step]
+        active = active[choice != PADDING]
+        choice = choice[choice != PADDING]
+
+        current = final_nodes[active]
+        in_range = (choice >= 0) & (choice < table.answer_counts[current])
+        next_nodes = np.full(active.size, -1, dtype=np.int64)
+        next_nodes[in_range] = table.answer_targets[table.answer_starts[current[in_range]] + choice[in_range]]
+
+        valid = next_nodes >= 0
+        invalid_steps[active[~valid]] = step
+
+        active = active[valid]
+        next_nodes = next_nodes[valid]
+        final_nodes[active] = next_nodes
+        depths[active] += 1
+        active = active[~table.is_result[next_nodes]]
+
+    return BatchResult(final_nodes, depths, invalid_steps)
+
+
+def read_answer_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       one_based: bool = False) -> Iterator[np.ndarray]:
+    """
+    Read answer sequences from a CSV or NPY file in chunks.
+
+    CSV files have one sequence per row; rows may have different lengths and
+    empty cells are treated as padding, so the sequence ends at the first one. NPY files hold a 2-D integer array
+    padded with FILE_PADDING. Numbers below the first answer number are kept
+    as negative indices, so they are reported as invalid steps.
+
+    Args:
+        file_path: Path to a .csv or .npy file
+        chunk_size: Maximum number of sequences per chunk
+        one_based: Whether answer numbers start at 1 (as typed in the terminal)
+
+    Yields:
+        Integer arrays of shape (sequences, steps), padded with PADDING
+    """
+    offset = 1 if one_based else 0
+
+    if file_path.endswith(".npy"):
+        data = np.load(file_path, mmap_mode="r")
+        for start in range(0, len(data), chunk_size):
+            chunk = np.array(data[start:start + chunk_size], dtype=np.int64)
+            padding = chunk == FILE_PADDING
+            chunk -= offset
+            chunk[padding] = PADDING
+            yield chunk
+        return
+
+    with open(file_path, newline="", encoding="utf-8") as file:
+        rows = []
+        for row in csv.reader(file):
+            rows.append([int(cell) - offset if cell.strip() else PADDING for cell in row])
+            if len(rows) == chunk_size:
+                yield _pad(rows)
+                rows = []
+        if rows:
+            yield _pad(rows)
+
+
+def _pad(rows: list) -> np.ndarray:
+    """Pack ragged rows into a PADDING padded array."""
+    width = max((len(row) for row in rows), default=0)
+    chunk = np.full((len(rows), width), PADDING, dtype=np.int64)
+    for i, row in enumerate(rows):
+        chunk[i, :len(row)] = row
+    return chunk
+
+
+def main():
+    """Evaluate answer sequences from the command line."""
+    parser = argparse.ArgumentParser(description="Replay recorded answer sequences through a decision tree")
+    parser.add_argument("file", help="Path to the decision tree file")
+    parser.add_argument("answers", help="CSV or NPY file of answer sequences (0-based answer indices)")
+    parser.add_argument("--one-based", action="store_true", help="Answer numbers start at 1 instead of 0")
+    parser.add_argument("--output", help="Write per-sequence results to this CSV file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Sequences evaluated per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    args = parser.parse_args()
+
+    try:
+        tree = load_tree(args.file)
+        table = compile_transitions(tree)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+    outcomes = Counter()
+    total = invalid = 0
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output else None
+    try:
+        writer = csv.writer(output) if output else None
+        if writer:
+            writer.writerow(["sequence", "final_node", "depth", "invalid_step", "is_result"])
+
+        for chunk in read_answer_chunks(args.answers, args.chunk_size, args.one_based):
+            result = evaluate(table, chunk)
+            final_ids = [tree.node_ids[i] for i in result.final_nodes]
+            reached = table.is_result[result.final_nodes]
+
+            outcomes.update(final_id for final_id, done in zip(final_ids, reached) if done)
+            invalid += int(np.count_nonzero(result.invalid_steps >= 0))
+
+            if writer:
+                writer.writerows(zip(range(total, total + len(chunk)), final_ids, result.depths.tolist(),
+                                     result.invalid_steps.tolist(), reached.astype(int).tolist()))
+            total += len(chunk)
+    except (OSError, ValueError) as e:
+        print(f"Error reading answers: {str(e)}")
+        sys.exit(1)
+    finally:
+        if output:
+            output.close()
+
+    completed = sum(outcomes.values())
+    print(f"Sequences: {total}")
+    print(f"Reached a result: {completed}")
+    print(f"Stopped before a result: {total - completed - invalid}")
+    print(f"Invalid answers: {invalid}")
+    if outcomes:
+        print("\nResults reached:")
+        for node_id, count in outcomes.most_common():
+            print(f"  {node_id}: {count}")
+    if args.output:
+        print(f"\nPer-sequence results written to: {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
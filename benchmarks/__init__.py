@@ -0,0 +1 @@
+"""Benchmarks for the Decision Tree Navigator, run with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Memory Benchmark - Compare the memory held by a parsed tree in the original
+dict-of-objects layout, the array-backed DecisionTree and a compiled tree.
+
+Usage:
+    python -m benchmarks.bench_memory --nodes 1000000
+"""
+import os
+import gc
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, Tuple
+
+from decision_tree import parse_file
+from compiled_tree import compile_tree, load_compiled
+from benchmarks.legacy import legacy_parse_file
+from benchmarks.synthetic import write_generated_tree
+
+
+def measure(loader: Callable[[str], object], file_path: str) -> Tuple[int, int]:
+    """
+    Measure the Python heap memory retained by a loaded tree.
+    
+    Memory-mapped file pages are not Python allocations and are not counted.
+    
+    Args:
+        loader: Function that loads the tree from the file
+        file_path: Path to the decision tree file
+    
+    Returns:
+        A (retained bytes, peak bytes) tuple
+    """
+    gc.collect()
+    tracemalloc.start()
+    tree = loader(file_path)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return retained, peak
+
+
+def main():
+    """Run the memory benchmark."""
+    parser = argparse.ArgumentParser(description="Compare decision tree memory layouts")
+    parser.add_argument("--nodes", type=int, default=1000000, help="Synthetic tree size (default: 1000000)")
+    parser.add_argument("--fan-out", type=int, default=3, help="Answers per question (default: 3)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "synthetic.txt")
+        write_generated_tree(file_path, args.nodes, fan_out=args.fan_out)
+        compile_tree(file_path)
+        
+        print(f"Tree: {args.nodes:,} nodes, {os.path.getsize(file_path) / 1e6:.1f} MB of text\n")
+        print(f"{'layout':>16} {'retained MB':>12} {'peak MB':>9} {'bytes/node':>11}")
+        for name, loader in (("dict of objects", legacy_parse_file),
+                             ("arrays", parse_file),
+                             ("compiled (mmap)", load_compiled)):
+            retained, peak = measure(loader, file_path)
+            print(f"{name:>16} {retained / 1e6:>12.1f} {peak / 1e6:>9.1f} {retained / args.nodes:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
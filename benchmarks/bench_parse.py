@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Parser Benchmark - Compare the block tokenizer in parse_file with the
+original line-by-line regular expression parser on large synthetic trees.
+
+Usage:
+    python -m benchmarks.bench_parse --nodes 10000 100000 500000
+"""
+import os
+import time
+import argparse
+import tempfile
+from typing import Callable, List
+
+from decision_tree import parse_file
+from benchmarks.legacy import legacy_parse_file
+from benchmarks.synthetic import write_generated_tree
+
+
+def time_parser(parser: Callable[[str], object], file_path: str, repeat: int) -> float:
+    """
+    Time a parser on a file, returning the best of several runs.
+    
+    Args:
+        parser: The parse function to time
+        file_path: Path to the decision tree file
+        repeat: Number of runs
+    
+    Returns:
+        The fastest run time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Run the parser benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark decision tree parsing throughput")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10000, 100000, 500000],
+                        help="Synthetic tree sizes to benchmark (default: 10000 100000 500000)")
+    parser.add_argument("--fan-out", type=int, default=3, help="Answers per question (default: 3)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (default: 3)")
+    args = parser.parse_args()
+    
+    print(f"{'nodes':>10} {'size MB':>8} {'parser':>9} {'seconds':>8} {'MB/s':>8} {'nodes/s':>11}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for node_count in args.nodes:
+            file_path = os.path.join(temp_dir, f"synthetic_{node_count}.txt")
+            write_generated_tree(file_path, node_count, fan_out=args.fan_out)
+            size_mb = os.path.getsize(file_path) / 1e6
+            nodes = len(parse_file(file_path).nodes)
+            
+            timings: List[float] = []
+            for name, func in (("regex", legacy_parse_file), ("tokenizer", parse_file)):
+                seconds = time_parser(func, file_path, args.repeat)
+                timings.append(seconds)
+                print(f"{nodes:>10} {size_mb:>8.1f} {name:>9} {seconds:>8.3f} "
+                      f"{size_mb / seconds:>8.1f} {nodes / seconds:>11,.0f}")
+            print(f"{'':>10} {'':>8} {'speedup':>9} {timings[0] / timings[1]:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite - Time the hot paths of the navigator on synthetic trees and
+catch performance regressions against a saved baseline.
+
+For every tree size the suite generates a synthetic tree (see
+synthetic.write_generated_tree) and measures:
+
+- ``parse``: parse_file on the whole file
+- ``walk``: random walks from the start to a result with select_answer,
+  then go_back to the start
+- ``path_display``: the same walks, calling get_path_display after every step
+- ``mermaid``: the same walks, calling generate_mermaid_diagram after every step
+- ``save_path``: save_path_to_file at the end of a number of walks
+
+Each case records the best time of several runs and, in a separate run under
+tracemalloc, the peak Python memory it allocated. Results can be saved as a
+JSON baseline; a later run compared against it fails when a case got slower
+or uses more memory than the threshold allows.
+
+Usage:
+    python -m benchmarks.bench_suite --sizes 1000 100000 --save-baseline baseline.json
+    python -m benchmarks.bench_suite --sizes 1000 100000 --baseline baseline.json --threshold 0.25
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import datetime
+import tempfile
+import tracemalloc
+import contextlib
+from typing import Callable, Dict, List, Tuple
+
+from decision_tree import (DecisionTree, NavigationSession, parse_file, generate_mermaid_diagram,
+                           save_path_to_file, FLAG_RESULT)
+from benchmarks.synthetic import write_generated_tree
+
+CASES = ["parse", "walk", "path_display", "mermaid", "save_path"]
+
+# Differences smaller than these are noise, whatever the ratio
+MIN_SECONDS = 0.002
+MIN_BYTES = 64 * 1024
+
+
+def plan_walks(tree: DecisionTree, count: int, seed: int) -> List[List[int]]:
+    """
+    Choose random walks from the start node to a result.
+    
+    Args:
+        tree: The decision tree
+        count: Number of walks
+        seed: Random seed
+    
+    Returns:
+        The answer positions of each walk
+    """
+    rng = random.Random(seed)
+    start = tree.index_of(tree.start_node_id)
+    walks = []
+    for _ in range(count):
+        node, walk = start, []
+        while not tree.node_flags[node] & FLAG_RESULT and tree.answer_counts[node]:
+            choice = rng.randrange(tree.answer_counts[node])
+            walk.append(choice)
+            node = tree.answer_targets[tree.answer_starts[node] + choice]
+        walks.append(walk)
+    return walks
+
+
+def replay(tree: DecisionTree, walks: List[List[int]], on_step: Callable[[NavigationSession], object] = None,
+           on_end: Callable[[NavigationSession], object] = None) -> int:
+    """
+    Replay walks on a new session, going back to the start after each.
+    
+    Args:
+        tree: The decision tree
+        walks: Answer positions of each walk
+        on_step: Function called with the session after every step
+        on_end: Function called with the session at the end of every walk
+    
+    Returns:
+        Number of steps taken
+    """
+    session = NavigationSession(tree)
+    session.navigate_to_start()
+    steps = 0
+    for walk in walks:
+        for choice in walk:
+            session.select_answer(choice)
+            if on_step is not None:
+                on_step(session)
+        steps += len(walk)
+        if on_end is not None:
+            on_end(session)
+        while session.go_back():
+            pass
+    return steps
+
+
+def measure(run: Callable[[], int], repeat: int, memory: bool) -> Dict[str, float]:
+    """
+    Time a case and measure its peak memory.
+    
+    Args:
+        run: Function running the case once, returning its number of operations
+        repeat: Number of timed runs; the fastest counts
+        memory: Whether to measure peak memory in an extra run
+    
+    Returns:
+        Dictionary with seconds, ops and peak_bytes (None without memory)
+    """
+    best, ops = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops = run()
+        best = min(best, time.perf_counter() - start)
+    
+    peak = None
+    if memory:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    return {"seconds": best, "ops": ops, "peak_bytes": peak}
+
+
+def run_suite(args: argparse.Namespace, temp_dir: str) -> Dict[str, Dict[str, float]]:
+    """
+    Run the selected cases on every tree size, printing each result.
+    
+    Args:
+        args: Parsed command-line arguments
+        temp_dir: Directory for the synthetic trees and saved paths
+    
+    Returns:
+        Results keyed by ``<case>/<size>``
+    """
+    results = {}
+    for size in args.sizes:
+        file_path = os.path.join(temp_dir, f"synthetic_{size}.txt")
+        nodes = write_generated_tree(file_path, size, args.depth, args.fan_out, args.shared,
+                                     args.text_length, args.seed)
+        tree = parse_file(file_path)
+        walks = plan_walks(tree, args.walks, args.seed)
+        save_walks = walks[:args.saves]
+        output = os.path.join(temp_dir, "path.md")
+        
+        def save(session):
+            save_path_to_file(session, file_path, output)
+        
+        runners = {
+            "parse": lambda: (parse_file(file_path), nodes)[1],
+            "walk": lambda: replay(tree, walks),
+            "path_display": lambda: replay(tree, walks, on_step=lambda s: s.get_path_display()),
+            "mermaid": lambda: replay(tree, walks, on_step=generate_mermaid_diagram),
+            "save_path": lambda: (replay(tree, save_walks, on_end=save), len(save_walks))[1],
+        }
+        print(f"\nTree: {nodes:,} nodes, {os.path.getsize(file_path) / 1e6:.1f} MB, "
+              f"average walk {sum(map(len, walks)) / max(len(walks), 1):.1f} steps")
+        for case in args.cases:
+            # save_path_to_file reports every file it writes
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = measure(runners[case], args.repeat, not args.no_memory)
+            result["nodes"] = nodes
+            results[f"{case}/{size}"] = result
+            peak = f"{result['peak_bytes'] / 1e6:>9.2f}" if result["peak_bytes"] is not None else f"{'-':>9}"
+            print(f"  {case:<13} {result['seconds']:>9.4f}s {result['ops'] / result['seconds']:>14,.0f} ops/s "
+                  f"{peak} MB peak")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[Tuple[str, str]]:
+    """
+    Compare results with a baseline and print the changes.
+    
+    Args:
+        results: Results of this run
+        baseline: Results of the baseline run
+        threshold: Allowed relative increase, e.g. 0.25 for 25%
+    
+    Returns:
+        (case, description) of every regression
+    """
+    regressions = []
+    print(f"\n{'case':<24} {'baseline':>10} {'now':>10} {'time':>8} {'memory':>8}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<24} {'(new)':>10} {result['seconds']:>9.4f}s")
+            continue
+        time_change = result["seconds"] / base["seconds"] - 1 if base["seconds"] else 0.0
+        memory_change = None
+        if result.get("peak_bytes") is not None and base.get("peak_bytes"):
+            memory_change = result["peak_bytes"] / base["peak_bytes"] - 1
+        status = ""
+        if time_change > threshold and result["seconds"] - base["seconds"] > MIN_SECONDS:
+            regressions.append((key, f"{time_change:+.0%} time"))
+            status = "  REGRESSION"
+        if (memory_change is not None and memory_change > threshold
+                and result["peak_bytes"] - base["peak_bytes"] > MIN_BYTES):
+            regressions.append((key, f"{memory_change:+.0%} memory"))
+            status = "  REGRESSION"
+        memory = f"{memory_change:>+8.0%}" if memory_change is not None else f"{'-':>8}"
+        print(f"{key:<24} {base['seconds']:>9.4f}s {result['seconds']:>9.4f}s {time_change:>+8.0%} "
+              f"{memory}{status}")
+    return regressions
+
+
+def main():
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the decision tree navigator")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Synthetic tree sizes in nodes, up to 10000000 (default: 1000 10000 100000)")
+    parser.add_argument("--depth", type=int, help="Maximum tree depth (default: limited by the size only)")
+    parser.add_argument("--fan-out", type=int, default=3, help="Answers per question (default: 3)")
+    parser.add_argument("--shared", type=float, default=0.0,
+                        help="Fraction of answers leading to an existing subtree (default: 0)")
+    parser.add_argument("--text-length", type=int, default=60, help="Characters per node text (default: 60)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--walks", type=int, default=200, help="Random walks per tree (default: 200)")
+    parser.add_argument("--saves", type=int, default=20, help="Walks ending in save_path_to_file (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (default: 3)")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES, help="Cases to run (default: all)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory measurement")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write the results to a JSON baseline file")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare the results with a JSON baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown or memory growth against the baseline (default: 0.25)")
+    args = parser.parse_args()
+    
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot read baseline: {str(e)}")
+            sys.exit(2)
+    
+    params = {key: getattr(args, key) for key in ("depth", "fan_out", "shared", "text_length", "seed",
+                                                 "walks", "saves")}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = run_suite(args, temp_dir)
+    
+    if args.save_baseline:
+        data = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+            "results": results,
+        }
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+    
+    if baseline is not None:
+        if baseline.get("params") != params:
+            print("\nWarning: the baseline was recorded with different tree or walk settings")
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold:.0%}:")
+            for key, description in regressions:
+                print(f"  {key}: {description}")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
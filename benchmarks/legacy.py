@@ -0,0 +1,73 @@
+"""
+Reference implementation of the original dict-of-objects tree and regex parser.
+
+Benchmarks compare the current implementation against these classes, which
+reproduce the data structures and parsing of the first release.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+class LegacyNode:
+    """A node stored as a regular object with a list of answer tuples."""
+    
+    def __init__(self, node_id: str, text: str, is_result: bool = False):
+        self.id = node_id
+        self.text = text
+        self.is_result = is_result
+        self.answers: List[Tuple[str, str]] = []
+
+
+class LegacyTree:
+    """A tree stored as a dict of node IDs to LegacyNode objects."""
+    
+    def __init__(self):
+        self.nodes: Dict[str, LegacyNode] = {}
+        self.start_node_id: Optional[str] = None
+    
+    def add_node(self, node: LegacyNode):
+        self.nodes[node.id] = node
+        if self.start_node_id is None and not node.is_result:
+            self.start_node_id = node.id
+
+
+def legacy_parse_file(file_path: str) -> LegacyTree:
+    """
+    Parse a decision tree file with the original per-line regular expressions.
+    
+    Args:
+        file_path: Path to the decision tree file
+    
+    Returns:
+        Populated LegacyTree object
+    
+    Raises:
+        ValueError: If the file format is invalid
+    """
+    tree = LegacyTree()
+    current_node = None
+    
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line_num, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            
+            question_match = re.match(r'^([QR]\d+[a-z]*):\s+(.+)$', line)
+            if question_match:
+                node_id, text = question_match.groups()
+                current_node = LegacyNode(node_id, text, node_id.startswith('R'))
+                tree.add_node(current_node)
+                continue
+            
+            answer_match = re.match(r'^A:\s+(.+?)\s+->\s+([QR]\d+[a-z]*)$', line)
+            if answer_match and current_node and not current_node.is_result:
+                current_node.answers.append(answer_match.groups())
+                continue
+            
+            raise ValueError(f"Invalid line format at line {line_num}: {line}")
+    
+    if not tree.nodes:
+        raise ValueError("No valid nodes found in the file")
+    
+    return tree
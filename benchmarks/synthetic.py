@@ -0,0 +1,92 @@
+"""
+Synthetic decision tree files for benchmarks.
+"""
+import random
+from typing import Optional
+
+ANSWER_TEXTS = ["Yes", "No", "Not sure", "It depends on the situation"]
+
+FILLER = ("considering the budget, the timeline, the people involved and the risks of each option "
+          "as well as what has worked before in similar situations ")
+
+
+def _pad(text: str, length: int, end: str) -> str:
+    """Lengthen a text with filler words to about the given number of characters."""
+    if len(text) + len(end) >= length:
+        return text + end
+    filler = (FILLER * (length // len(FILLER) + 1))[:length - len(text) - len(end) - 1].rstrip(" ,")
+    return f"{text} {filler}{end}"
+
+
+def write_generated_tree(file_path: str, node_count: int, depth: Optional[int] = None, fan_out: int = 3,
+                         shared_ratio: float = 0.0, text_length: int = 60, seed: int = 0) -> int:
+    """
+    Write a synthetic decision tree with configurable shape.
+    
+    The tree is generated level by level and written as it is generated, so
+    memory use does not grow with the node count. Nodes are numbered
+    breadth-first. On every level the first nodes are questions and the rest
+    are results, so the node budget runs out evenly across the level.
+    
+    With a shared-subtree ratio above zero, that fraction of answers points
+    to a node already created on the next level instead of a new one, which
+    turns the tree into a DAG. Shared targets are always one level down, so
+    the result is acyclic.
+    
+    Args:
+        file_path: Path of the file to write
+        node_count: Approximate total number of nodes
+        depth: Maximum number of levels (default: as many as the node budget allows)
+        fan_out: Number of answers per question
+        shared_ratio: Fraction of answers that lead to an existing node (0 to 1)
+        text_length: Approximate length of question and result texts in characters
+        seed: Seed of the random choice of shared targets
+    
+    Returns:
+        Number of nodes written
+    """
+    rng = random.Random(seed)
+    fresh_share = max(1.0 - shared_ratio, 1.0 / fan_out)
+    written = 0
+    
+    with open(file_path, 'w', encoding='utf-8') as file:
+        level = 0
+        level_start = 1      # Number of the first node on the current level
+        level_size = 1
+        level_questions = 1  # The first level_questions nodes of the level are questions
+        while level_size:
+            next_start = level_start + level_size
+            next_size = 0
+            # Questions on the next level, keeping the total within the node budget
+            remaining = node_count - (next_start - 1) - int(level_questions * fan_out * fresh_share)
+            if depth is not None and level + 2 >= depth:
+                next_questions = 0
+            else:
+                next_questions = max(0, int(remaining / (fan_out * fresh_share + 1)))
+            
+            def next_id(position: int) -> str:
+                prefix = "Q" if position < next_questions else "R"
+                return f"{prefix}{next_start + position}"
+            
+            for position in range(level_size):
+                n = level_start + position
+                if position >= level_questions:
+                    file.write(f"R{n}: {_pad(f'RESULT: Synthetic outcome {n}', text_length, '.')}\n")
+                    written += 1
+                    continue
+                file.write(f"Q{n}: {_pad(f'Synthetic question {n}', text_length, '?')}\n")
+                written += 1
+                for a in range(fan_out):
+                    if next_size and rng.random() < shared_ratio:
+                        target = next_id(rng.randrange(next_size))
+                    else:
+                        target = next_id(next_size)
+                        next_size += 1
+                    file.write(f"A: {ANSWER_TEXTS[a % len(ANSWER_TEXTS)]} -> {target}\n")
+                file.write("\n")
+            
+            level += 1
+            level_start = next_start
+            level_size = next_size
+            level_questions = min(next_questions, next_size)
+    return written
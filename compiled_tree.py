@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Compiled Decision Trees - A binary sidecar format for fast tree loading.
+
+Parsing a large Q/A text file dominates the start-up time of the navigator.
+This module compiles a parsed tree into a sidecar file (``<source>.dtc``)
+holding a string table, a node table and an answer table. The sidecar is
+memory-mapped on load and nodes are decoded only when they are visited, so
+opening a tree with hundreds of thousands of nodes costs almost nothing.
+
+Each sidecar records the absolute path, modification time and size of the
+source file it was built from. If any of these no longer match, the sidecar
+is considered stale and ``load_tree`` falls back to the text parser.
+
+Layout (all sections 8-byte aligned, arrays in native byte order):
+
+    header          magic, version, byte order, source mtime/size, counts
+    source path     UTF-8 encoded absolute path of the source file
+    string offsets  uint32[string_count + 1]
+    string data     UTF-8 encoded, deduplicated strings
+    node ids        uint32[node_count]    string index of each node ID
+    node texts      uint32[node_count]    string index of each node text
+    node flags      uint8[node_count]     FLAG_DEFINED | FLAG_RESULT
+    answer starts   uint32[node_count]    first answer of each node
+    answer counts   uint32[node_count]    number of answers of each node
+    id order        uint32[node_count]    node indices sorted by ID
+    answer texts    uint32[answer_count]  string index of each answer text
+    answer targets  uint32[answer_count]  node index of each answer target
+    node lines      uint32[node_count]    source line of each node
+    answer lines    uint32[answer_count]  source line of each answer
+    duplicates      uint32[duplicate_count * 3]  node ID string index, previous
+                                          line and line of each repeated definition
+
+The node and answer tables mirror the arrays of DecisionTree, and a
+CompiledTree simply points those arrays at the mapped file.
+"""
+import os
+import sys
+import mmap
+import struct
+import argparse
+from array import array
+from collections.abc import Sequence
+from typing import Dict, List, Optional
+
+from decision_tree import Node, DecisionTree, INCLUDE_PREFIX, parse_file
+
+SIDECAR_SUFFIX = ".dtc"
+FORMAT_MAGIC = b"DTC1"
+FORMAT_VERSION = 3
+
+# magic, version, byte order, source mtime (ns), source size, source path length,
+# string count, string data length, node count, defined node count, answer count,
+# start node index (-1 if the tree has no start node), duplicate definition count
+_HEADER = struct.Struct("<4sHB x q q I I I I I I i I")
+_NO_STRING = 0xFFFFFFFF
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to the next multiple of 8."""
+    return (offset + 7) & ~7
+
+
+def get_sidecar_path(source_path: str) -> str:
+    """
+    Get the path of the compiled sidecar for a decision tree file.
+
+    Args:
+        source_path: Path to the decision tree text file
+
+    Returns:
+        Path to the compiled sidecar file
+    """
+    return source_path + SIDECAR_SUFFIX
+
+
+def compile_tree(source_path: str, output_path: Optional[str] = None) -> str:
+    """
+    Parse a decision tree file and write its compiled sidecar.
+
+    Args:
+        source_path: Path to the decision tree text file
+        output_path: Optional sidecar path, defaults to ``<source>.dtc``
+
+    Returns:
+        The path the compiled tree was written to
+
+    Raises:
+        FileNotFoundError: If the source file doesn't exist
+        ValueError: If the source file format is invalid or includes other files
+    """
+    if output_path is None:
+        output_path = get_sidecar_path(source_path)
+
+    # Stat before parsing so that an edit made during compilation leaves
+    # the sidecar stale rather than silently out of date.
+    stat = os.stat(source_path)
+    tree = parse_file(source_path)
+    if any(node_id.startswith(INCLUDE_PREFIX) for node_id in tree.node_ids):
+        # Included files are added to the tree when visited, which a mapped sidecar cannot hold
+        raise ValueError("Trees that include other files cannot be compiled")
+
+    strings: List[str] = []
+    string_index: Dict[str, int] = {}
+
+    def intern(text: Optional[str]) -> int:
+        if text is None:
+            return _NO_STRING
+        index = string_index.get(text)
+        if index is None:
+            index = string_index[text] = len(strings)
+            strings.append(text)
+        return index
+
+    id_strings = array("I", map(intern, tree.node_ids))
+    text_strings = array("I", map(intern, tree.node_texts))
+    answer_texts = array("I", map(intern, tree.answer_texts))
+    node_ids = tree.node_ids
+    id_order = array("I", sorted(range(len(node_ids)), key=node_ids.__getitem__))
+    duplicates = array("I")
+    for node_id, previous_line, line in tree.duplicates:
+        duplicates.extend((intern(node_id), previous_line, line))
+
+    encoded = [text.encode("utf-8") for text in strings]
+    string_offsets = array("I", [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    string_data = b"".join(encoded)
+
+    source = os.path.abspath(source_path).encode("utf-8")
+    start = tree.index_of(tree.start_node_id) if tree.start_node_id is not None else -1
+    header = _HEADER.pack(
+        FORMAT_MAGIC, FORMAT_VERSION, 0 if sys.byteorder == "little" else 1,
+        stat.st_mtime_ns, stat.st_size, len(source),
+        len(strings), len(string_data), len(node_ids), tree.defined_count, len(answer_texts),
+        start, len(tree.duplicates)
+    )
+
+    sections = [header, source, string_offsets, string_data, id_strings, text_strings,
+                tree.node_flags, tree.answer_starts, tree.answer_counts, id_order,
+                answer_texts, tree.answer_targets, tree.node_lines, tree.answer_lines, duplicates]
+
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            offset = 0
+            for section in sections:
+                padding = _align(offset) - offset
+                file.write(b"\0" * padding)
+                data = section if isinstance(section, (bytes, bytearray)) else section.tobytes()
+                file.write(data)
+                offset += padding + len(data)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return output_path
+
+
+class StringColumn(Sequence):
+    """A sequence of strings decoded on access from a compiled string table."""
+
+    def __init__(self, tree: "CompiledTree", string_indices: memoryview):
+        """
+        Initialize the column.
+
+        Args:
+            tree: The compiled tree owning the string table
+            string_indices: String table index of each element
+        """
+        self._tree = tree
+        self._string_indices = string_indices
+
+    def __len__(self) -> int:
+        return len(self._string_indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        string_index = self._string_indices[index]
+        if string_index == _NO_STRING:
+            return None
+        return self._tree.get_string(string_index)
+
+
+class CompiledTree(DecisionTree):
+    """
+    A read-only decision tree backed by a memory-mapped compiled sidecar.
+
+    The node and answer arrays of DecisionTree are memoryviews into the
+    mapped file, and strings are decoded only when they are read.
+    """
+
+    def __init__(self, buffer: mmap.mmap, source_path: str):
+        """
+        Initialize the tree from a mapped sidecar.
+
+        Args:
+            buffer: The memory-mapped sidecar contents
+            source_path: Absolute path recorded in the sidecar header
+
+        Raises:
+            ValueError: If the sidecar is truncated or malformed
+        """
+        super().__init__()
+        self._buffer = buffer
+        self.source_path = source_path
+
+        view = memoryview(buffer)
+        (_, _, _, _, _, path_length, string_count, data_length,
+         node_count, defined_count, answer_count, start, duplicate_count) = _HEADER.unpack_from(view)
+
+        offset = _HEADER.size + path_length
+
+        def take(length: int, typecode: str = "B") -> memoryview:
+            nonlocal offset
+            offset = _align(offset)
+            size = length * (4 if typecode == "I" else 1)
+            if offset + size > len(view):
+                raise ValueError("Compiled tree is truncated")
+            section = view[offset:offset + size]
+            offset += size
+            return section.cast(typecode) if typecode != "B" else section
+
+        self.string_offsets = take(string_count + 1, "I")
+        self.string_data = take(data_length)
+        self.node_ids = StringColumn(self, take(node_count, "I"))
+        self.node_texts = StringColumn(self, take(node_count, "I"))
+        self.node_flags = take(node_count)
+        self.answer_starts = take(node_count, "I")
+        self.answer_counts = take(node_count, "I")
+        self.id_order = take(node_count, "I")
+        self.answer_texts = StringColumn(self, take(answer_count, "I"))
+        self.answer_targets = take(answer_count, "I")
+        self.node_lines = take(node_count, "I")
+        self.answer_lines = take(answer_count, "I")
+        duplicates = take(duplicate_count * 3, "I")
+        self.duplicates = [(self.get_string(duplicates[i]), duplicates[i + 1], duplicates[i + 2])
+                           for i in range(0, len(duplicates), 3)]
+
+        self.defined_count = defined_count
+        self.start_node_id = self.node_ids[start] if start >= 0 else None
+
+    def get_string(self, index: int) -> str:
+        """
+        Decode an entry of the string table.
+
+        Args:
+            index: String table index
+
+        Returns:
+            The decoded string
+        """
+        return str(self.string_data[self.string_offsets[index]:self.string_offsets[index + 1]], "utf-8")
+
+    def index_of(self, node_id: str) -> Optional[int]:
+        """
+        Look up the node index of a node ID by binary search over the ID order.
+
+        Args:
+            node_id: The node ID to look up
+
+        Returns:
+            The node index, or None if the ID is unknown
+        """
+        node_ids = self.node_ids
+        low, high = 0, len(self.id_order)
+        while low < high:
+            middle = (low + high) // 2
+            index = self.id_order[middle]
+            candidate = node_ids[index]
+            if candidate == node_id:
+                return index
+            if candidate < node_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def add_node(self, node: Node):
+        """Compiled trees are read-only."""
+        raise ValueError("Cannot add nodes to a compiled decision tree")
+
+    def estimate_memory(self) -> int:
+        """
+        Estimate the memory used by the tree.
+
+        The mapped sidecar is counted in full even though its pages are
+        shared with the operating system's file cache.
+
+        Returns:
+            Approximate size in bytes
+        """
+        return len(self._buffer)
+
+
+def load_compiled(source_path: str) -> Optional[CompiledTree]:
+    """
+    Load the compiled sidecar of a decision tree file if it is up to date.
+
+    Args:
+        source_path: Path to the decision tree text file
+
+    Returns:
+        The compiled tree, or None if the sidecar is missing, stale or unreadable
+
+    Raises:
+        FileNotFoundError: If the source file doesn't exist
+    """
+    stat = os.stat(source_path)
+    sidecar_path = get_sidecar_path(source_path)
+
+    try:
+        with open(sidecar_path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        (magic, version, byte_order, mtime_ns, size, path_length,
+         *_) = _HEADER.unpack_from(buffer)
+        recorded_path = buffer[_HEADER.size:_HEADER.size + path_length].decode("utf-8")
+        if (magic != FORMAT_MAGIC or version != FORMAT_VERSION
+                or byte_order != (0 if sys.byteorder == "little" else 1)
+                or mtime_ns != stat.st_mtime_ns or size != stat.st_size
+                or recorded_path != os.path.abspath(source_path)):
+            buffer.close()
+            return None
+        return CompiledTree(buffer, recorded_path)
+    except (struct.error, ValueError, IndexError):
+        buffer.close()
+        return None
+
+
+def load_tree(source_path: str) -> DecisionTree:
+    """
+    Load a decision tree, preferring an up-to-date compiled sidecar.
+
+    Args:
+        source_path: Path to the decision tree text file
+
+    Returns:
+        A compiled tree if a fresh sidecar exists, otherwise the parsed text file
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file format is invalid
+    """
+    try:
+        tree = load_compiled(source_path)
+    except FileNotFoundError:
+        tree = None
+    if tree is not None:
+        return tree
+    return parse_file(source_path)
+
+
+def main():
+    """Compile one or more decision tree files from the command line."""
+    parser = argparse.ArgumentParser(description="Compile decision tree files for fast loading")
+    parser.add_argument("files", nargs="+", help="Decision tree files to compile")
+    args = parser.parse_args()
+
+    status = 0
+    for source_path in args.files:
+        try:
+            output_path = compile_tree(source_path)
+            print(f"Compiled {source_path} -> {output_path}")
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Error compiling {source_path}: {str(e)}")
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Context Window - Keep the messages sent to the model within a token budget.
+
+Every chat request resends the conversation, so without a limit the prompt
+grows with every turn until it overflows the model's context. ContextWindow
+decides which messages are sent:
+
+- pinned messages at the start of the conversation (the instructions) and
+  the partially built tree are always sent
+- the most recent turns are sent verbatim
+- older turns are replaced by one-line summaries, and the oldest summaries
+  are dropped once they exceed their share of the budget
+
+Turns are dropped in batches, down to a low-water mark below the budget, so
+the prefix of the prompt stays the same for several turns and the server can
+keep reusing its cached evaluation of it.
+
+Token counts are estimated from the text length; the conversation itself is
+never modified.
+"""
+from typing import Dict, List, Optional
+
+# Rough average for English text with the tokenizers of common local models
+CHARS_PER_TOKEN = 4.0
+
+# Tokens of per-message overhead (role markers and separators)
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_LINE_LENGTH = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+
+    Args:
+        text: The text
+
+    Returns:
+        Estimated token count
+    """
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def summarize_message(message: Dict[str, str]) -> str:
+    """
+    Condense a message into one line for the summary of earlier turns.
+
+    Args:
+        message: A chat message with role and content
+
+    Returns:
+        A single line, at most SUMMARY_LINE_LENGTH characters of content
+    """
+    lines = [line.strip() for line in message["content"].splitlines() if line.strip()]
+    if message["role"] == "assistant":
+        # The question is what later turns refer back to
+        text = next((line for line in lines if line.endswith("?")), lines[0] if lines else "")
+        label = "Assistant"
+    else:
+        text = " ".join(lines)
+        label = "User"
+    if len(text) > SUMMARY_LINE_LENGTH:
+        text = text[:SUMMARY_LINE_LENGTH - 3].rstrip() + "..."
+    return f"- {label}: {text}"
+
+
+class ContextWindow:
+    """Selects the messages sent to the model under a token budget."""
+
+    def __init__(self, max_tokens: int, summary_share: float = 0.25, tree_share: float = 0.4,
+                 low_water: float = 0.75):
+        """
+        Initialize the context window.
+
+        Args:
+            max_tokens: Token budget for the messages of one request
+            summary_share: Fraction of the budget the summary of earlier turns may use
+            tree_share: Fraction of the budget the partially built tree may use
+            low_water: Fraction of the budget to shrink to once the budget is exceeded
+        """
+        self.max_tokens = max_tokens
+        self.summary_share = summary_share
+        self.tree_share = tree_share
+        self.low_water = low_water
+        self.start = 0                    # Index of the first message still sent verbatim
+        self.summary_lines: List[str] = []
+        self.last_report: Dict[str, int] = {}
+
+    @staticmethod
+    def _cost(message: Dict[str, str]) -> int:
+        return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+    def build(self, conversation: List[Dict[str, str]], pinned: int = 0,
+              tree_text: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Select the messages to send for the next request.
+
+        Args:
+            conversation: The full conversation, ending with the new user message
+            pinned: Number of messages at the start of the conversation that are always sent
+            tree_text: The partially built tree, sent just before the recent turns
+
+        Returns:
+            The messages to send
+        """
+        head = conversation[:pinned]
+        self.start = min(max(self.start, pinned), max(len(conversation) - 1, pinned))
+
+        extra = []
+        if tree_text:
+            tree_text = self._truncate(tree_text, int(self.max_tokens * self.tree_share))
+            extra.append({"role": "system", "content": f"The decision tree so far:\n{tree_text}"})
+        fixed = sum(map(self._cost, head)) + sum(map(self._cost, extra))
+        recent_costs = [self._cost(message) for message in conversation[self.start:]]
+        recent = sum(recent_costs)
+
+        summary_budget = int(self.max_tokens * self.summary_share)
+        summary = sum(estimate_tokens(line) for line in self.summary_lines)
+
+        def drop_oldest():
+            nonlocal recent, summary
+            recent -= recent_costs.pop(0)
+            line = summarize_message(conversation[self.start])
+            self.summary_lines.append(line)
+            summary += estimate_tokens(line)
+            self.start += 1
+
+        if fixed + summary + recent > self.max_tokens:
+            target = int(self.max_tokens * self.low_water)
+            # Drop whole turns from the front, always keeping the newest message
+            while fixed + summary + recent > target and self.start < len(conversation) - 1:
+                drop_oldest()
+                # Never start the verbatim part with an assistant reply
+                while self.start < len(conversation) - 1 and conversation[self.start]["role"] == "assistant":
+                    drop_oldest()
+                while self.summary_lines and summary > summary_budget:
+                    summary -= estimate_tokens(self.summary_lines.pop(0))
+
+        # The tree changes every turn, so it goes after the parts that rarely change
+        messages = list(head)
+        if self.summary_lines:
+            messages.append({"role": "system",
+                             "content": "Summary of earlier turns:\n" + "\n".join(self.summary_lines)})
+        messages.extend(extra)
+        messages.extend(conversation[self.start:])
+
+        self.last_report = {
+            "messages_sent": len(messages),
+            "messages_total": len(conversation),
+            "messages_dropped": self.start - pinned,
+            "estimated_tokens": fixed + summary + recent,
+        }
+        return messages
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int) -> str:
+        """Cut a text at a line boundary so that it fits in a number of tokens."""
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        limit = int(max_tokens * CHARS_PER_TOKEN)
+        cut = text.rfind("\n", 0, limit)
+        kept = text[:cut if cut > 0 else limit]
+        omitted = text.count("\n", len(kept))
+        return f"{kept}\n... ({omitted} more lines not shown)"
+
+    def reset(self):
+        """Forget the summaries, e.g. when a new conversation starts."""
+        self.start = 0
+        self.summary_lines = []
+        self.last_report = {}
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Conversation Tree - Build a decision tree from structured model replies as they arrive.
+
+The generator asks the model to reply with JSON matching REPLY_SCHEMA: a
+question with its answers, or a final recommendation, plus the answer of the
+previous question that the reply follows from. Every reply is merged into a
+persistent ConversationTree when it arrives, so exporting the tree never
+rescans the conversation:
+
+- a question with at least two answers becomes a ``Q`` node, a
+  recommendation becomes an ``R`` node
+- the new node is linked to the answer the user chose: a number or answer
+  text in the user's message, or the answer named in ``follows_answer``
+- answers that have not been explored yet get a placeholder result when the
+  tree is exported, so the file is always complete
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Reply format requested from the model
+REPLY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string"},
+        "follows_answer": {"type": "string"},
+        "question": {"type": "string"},
+        "answers": {"type": "array", "items": {"type": "string"}, "maxItems": 6},
+        "result": {"type": "string"},
+    },
+    "required": ["message", "follows_answer", "question", "answers", "result"],
+}
+
+# Added to the instructions when replies are structured
+REPLY_INSTRUCTIONS = """
+Reply with JSON only. Put anything you want to tell me in "message". Put the question in "question"
+and its possible answers in "answers", without numbers. In "follows_answer" repeat the answer I chose
+for your previous question, or leave it empty. When a path is finished, leave "question" and
+"answers" empty and put the final recommendation in "result".
+"""
+
+PLACEHOLDER_PREFIX = "Not explored yet:"
+
+
+def clean_text(text: str) -> str:
+    """
+    Make model output safe for a single line of the Q/A format.
+
+    Args:
+        text: Text written by the model
+
+    Returns:
+        The text on one line, without arrows
+    """
+    return " ".join(text.replace("->", "-").split())
+
+
+def parse_reply(content: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a structured reply.
+
+    Args:
+        content: The reply text
+
+    Returns:
+        Dictionary with message, follows_answer, question, answers and result
+        (cleaned), or None if the reply is not a JSON object
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    answers = []
+    for answer in data.get("answers") or []:
+        answer = clean_text(str(answer))
+        if answer and answer not in answers:
+            answers.append(answer)
+    return {
+        "message": str(data.get("message") or "").strip(),
+        "follows_answer": clean_text(str(data.get("follows_answer") or "")),
+        "question": clean_text(str(data.get("question") or "")),
+        "answers": answers,
+        "result": clean_text(str(data.get("result") or "")),
+    }
+
+
+def render_reply(reply: Dict[str, Any]) -> str:
+    """
+    Turn a structured reply into the text shown to the user and kept in the conversation.
+
+    Args:
+        reply: Reply from parse_reply
+
+    Returns:
+        The message followed by the numbered question or the recommendation
+    """
+    parts = [reply["message"]] if reply["message"] else []
+    if reply["question"]:
+        lines = [f"QUESTION: {reply['question']}"]
+        lines.extend(f"{i}. {answer}" for i, answer in enumerate(reply["answers"], 1))
+        parts.append("\n".join(lines))
+    elif reply["result"]:
+        parts.append(f"RESULT: {reply['result']}")
+    return "\n\n".join(parts)
+
+
+class ReplyStreamer:
+    """
+    Turns a structured reply into the text shown to the user while it is generated.
+
+    The JSON is scanned as it arrives, and the characters of the message,
+    question, answers and recommendation are passed on as soon as they are
+    decoded, laid out as render_reply lays them out.
+    """
+
+    # Field -> text written before its value, when the value is not empty
+    PREFIXES = {"message": "", "question": "QUESTION: ", "result": "RESULT: "}
+    ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self):
+        """Initialize the scanner before the first chunk."""
+        self.depth = 0              # Nesting of objects and arrays
+        self.in_string = False
+        self.escape = ""            # Escape sequence read so far, starting with the backslash
+        self.expect_key = False     # Whether the next string at depth 1 is a key
+        self.key = ""               # Key being read, or the key of the current value
+        self.is_key = False         # Whether the current string is a key
+        self.field_started = False  # Whether the prefix of the current value was written
+        self.answers = 0            # Answers written so far
+        self.asked = False          # Whether a question was written; it replaces the result
+        self.emitted = False        # Whether any text was written
+
+    def _write(self, text: str, out: List[str]):
+        """Write the decoded text of the current string value."""
+        if self.is_key:
+            self.key += text
+            return
+        if self.depth == 2 and self.key == "answers":
+            if not self.asked:
+                return
+            if not self.field_started:
+                self.answers += 1
+                out.append(f"\n{self.answers}. ")
+                self.field_started = True
+        elif self.depth == 1 and self.key in self.PREFIXES:
+            if self.key == "result" and self.asked:
+                return
+            if not self.field_started:
+                self.asked = self.asked or self.key == "question"
+                separator = "\n\n" if self.emitted and self.key != "message" else ""
+                out.append(separator + self.PREFIXES[self.key])
+                self.field_started = True
+        else:
+            return
+        out.append(text)
+        self.emitted = True
+
+    def feed(self, chunk: str) -> str:
+        """
+        Scan the next piece of the reply.
+
+        Args:
+            chunk: The next piece of the JSON text
+
+        Returns:
+            The text to show for it, possibly empty
+        """
+        out: List[str] = []
+        for char in chunk:
+            if self.in_string:
+                if self.escape:
+                    self.escape += char
+                    if self.escape[1] == "u":
+                        if len(self.escape) == 6:
+                            try:
+                                self._write(chr(int(self.escape[2:], 16)), out)
+                            except ValueError:
+                                pass
+                            self.escape = ""
+                    else:
+                        self._write(self.ESCAPES.get(char, char), out)
+                        self.escape = ""
+                elif char == "\\":
+                    self.escape = char
+                elif char == '"':
+                    self.in_string = False
+                else:
+                    self._write(char, out)
+            elif char == '"':
+                self.in_string = True
+                self.is_key = self.depth == 1 and self.expect_key
+                if self.is_key:
+                    self.key = ""
+                self.field_started = False
+            elif char in "{[":
+                self.depth += 1
+                self.expect_key = char == "{" and self.depth == 1
+            elif char in "}]":
+                self.depth -= 1
+            elif char == ":" and self.depth == 1:
+                self.expect_key = False
+            elif char == "," and self.depth == 1:
+                self.expect_key = True
+        return "".join(out)
+
+
+class ConversationTree:
+    """A decision tree that grows with each structured reply of a conversation."""
+
+    def __init__(self):
+        """Initialize an empty tree."""
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.current_id = 1                     # Number of the next question node
+        self.result_id = 1                      # Number of the next result node
+        self.last_question: Optional[str] = None
+        self.open_answers: List[Tuple[str, int]] = []  # Answers without a target, oldest first
+        self.replies = 0
+
+    def _choose_answer(self, user_message: str, follows_answer: str) -> Optional[Tuple[str, int]]:
+        """
+        Find the open answer a reply follows from.
+
+        Args:
+            user_message: The user's message before the reply
+            follows_answer: The answer the model says it follows from
+
+        Returns:
+            (question ID, answer index), or None if no open answer matches
+        """
+        candidates = []
+        if self.last_question is not None:
+            answers = self.nodes[self.last_question]["answers"]
+            words = user_message.strip().split()
+            number = words[0].rstrip(".):") if words else ""
+            if number.isdecimal() and 1 <= int(number) <= len(answers):
+                candidates.append(int(number) - 1)
+            folded = user_message.strip().casefold()
+            for i, answer in enumerate(answers):
+                text = answer["text"].casefold()
+                if follows_answer.casefold() == text:
+                    candidates.insert(0, i)
+                elif folded == text or (len(text) > 3 and text in folded):
+                    candidates.append(i)
+            for i in candidates:
+                if answers[i]["next_node_id"] is None:
+                    return self.last_question, i
+
+        # The user went back to an earlier question
+        if follows_answer:
+            wanted = follows_answer.casefold()
+            for node_id, i in reversed(self.open_answers):
+                if self.nodes[node_id]["answers"][i]["text"].casefold() == wanted:
+                    return node_id, i
+        return None
+
+    def add_reply(self, user_message: str, reply: Dict[str, Any]) -> Optional[str]:
+        """
+        Merge a structured reply into the tree.
+
+        Args:
+            user_message: The user's message the reply answers
+            reply: Reply from parse_reply
+
+        Returns:
+            ID of the new node, or None if the reply holds no question with
+            answers and no recommendation
+        """
+        self.replies += 1
+        if reply["question"] and len(reply["answers"]) >= 2:
+            node_id = f"Q{self.current_id}"
+            node = {"text": reply["question"], "is_result": False,
+                    "answers": [{"text": answer, "next_node_id": None} for answer in reply["answers"]]}
+        elif reply["result"] and not reply["answers"]:
+            node_id = f"R{self.result_id}"
+            node = {"text": reply["result"], "is_result": True, "answers": []}
+        else:
+            return None
+
+        parent = self._choose_answer(user_message, reply["follows_answer"]) if self.nodes else None
+        if self.nodes and parent is None and node["is_result"]:
+            # A recommendation that follows from no open answer cannot be placed
+            return None
+
+        if node["is_result"]:
+            self.result_id += 1
+        else:
+            self.current_id += 1
+            self.last_question = node_id
+            self.open_answers.extend((node_id, i) for i in range(len(node["answers"])))
+        self.nodes[node_id] = node
+
+        if parent is not None:
+            parent_id, i = parent
+            self.nodes[parent_id]["answers"][i]["next_node_id"] = node_id
+            self.open_answers.remove(parent)
+        return node_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the tree for export, with placeholder results for unexplored answers.
+
+        The tree itself is not changed, so it can keep growing after an export.
+
+        Returns:
+            The tree in the structure used by format_decision_tree
+        """
+        nodes = {node_id: {"text": node["text"], "is_result": node["is_result"],
+                           "answers": [dict(answer) for answer in node["answers"]]}
+                 for node_id, node in self.nodes.items()}
+        result_id = self.result_id
+        for node_id, i in self.open_answers:
+            answer = nodes[node_id]["answers"][i]
+            placeholder = f"R{result_id}"
+            result_id += 1
+            nodes[placeholder] = {"text": f"{PLACEHOLDER_PREFIX} {answer['text']}", "is_result": True, "answers": []}
+            answer["next_node_id"] = placeholder
+        return {"nodes": nodes, "current_id": self.current_id, "result_id": result_id}
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Decision Log - An append-only store of completed decision paths.
+
+Saving every finished path as its own Markdown file leaves thousands of tiny
+files that are slow to write, list and analyze. A decision log keeps all of
+them in one file instead. Each path is recorded as the vector of answer
+indices chosen at each step (0-based, as used by batch_eval), together with
+the time it was saved and the SHA-256 hash of the tree file it was taken
+through. The Markdown report of any record can be rendered on demand by
+replaying its answers through the same tree.
+
+Records are buffered in memory and written as blocks. A block is written
+with a single append and one ``fsync`` when it holds ``block_records``
+records, by a background timer ``flush_seconds`` after the oldest buffered
+record was appended, on ``flush``/``close``, and when the process exits.
+
+Layout (little-endian):
+
+    file header     magic "DLOG", version
+    block header    magic "DLB1", payload length, record count, tree count,
+                    answer width, CRC-32 of the payload
+    tree hashes     32 bytes[tree_count]    SHA-256 of each tree file in the block
+    times           int64[record_count]     milliseconds since the epoch
+    tree refs       uint16[record_count]    position of the record's tree hash
+    lengths         uint32[record_count]    number of answers of each record
+    answers         uint8/16/32[sum(lengths)], concatenated answer indices
+
+Blocks are columnar, so counting the records of one tree reads the tree
+refs and answers columns without decoding records one by one. A block that
+was cut short by a crash fails its CRC and is skipped by readers, which
+resume at the next block header.
+
+Usage:
+    python decision_tree.py food_safety.txt --log decisions.dlog
+    python decision_log.py stats decisions.dlog food_safety.txt
+    python decision_log.py export decisions.dlog food_safety.txt --record -1 -o path.md
+"""
+import os
+import sys
+import mmap
+import time
+import zlib
+import atexit
+import struct
+import argparse
+import datetime
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from decision_tree import DecisionTree, NavigationSession, FLAG_DEFINED, FLAG_RESULT, format_path_markdown
+from tree_cache import get_cache_key
+from tree_include import is_include, resolve_include
+
+LOG_MAGIC = b"DLOG"
+LOG_VERSION = 1
+BLOCK_MAGIC = b"DLB1"
+
+DEFAULT_BLOCK_RECORDS = 1024
+DEFAULT_FLUSH_SECONDS = 1.0
+
+# magic, version
+_FILE_HEADER = struct.Struct("<4sH2x")
+# magic, payload length, record count, tree count, answer width, CRC-32 of the payload
+_BLOCK_HEADER = struct.Struct("<4sIIHB1xI")
+_HASH_SIZE = 32
+_ANSWER_TYPECODES = {1: "B", 2: "H", 4: "I"}
+
+# Logs with records to write when the process exits
+_open_logs: Set["DecisionLog"] = set()
+
+
+def _to_bytes(values: array) -> bytes:
+    """Encode an array in little-endian byte order."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    """Decode a little-endian array."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def get_tree_hash(file_path: str) -> bytes:
+    """
+    Get the content hash recorded with the paths taken through a tree file.
+
+    Args:
+        file_path: Path to the decision tree file
+
+    Returns:
+        The SHA-256 digest of the file
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    return bytes.fromhex(get_cache_key(file_path)[3])
+
+
+def get_answer_vector(session: NavigationSession) -> List[int]:
+    """
+    Get the answer indices of a session's path.
+
+    Args:
+        session: The navigation session
+
+    Returns:
+        The 0-based index of the answer chosen at each step
+    """
+    tree = session.tree
+    return [answer - tree.answer_starts[node]
+            for node, answer in zip(session.path_nodes, session.path_answers[1:])]
+
+
+class LogRecord(NamedTuple):
+    """One completed path read from a decision log."""
+    timestamp: float   # Seconds since the epoch
+    tree_hash: bytes
+    answers: List[int]
+
+
+class LogBlock(NamedTuple):
+    """The decoded columns of one block."""
+    tree_hashes: List[bytes]
+    times: array       # Milliseconds since the epoch
+    tree_refs: array
+    lengths: array
+    answers: array
+
+
+class DecisionLog:
+    """Appends completed paths to a decision log file in blocks."""
+
+    def __init__(self, file_path: str, block_records: int = DEFAULT_BLOCK_RECORDS,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS, sync: bool = True):
+        """
+        Open a decision log for appending, creating it if needed.
+
+        Args:
+            file_path: Path to the log file
+            block_records: Number of records buffered before a block is written
+            flush_seconds: Age of the oldest buffered record after which the
+                block is written, even if no more records are appended
+            sync: Whether to fsync every written block
+
+        Raises:
+            ValueError: If the file exists and is not a decision log
+        """
+        self.file_path = file_path
+        self.block_records = block_records
+        self.flush_seconds = flush_seconds
+        self.sync = sync
+        self.blocks_written = 0
+        self.records_written = 0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._clear()
+
+        self._fd = os.open(file_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            header = os.pread(self._fd, _FILE_HEADER.size, 0)
+            if not header:
+                os.write(self._fd, _FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+            elif header[:4] != LOG_MAGIC:
+                raise ValueError(f"Not a decision log: {file_path}")
+        except BaseException:
+            os.close(self._fd)
+            raise
+        _open_logs.add(self)
+
+    def _clear(self):
+        """Empty the record buffer and stop its flush timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._hashes: Dict[bytes, int] = {}
+        self._times = array("q")
+        self._refs = array("H")
+        self._lengths = array("I")
+        self._answers = array("I")
+        self._oldest = 0.0
+
+    def __enter__(self) -> "DecisionLog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        """Number of records not written yet."""
+        return len(self._times)
+
+    def append(self, answers: Sequence[int], tree_hash: bytes, timestamp: Optional[float] = None):
+        """
+        Append a completed path.
+
+        Args:
+            answers: The 0-based index of the answer chosen at each step
+            tree_hash: Hash of the tree file from get_tree_hash
+            timestamp: When the path was completed, in seconds since the epoch (default: now)
+
+        Raises:
+            ValueError: If the log is closed or the hash is not a SHA-256 digest
+        """
+        if len(tree_hash) != _HASH_SIZE:
+            raise ValueError("Tree hash must be a SHA-256 digest")
+        now = time.monotonic()
+        with self._lock:
+            if self._fd < 0:
+                raise ValueError("Decision log is closed")
+            if tree_hash not in self._hashes and len(self._hashes) == 0xFFFF:
+                self._write_block()
+            if not self._times:
+                self._oldest = now
+            self._times.append(round((time.time() if timestamp is None else timestamp) * 1000))
+            self._refs.append(self._hashes.setdefault(tree_hash, len(self._hashes)))
+            self._lengths.append(len(answers))
+            self._answers.extend(answers)
+            if len(self._times) >= self.block_records or now - self._oldest >= self.flush_seconds:
+                self._write_block()
+            elif self._timer is None:
+                # Write the block when the oldest record is due, even if nothing else is appended
+                self._timer = threading.Timer(self.flush_seconds - (now - self._oldest), self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def append_session(self, session: NavigationSession, tree_hash: bytes, timestamp: Optional[float] = None):
+        """
+        Append the current path of a session.
+
+        Args:
+            session: The navigation session, usually at a result
+            tree_hash: Hash of the session's tree file from get_tree_hash
+            timestamp: When the path was completed, in seconds since the epoch (default: now)
+        """
+        self.append(get_answer_vector(session), tree_hash, timestamp)
+
+    def _write_block(self):
+        """Write the buffered records as one block. The lock must be held."""
+        if not self._times:
+            return
+        largest = max(self._answers, default=0)
+        width = 1 if largest < 0x100 else 2 if largest < 0x10000 else 4
+        payload = b"".join([
+            *self._hashes,
+            _to_bytes(self._times),
+            _to_bytes(self._refs),
+            _to_bytes(self._lengths),
+            _to_bytes(array(_ANSWER_TYPECODES[width], self._answers)),
+        ])
+        header = _BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), len(self._times), len(self._hashes),
+                                    width, zlib.crc32(payload))
+        os.write(self._fd, header + payload)
+        if self.sync:
+            os.fsync(self._fd)
+        self.blocks_written += 1
+        self.records_written += len(self._times)
+        self._clear()
+
+    def _flush_due(self):
+        """Write the buffered records when the flush timer fires."""
+        with self._lock:
+            self._timer = None
+            if self._fd >= 0:
+                self._write_block()
+
+    def flush(self):
+        """Write the buffered records."""
+        with self._lock:
+            if self._fd >= 0:
+                self._write_block()
+
+    def close(self):
+        """Write the buffered records and close the file."""
+        with self._lock:
+            if self._fd < 0:
+                return
+            try:
+                self._write_block()
+            finally:
+                os.close(self._fd)
+                self._fd = -1
+        _open_logs.discard(self)
+
+
+@atexit.register
+def close_logs():
+    """Write the records still buffered by every open log."""
+    for log in list(_open_logs):
+        log.close()
+
+
+def read_blocks(file_path: str, skipped: Optional[List[int]] = None) -> Iterator[LogBlock]:
+    """
+    Read the blocks of a decision log.
+
+    Args:
+        file_path: Path to the log file
+        skipped: List to which the file offset of every damaged block is appended
+
+    Yields:
+        The decoded blocks, in the order they were written
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not a decision log
+    """
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < _FILE_HEADER.size or file.read(4) != LOG_MAGIC:
+            raise ValueError(f"Not a decision log: {file_path}")
+        # Mapped rather than read, so only one block at a time is copied into memory
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with data:
+        offset = _FILE_HEADER.size
+        while offset + _BLOCK_HEADER.size <= len(data):
+            magic, length, count, tree_count, width, crc = _BLOCK_HEADER.unpack_from(data, offset)
+            start = offset + _BLOCK_HEADER.size
+            payload = data[start:start + length]
+            if (magic != BLOCK_MAGIC or width not in _ANSWER_TYPECODES or len(payload) != length
+                    or zlib.crc32(payload) != crc):
+                if skipped is not None:
+                    skipped.append(offset)
+                # Resume at the next block header
+                next_block = data.find(BLOCK_MAGIC, offset + 1)
+                if next_block < 0:
+                    break
+                offset = next_block
+                continue
+
+            view = memoryview(payload)
+            position = tree_count * _HASH_SIZE
+            hashes = [payload[i:i + _HASH_SIZE] for i in range(0, position, _HASH_SIZE)]
+            columns = []
+            for typecode, size in (("q", 8), ("H", 2), ("I", 4)):
+                columns.append(_from_bytes(typecode, view[position:position + count * size]))
+                position += count * size
+            answers = _from_bytes(_ANSWER_TYPECODES[width], view[position:])
+            view.release()
+            yield LogBlock(hashes, *columns, answers)
+            offset = start + length
+
+
+def iter_records(file_path: str, tree_hash: Optional[bytes] = None) -> Iterator[LogRecord]:
+    """
+    Read the records of a decision log.
+
+    Args:
+        file_path: Path to the log file
+        tree_hash: Only read the records of this tree (default: all records)
+
+    Yields:
+        The records, in the order they were written
+    """
+    for block in read_blocks(file_path):
+        wanted = None if tree_hash is None else (block.tree_hashes.index(tree_hash)
+                                                 if tree_hash in block.tree_hashes else -1)
+        if wanted == -1:
+            continue
+        end = 0
+        for millis, ref, length in zip(block.times, block.tree_refs, block.lengths):
+            start, end = end, end + length
+            if wanted is None or ref == wanted:
+                yield LogRecord(millis / 1000, block.tree_hashes[ref], block.answers[start:end].tolist())
+
+
+class DecisionCounts(NamedTuple):
+    """How often each answer and result of a tree was chosen."""
+    records: int                        # Records of the tree
+    invalid: int                        # Records whose answers do not fit the tree
+    edges: Dict[Tuple[str, int], int]   # (question ID, answer index) -> count
+    results: Dict[str, int]             # Result ID -> count
+
+
+def count_decisions(file_path: str, tree: DecisionTree, tree_hash: bytes,
+                    since: Optional[float] = None, until: Optional[float] = None) -> DecisionCounts:
+    """
+    Count the answers and results chosen in the records of one tree.
+
+    Identical paths are counted first from the raw answer columns, then every
+    distinct path is replayed through the tree once.
+
+    Args:
+        file_path: Path to the log file
+        tree: The decision tree the records were taken through
+        tree_hash: Hash of the tree file from get_tree_hash
+        since: Only count records saved at or after this time, in seconds since the epoch
+        until: Only count records saved before this time, in seconds since the epoch
+
+    Returns:
+        The counts
+
+    Raises:
+        ValueError: If the tree has no start node
+    """
+    if tree.start_node_id is None:
+        raise ValueError("Decision tree has no start node")
+
+    paths: Counter = Counter()
+    since_ms = None if since is None else since * 1000
+    until_ms = None if until is None else until * 1000
+    for block in read_blocks(file_path):
+        if tree_hash not in block.tree_hashes:
+            continue
+        wanted = block.tree_hashes.index(tree_hash)
+        raw = block.answers.tobytes()
+        width = block.answers.itemsize
+        ends = array("Q", [0])
+        for length in block.lengths:
+            ends.append(ends[-1] + length * width)
+        every = len(block.tree_hashes) == 1 and since_ms is None and until_ms is None
+        paths.update(
+            (block.answers.typecode, raw[ends[i]:ends[i + 1]])
+            for i in range(len(block.lengths))
+            if every or (block.tree_refs[i] == wanted
+                         and (since_ms is None or block.times[i] >= since_ms)
+                         and (until_ms is None or block.times[i] < until_ms))
+        )
+
+    start = tree.index_of(tree.start_node_id)
+    edges: Counter = Counter()
+    results: Counter = Counter()
+    invalid = 0
+    for (typecode, raw), count in paths.items():
+        node, steps = start, []
+        for answer in array(typecode, raw):
+            if tree.node_flags[node] & FLAG_RESULT or answer >= tree.answer_counts[node]:
+                break
+            steps.append((node, answer))
+            node = tree.answer_targets[tree.answer_starts[node] + answer]
+            if not tree.node_flags[node] & FLAG_DEFINED:
+                if not is_include(tree.node_ids[node]):
+                    break
+                try:
+                    resolve_include(tree, node)
+                except (OSError, ValueError):
+                    break
+        else:
+            for step_node, answer in steps:
+                edges[tree.node_ids[step_node], answer] += count
+            if tree.node_flags[node] & FLAG_RESULT:
+                results[tree.node_ids[node]] += count
+            continue
+        invalid += count
+    return DecisionCounts(sum(paths.values()), invalid, dict(edges), dict(results))
+
+
+def replay_answers(tree: DecisionTree, answers: Sequence[int]) -> NavigationSession:
+    """
+    Rebuild the session of a recorded path.
+
+    Args:
+        tree: The decision tree the path was taken through
+        answers: The 0-based index of the answer chosen at each step
+
+    Returns:
+        A session at the end of the path
+
+    Raises:
+        ValueError: If the answers do not fit the tree
+    """
+    session = NavigationSession(tree)
+    session.navigate_to_start()
+    for step, answer in enumerate(answers):
+        if not session.select_answer(answer) and step < len(answers) - 1:
+            raise ValueError("Recorded path continues past a result")
+    return session
+
+
+def print_stats(counts: DecisionCounts, tree: DecisionTree, top: int):
+    """Print the result and answer counts of a tree."""
+    print(f"{counts.records} paths, {counts.invalid} not matching the tree")
+    total = sum(counts.results.values())
+    if total:
+        print("\nResults:")
+        for node_id, count in sorted(counts.results.items(), key=lambda item: -item[1])[:top]:
+            print(f"  {count:>8}  {count / total:6.1%}  {node_id}: {tree.nodes[node_id].text}")
+
+    # Paths that stop before a result still count for the answers they chose
+    answer_lines = []
+    for node_id in tree.nodes:
+        node = tree.nodes[node_id]
+        answered = [(i, counts.edges.get((node_id, i), 0)) for i in range(len(node.answers))]
+        reached = sum(count for _, count in answered)
+        if not reached:
+            continue
+        answer_lines.append(f"  {node_id}: {node.text} ({reached})")
+        answer_lines.extend(f"    {count:>8}  {count / reached:6.1%}  {node.answers[i][0]}"
+                            for i, count in answered)
+    if answer_lines:
+        print("\nAnswers:")
+        print("\n".join(answer_lines))
+
+
+def main():
+    """Query a decision log from the command line."""
+    parser = argparse.ArgumentParser(description="Summarize or export the paths in a decision log")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    info = subparsers.add_parser("info", help="Show the blocks, records and trees of a log")
+    info.add_argument("log", help="Decision log file")
+
+    stats = subparsers.add_parser("stats", help="Count the answers and results chosen in a tree")
+    stats.add_argument("log", help="Decision log file")
+    stats.add_argument("tree", help="Decision tree file the paths were taken through")
+    stats.add_argument("--since", help="Only count paths saved on or after this date (YYYY-MM-DD)")
+    stats.add_argument("--until", help="Only count paths saved before this date (YYYY-MM-DD)")
+    stats.add_argument("--top", type=int, default=20, help="Number of results listed (default: 20)")
+
+    export = subparsers.add_parser("export", help="Write the Markdown report of a recorded path")
+    export.add_argument("log", help="Decision log file")
+    export.add_argument("tree", help="Decision tree file the path was taken through")
+    export.add_argument("--record", type=int, default=-1,
+                        help="Position of the path among the tree's records, negative from the end (default: -1)")
+    export.add_argument("--output", "-o", help="Markdown file to write (default: print the report)")
+    args = parser.parse_args()
+
+    # Imported here because it builds on decision_tree
+    from compiled_tree import load_tree
+
+    try:
+        if args.command == "info":
+            skipped: List[int] = []
+            blocks = records = 0
+            trees: Counter = Counter()
+            for block in read_blocks(args.log, skipped):
+                blocks += 1
+                records += len(block.lengths)
+                trees.update(block.tree_hashes[ref] for ref in block.tree_refs)
+            print(f"{records} paths in {blocks} blocks, {os.path.getsize(args.log)} bytes")
+            for tree_hash, count in trees.most_common():
+                print(f"  {tree_hash.hex()[:16]}  {count} paths")
+            if skipped:
+                print(f"Skipped {len(skipped)} damaged blocks")
+            return
+
+        tree = load_tree(args.tree)
+        tree_hash = get_tree_hash(args.tree)
+        if args.command == "stats":
+            since = datetime.datetime.fromisoformat(args.since).timestamp() if args.since else None
+            until = datetime.datetime.fromisoformat(args.until).timestamp() if args.until else None
+            print_stats(count_decisions(args.log, tree, tree_hash, since, until), tree, args.top)
+            return
+
+        records = list(iter_records(args.log, tree_hash))
+        if not -len(records) <= args.record < len(records):
+            print(f"Error: The log has {len(records)} paths for {args.tree}")
+            sys.exit(1)
+        record = records[args.record]
+        report = format_path_markdown(replay_answers(tree, record.answers), args.tree,
+                                      datetime.datetime.fromtimestamp(record.timestamp))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                file.write(report)
+            print(f"Decision path saved to: {args.output}")
+        else:
+            print(report, end="")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,11 @@ the user through a series of questions, displaying the decision path as a tree.
 """
 import sys
 import os
-import re
 import argparse
 import datetime
-from typing import Dict, List, Optional, Tuple, Union
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 # ANSI color codes
 class Colors:
@@ -28,7 +29,9 @@ class Colors:
 class Node:
     """Represents a node (question or result) in the decision tree."""
     
-    def __init__(self, node_id: str, text: str, is_result: bool = False):
+    __slots__ = ('id', 'text', 'is_result', 'answers', 'index')
+    
+    def __init__(self, node_id: str, text: str, is_result: bool = False, index: Optional[int] = None):
         """
         Initialize a node in the decision tree.
         
@@ -36,11 +39,13 @@ class Node:
             node_id: Unique identifier for the node
             text: Text content of the node (question or result)
             is_result: Whether this node is a result node
+            index: Position of the node in its tree's node arrays, if any
         """
         self.id = node_id
         self.text = text
         self.is_result = is_result
         self.answers = []  # List of (answer_text, next_node_id) tuples
+        self.index = index
     
     def add_answer(self, text: str, next_node_id: str):
         """
@@ -59,65 +64,293 @@ class Node:
         return f"{self.id}: {self.text}"
 
 
+# Bits of DecisionTree.node_flags
+FLAG_DEFINED = 1
+FLAG_RESULT = 2
+
+# Answer targets starting with this refer to another tree file (see tree_include.py)
+INCLUDE_PREFIX = "@"
+
+
+class NodeView(Mapping):
+    """
+    Read-only mapping of node IDs to nodes, built on demand from a tree's arrays.
+    
+    Each lookup returns a new Node snapshot; changing it does not change the
+    tree. Use DecisionTree.add_node to add nodes.
+    """
+    
+    __slots__ = ('_tree',)
+    
+    def __init__(self, tree: "DecisionTree"):
+        """
+        Initialize the view.
+        
+        Args:
+            tree: The tree whose nodes are exposed
+        """
+        self._tree = tree
+    
+    def __getitem__(self, node_id: str) -> Node:
+        index = self._tree.index_of(node_id)
+        if index is None or not self._tree.node_flags[index] & FLAG_DEFINED:
+            raise KeyError(node_id)
+        return self._tree.get_node(index)
+    
+    def __contains__(self, node_id) -> bool:
+        index = self._tree.index_of(node_id)
+        return index is not None and bool(self._tree.node_flags[index] & FLAG_DEFINED)
+    
+    def __iter__(self) -> Iterator[str]:
+        tree = self._tree
+        flags = tree.node_flags
+        for index in range(len(flags)):
+            if flags[index] & FLAG_DEFINED:
+                yield tree.node_ids[index]
+    
+    def __len__(self) -> int:
+        return self._tree.defined_count
+
+
 class DecisionTree:
-    """Manages the decision tree structure and navigation."""
+    """
+    Holds the decision tree structure.
+    
+    Nodes are stored as parallel arrays indexed by a dense integer node index
+    assigned at parse time, and answers are stored in CSR form: the answers of
+    node ``i`` are positions ``answer_starts[i]`` to
+    ``answer_starts[i] + answer_counts[i] - 1`` of the answer arrays. Answer
+    targets are node indices, and repeated answer texts share one string.
+    
+    IDs that are referenced by an answer but never defined get a node index
+    without FLAG_DEFINED, so that selecting such an answer can still report
+    the missing ID.
+    
+    The source line of every node and answer is kept for error reporting
+    (0 when unknown, e.g. for nodes added with add_node).
+    
+    A tree is not modified by navigation, so one instance can be shared by
+    any number of NavigationSession objects. The only exception are included
+    files (answers leading to ``@<path>``), whose nodes are added to the tree
+    when an answer leading into them is first selected.
+    """
     
     def __init__(self):
         """Initialize an empty decision tree."""
-        self.nodes: Dict[str, Node] = {}
+        self.nodes = NodeView(self)
         self.start_node_id: Optional[str] = None
-        self.current_path: List[Tuple[Node, Optional[str]]] = []  # List of (node, answer) tuples
+        self.defined_count = 0
+        
+        # Node arrays, indexed by node index
+        self.node_ids: List[str] = []
+        self.node_texts: List[Optional[str]] = []
+        self.node_flags = bytearray()
+        self.answer_starts = array('I')
+        self.answer_counts = array('I')
+        self.node_lines = array('I')
+        
+        # Answer arrays, indexed by answer position
+        self.answer_texts: List[str] = []
+        self.answer_targets = array('I')
+        self.answer_lines = array('I')
+        
+        # (node_id, previous_line, line) for every ID defined more than once
+        self.duplicates: List[Tuple[str, int, int]] = []
+        
+        # File the tree was read from, used to find included files
+        self.source_path: Optional[str] = None
+        
+        self._index: Dict[str, int] = {}
+        self._strings: Dict[str, str] = {}
+    
+    def index_of(self, node_id: str) -> Optional[int]:
+        """
+        Get the node index of a node ID.
+        
+        Args:
+            node_id: The node ID to look up
+        
+        Returns:
+            The node index, or None if the ID is unknown
+        """
+        return self._index.get(node_id)
+    
+    def _reserve(self, node_id: str) -> int:
+        """Get the node index of an ID, adding an undefined placeholder if needed."""
+        index = self._index.get(node_id)
+        if index is None:
+            index = self._index[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+            self.node_texts.append(None)
+            self.node_flags.append(0)
+            self.answer_starts.append(0)
+            self.answer_counts.append(0)
+            self.node_lines.append(0)
+        return index
     
     def add_node(self, node: Node):
         """
         Add a node to the decision tree.
         
+        The node's answers are copied into the tree, so they must be complete
+        before the node is added. Adding a node with an existing ID replaces it.
+        
         Args:
             node: The node to add
         """
-        self.nodes[node.id] = node
+        index = self._reserve(node.id)
+        if not self.node_flags[index] & FLAG_DEFINED:
+            self.defined_count += 1
+        self.node_texts[index] = node.text
+        self.node_flags[index] = FLAG_DEFINED | (FLAG_RESULT if node.is_result else 0)
+        self.answer_starts[index] = len(self.answer_texts)
+        self.answer_counts[index] = len(node.answers)
+        self.node_lines[index] = 0
+        for answer_text, next_node_id in node.answers:
+            self.answer_texts.append(self._strings.setdefault(answer_text, answer_text))
+            self.answer_targets.append(self._reserve(next_node_id))
+            self.answer_lines.append(0)
+        
         # Set the first non-result node as the start node if not already set
         if self.start_node_id is None and not node.is_result:
             self.start_node_id = node.id
     
+    def get_node(self, index: int) -> Node:
+        """
+        Build a Node snapshot of the node at an index.
+        
+        Args:
+            index: Node index of a defined node
+        
+        Returns:
+            The node, with its answers as (answer_text, next_node_id) tuples
+        """
+        node = Node(self.node_ids[index], self.node_texts[index],
+                    bool(self.node_flags[index] & FLAG_RESULT), index)
+        start = self.answer_starts[index]
+        node_ids = self.node_ids
+        answer_texts = self.answer_texts
+        answer_targets = self.answer_targets
+        node.answers = [(answer_texts[i], node_ids[answer_targets[i]])
+                        for i in range(start, start + self.answer_counts[index])]
+        return node
+    
+    def get_node_counts(self) -> Tuple[int, int]:
+        """
+        Count the question and result nodes in the tree.
+        
+        Returns:
+            A (question_count, result_count) tuple
+        """
+        flags = bytes(self.node_flags)
+        return flags.count(FLAG_DEFINED), flags.count(FLAG_DEFINED | FLAG_RESULT)
+    
+    def estimate_memory(self) -> int:
+        """
+        Estimate the memory used by the tree structure.
+        
+        Returns:
+            Approximate size in bytes
+        """
+        size = sum(sys.getsizeof(column) for column in (
+            self.node_ids, self.node_texts, self.node_flags, self.answer_starts, self.answer_counts,
+            self.node_lines, self.answer_texts, self.answer_targets, self.answer_lines,
+            self._index, self._strings))
+        size += sum(sys.getsizeof(node_id) for node_id in self.node_ids)
+        size += sum(sys.getsizeof(text) for text in self.node_texts if text is not None)
+        size += sum(sys.getsizeof(text) for text in self._strings)
+        return size
+
+
+class NavigationSession:
+    """
+    Tracks one user's path through a shared, read-only decision tree.
+    
+    The path is stored as two small integer arrays: the node index of each
+    step and the answer position that led to it.
+    """
+    
+    __slots__ = ('tree', 'path_nodes', 'path_answers', '_fragments', '_rendered')
+    
+    def __init__(self, tree: DecisionTree):
+        """
+        Initialize a navigation session.
+        
+        Args:
+            tree: The decision tree to navigate
+        """
+        self.tree = tree
+        self.path_nodes = array('I')    # Node index of each step
+        self.path_answers = array('i')  # Answer position leading to each step, -1 for the start
+        # Rendered fragments of each step by output kind, kept in step with the path
+        self._fragments: Dict[str, List[str]] = {}
+        # Complete rendered outputs by kind, valid until the path changes
+        self._rendered: Dict[str, str] = {}
+    
+    @property
+    def current_path(self) -> List[Tuple[Node, Optional[str]]]:
+        """The current path as a list of (node, answer) tuples."""
+        tree = self.tree
+        return [(tree.get_node(index), tree.answer_texts[answer] if answer >= 0 else None)
+                for index, answer in zip(self.path_nodes, self.path_answers)]
+    
     def navigate_to_start(self):
         """Reset navigation to the start of the tree."""
-        if self.start_node_id is None:
+        if self.tree.start_node_id is None:
             raise ValueError("Decision tree has no start node")
-        self.current_path = [(self.nodes[self.start_node_id], None)]
+        self.path_nodes = array('I', [self.tree.index_of(self.tree.start_node_id)])
+        self.path_answers = array('i', [-1])
+        self._fragments.clear()
+        self._rendered.clear()
     
     def get_current_node(self) -> Node:
         """Get the current node in the navigation."""
-        if not self.current_path:
+        if not self.path_nodes:
             self.navigate_to_start()
-        return self.current_path[-1][0]
+        return self.tree.get_node(self.path_nodes[-1])
     
     def select_answer(self, answer_index: int) -> bool:
         """
         Select an answer and move to the next node.
         
+        An answer leading to an included file loads that file first.
+        
         Args:
             answer_index: Index of the answer to select (0-based)
         
         Returns:
             True if navigation continues, False if a result node is reached
+        
+        Raises:
+            ValueError: If the answer index is invalid, the next node is not
+                defined, or an included file is invalid
+            FileNotFoundError: If an included file doesn't exist
         """
-        current_node = self.get_current_node()
+        if not self.path_nodes:
+            self.navigate_to_start()
+        tree = self.tree
+        current = self.path_nodes[-1]
         
-        if current_node.is_result:
+        if tree.node_flags[current] & FLAG_RESULT:
             return False
         
-        if answer_index < 0 or answer_index >= len(current_node.answers):
+        if answer_index < 0 or answer_index >= tree.answer_counts[current]:
             raise ValueError(f"Invalid answer index: {answer_index}")
         
-        answer_text, next_node_id = current_node.answers[answer_index]
-        next_node = self.nodes.get(next_node_id)
+        answer = tree.answer_starts[current] + answer_index
+        next_index = tree.answer_targets[answer]
         
-        if next_node is None:
-            raise ValueError(f"Node not found: {next_node_id}")
+        if not tree.node_flags[next_index] & FLAG_DEFINED:
+            if not tree.node_ids[next_index].startswith(INCLUDE_PREFIX):
+                raise ValueError(f"Node not found: {tree.node_ids[next_index]}")
+            # Imported here because tree_include builds on the classes defined above
+            from tree_include import resolve_include
+            resolve_include(tree, next_index)
         
-        self.current_path.append((next_node, answer_text))
-        return not next_node.is_result
+        self.path_nodes.append(next_index)
+        self.path_answers.append(answer)
+        self._rendered.clear()
+        return not tree.node_flags[next_index] & FLAG_RESULT
     
     def go_back(self) -> bool:
         """
@@ -126,44 +359,240 @@ class DecisionTree:
         Returns:
             True if successful, False if already at the start
         """
-        if len(self.current_path) <= 1:
+        if len(self.path_nodes) <= 1:
             return False
         
-        self.current_path.pop()
+        self.path_nodes.pop()
+        self.path_answers.pop()
+        depth = len(self.path_nodes)
+        for fragments in self._fragments.values():
+            del fragments[depth:]
+        self._rendered.clear()
         return True
     
-    def get_path_display(self) -> str:
+    def rebase(self, tree: DecisionTree) -> int:
+        """
+        Move the session to a new version of its decision tree.
+        
+        Each step of the path is looked up by node ID in the new tree. A step
+        is kept if the previous node still has an answer leading to it,
+        preferring an answer with the same text; the path is cut at the first
+        step that no longer exists.
+        
+        Args:
+            tree: The new version of the decision tree
+        
+        Returns:
+            Number of steps of the old path that were kept, 0 if the session
+            had to restart because the start node changed
+        """
+        old_tree = self.tree
+        path_ids = [old_tree.node_ids[index] for index in self.path_nodes]
+        path_texts = [old_tree.answer_texts[answer] if answer >= 0 else None for answer in self.path_answers]
+        
+        self.tree = tree
+        self._fragments.clear()
+        self._rendered.clear()
+        
+        if tree.start_node_id is None:
+            self.path_nodes = array('I')
+            self.path_answers = array('i')
+            return 0
+        if not path_ids or path_ids[0] != tree.start_node_id:
+            self.navigate_to_start()
+            return 0
+        
+        path_nodes = array('I', [tree.index_of(tree.start_node_id)])
+        path_answers = array('i', [-1])
+        for node_id, answer_text in zip(path_ids[1:], path_texts[1:]):
+            target = tree.index_of(node_id)
+            if target is not None and not tree.node_flags[target] & FLAG_DEFINED and node_id.startswith(INCLUDE_PREFIX):
+                # The new version has not loaded this included file yet
+                from tree_include import resolve_include
+                try:
+                    resolve_include(tree, target)
+                except (OSError, ValueError):
+                    break
+            if target is None or not tree.node_flags[target] & FLAG_DEFINED:
+                break
+            previous = path_nodes[-1]
+            start = tree.answer_starts[previous]
+            matches = [answer for answer in range(start, start + tree.answer_counts[previous])
+                       if tree.answer_targets[answer] == target]
+            if not matches:
+                break
+            same_text = [answer for answer in matches if tree.answer_texts[answer] == answer_text]
+            path_nodes.append(target)
+            path_answers.append((same_text or matches)[0])
+        
+        self.path_nodes = path_nodes
+        self.path_answers = path_answers
+        return len(path_nodes)
+    
+    def _get_fragments(self, kind: str) -> List[str]:
+        """
+        Get the rendered fragments of every step for one output kind.
+        
+        Fragments are rendered once per step: steps added since the last call
+        are appended, and go_back truncates the lists, so each step costs
+        constant work no matter how often the path is displayed.
+        
+        Args:
+            kind: ``colored``, ``plain``, ``mermaid_nodes`` or ``mermaid_edges``
+        
+        Returns:
+            One fragment per step of the path
+        """
+        fragments = self._fragments.setdefault(kind, [])
+        for step in range(len(fragments), len(self.path_nodes)):
+            fragments.append(self._render_step(kind, step))
+        return fragments
+    
+    def _render_step(self, kind: str, step: int) -> str:
+        """Render one step of the path for one output kind."""
+        tree = self.tree
+        index = self.path_nodes[step]
+        answer = self.path_answers[step]
+        text = tree.node_texts[index]
+        is_result = tree.node_flags[index] & FLAG_RESULT
+        
+        if kind == 'mermaid_nodes':
+            node_text = text.replace('"', "'")
+            return f'    node_{_sanitize_id(tree.node_ids[index])}["{node_text}"]'
+        if kind == 'mermaid_edges':
+            if step == 0 or answer < 0:
+                return ""
+            answer_text = tree.answer_texts[answer].replace('"', "'")
+            previous_id = _sanitize_id(tree.node_ids[self.path_nodes[step - 1]])
+            return f'    node_{previous_id} -->|"{answer_text}"| node_{_sanitize_id(tree.node_ids[index])}'
+        
+        if kind == 'colored':
+            yellow, cyan, green, endc = Colors.YELLOW, Colors.CYAN, Colors.GREEN, Colors.ENDC
+        else:
+            yellow = cyan = green = endc = ""
+        
+        prefix = "    " * step
+        node_line = f"{prefix}└── {green if is_result else cyan}{text}{endc}"
+        if step == 0:
+            return node_line
+        return f"{prefix[:-4]}└── {yellow}{tree.answer_texts[answer]}{endc}\n{node_line}"
+    
+    def get_path_display(self, colored: bool = True) -> str:
         """
         Get a string representation of the current decision path as a tree.
         
+        Args:
+            colored: Whether to include ANSI color codes in the output
+        
         Returns:
             ASCII tree representation of the path
         """
-        if not self.current_path:
+        if not self.path_nodes:
             return "Empty path"
         
-        lines = []
-        for i, (node, answer) in enumerate(self.current_path):
-            prefix = "    " * i
-            if i > 0:
-                lines.append(f"{prefix[:-4]}└── {Colors.YELLOW}{answer}{Colors.ENDC}")
-            
-            if i == len(self.current_path) - 1 and not node.is_result:
-                lines.append(f"{prefix}└── {Colors.CYAN}{node.text}{Colors.ENDC}")
-                lines.append(f"{prefix}    └── {Colors.BOLD}[Awaiting your answer]{Colors.ENDC}")
-            else:
-                if node.is_result:
-                    lines.append(f"{prefix}└── {Colors.GREEN}{node.text}{Colors.ENDC}")
-                else:
-                    lines.append(f"{prefix}└── {Colors.CYAN}{node.text}{Colors.ENDC}")
+        kind = 'colored' if colored else 'plain'
+        display = self._rendered.get(kind)
+        if display is None:
+            lines = list(self._get_fragments(kind))
+            last = len(self.path_nodes) - 1
+            if not self.tree.node_flags[self.path_nodes[last]] & FLAG_RESULT:
+                bold, endc = (Colors.BOLD, Colors.ENDC) if colored else ("", "")
+                lines.append(f"{'    ' * last}    └── {bold}[Awaiting your answer]{endc}")
+            display = self._rendered[kind] = "\n".join(lines)
+        return display
+    
+    def get_mermaid_diagram(self) -> str:
+        """
+        Get a Mermaid flowchart diagram of the current decision path.
+        
+        Returns:
+            Mermaid diagram code as a string
+        """
+        if not self.path_nodes:
+            return "graph TD\n    A[No decision path]"
+        
+        diagram = self._rendered.get('mermaid')
+        if diagram is not None:
+            return diagram
+        
+        tree = self.tree
+        node_ids = [f"node_{_sanitize_id(tree.node_ids[index])}" for index in self.path_nodes]
+        result_ids = [node_id for node_id, index in zip(node_ids, self.path_nodes)
+                      if tree.node_flags[index] & FLAG_RESULT]
         
-        return "\n".join(lines)
+        mermaid_code = ["graph TD"]
+        mermaid_code.extend(self._get_fragments('mermaid_nodes'))
+        mermaid_code.extend(self._get_fragments('mermaid_edges')[1:])
+        mermaid_code.append("")
+        mermaid_code.append("    classDef default fill:#f9f9f9,stroke:#333,stroke-width:1px;")
+        mermaid_code.append("    classDef current fill:#d4f4ff,stroke:#0077b6,stroke-width:2px;")
+        mermaid_code.append("    classDef result fill:#d8f3dc,stroke:#2d6a4f,stroke-width:2px;")
+        mermaid_code.append(f"    class {','.join(node_ids)} current;")
+        if result_ids:
+            mermaid_code.append(f"    class {','.join(result_ids)} result;")
+        
+        diagram = self._rendered['mermaid'] = "\n".join(mermaid_code)
+        return diagram
+
+
+def _sanitize_id(text: str) -> str:
+    """Make a node ID safe for use as a Mermaid node name."""
+    return "".join(c if c.isalnum() else "_" for c in text)
+
+
+class TreeFormatError(ValueError):
+    """Raised by parse_file for a line that is not a valid question, result or answer."""
+    
+    def __init__(self, message: str, line_num: int):
+        """
+        Initialize the error.
+        
+        Args:
+            message: Error message
+            line_num: Number of the offending line (1-based)
+        """
+        super().__init__(message)
+        self.line_num = line_num
+
+
+# Characters allowed after the digits of a node ID
+_ID_SUFFIX_CHARS = "abcdefghijklmnopqrstuvwxyz"
+
+# Number of characters read from the file at a time by parse_file
+PARSE_BUFFER_SIZE = 1 << 20
+
+
+def is_valid_node_id(node_id: str) -> bool:
+    """
+    Check whether a string is a valid node ID.
+    
+    A node ID is ``Q`` or ``R`` followed by one or more digits and an optional
+    lowercase suffix, e.g. ``Q1``, ``R12`` or ``Q0a``.
+    
+    Args:
+        node_id: The candidate node ID
+    
+    Returns:
+        True if the string is a valid node ID
+    """
+    return node_id[:1] in ("Q", "R") and node_id[1:].rstrip(_ID_SUFFIX_CHARS).isdecimal()
 
 
 def parse_file(file_path: str) -> DecisionTree:
     """
     Parse the decision tree file and build the tree structure.
     
+    The file is read in large blocks and each line is classified by its
+    leading characters in a single pass, without regular expressions:
+    
+    - ``Q<n>: text`` or ``R<n>: text`` starts a question or result node
+    - ``A: text -> <id>`` adds an answer to the current question
+    - ``A: text -> @<path>`` adds an answer leading to another tree file,
+      which is loaded when the answer is first selected (see tree_include.py)
+    
+    Nodes and answers are appended straight to the tree's arrays; answer
+    targets are resolved to node indices once the whole file has been read.
+    
     Args:
         file_path: Path to the decision tree file
     
@@ -175,40 +604,137 @@ def parse_file(file_path: str) -> DecisionTree:
         ValueError: If the file format is invalid
     """
     tree = DecisionTree()
-    current_node = None
+    index = tree._index
+    node_ids = tree.node_ids
+    node_texts = tree.node_texts
+    node_flags = tree.node_flags
+    answer_starts = tree.answer_starts
+    answer_counts = tree.answer_counts
+    node_lines = tree.node_lines
+    add_answer_text = tree.answer_texts.append
+    add_answer_line = tree.answer_lines.append
+    target_ids: List[str] = []
+    intern = tree._strings.setdefault
+    
+    current = -1       # Node index of the question receiving answers, -1 if none
+    answer_count = 0   # Answers seen so far for the current question
+    line_num = 0
+    suffix_chars = _ID_SUFFIX_CHARS
     
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
-            for line_num, line in enumerate(file, 1):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse question line
-                question_match = re.match(r'^([QR]\d+[a-z]*):\s+(.+)$', line)
-                if question_match:
-                    node_id, text = question_match.groups()
-                    is_result = node_id.startswith('R')
-                    current_node = Node(node_id, text, is_result)
-                    tree.add_node(current_node)
-                    continue
+            pending = ""
+            while True:
+                block = file.read(PARSE_BUFFER_SIZE)
+                if block:
+                    lines = (pending + block).split("\n")
+                    pending = lines.pop()
+                else:
+                    lines = [pending]
                 
-                # Parse answer line
-                answer_match = re.match(r'^A:\s+(.+?)\s+->\s+([QR]\d+[a-z]*)$', line)
-                if answer_match and current_node and not current_node.is_result:
-                    answer_text, next_node_id = answer_match.groups()
-                    current_node.add_answer(answer_text, next_node_id)
-                    continue
+                for line in lines:
+                    line_num += 1
+                    line = line.strip()
+                    if not line:
+                        continue
+                    
+                    lead = line[0]
+                    
+                    # Answer line: "A: text -> Q2"
+                    if lead == "A":
+                        if current >= 0 and line[1:2] == ":":
+                            # Fast path for the usual single-space layout
+                            head, arrow, next_node_id = line.rpartition(" -> ")
+                            if (arrow and line[2] == " " and next_node_id[:1] in "QR"
+                                    and next_node_id[1:].rstrip(suffix_chars).isdecimal()):
+                                answer_text = head[3:]
+                                if answer_text and not answer_text[0].isspace() and not answer_text[-1].isspace():
+                                    add_answer_text(intern(answer_text, answer_text))
+                                    add_answer_line(line_num)
+                                    target_ids.append(next_node_id)
+                                    answer_count += 1
+                                    continue
+                            
+                            # General layout with arbitrary whitespace around the arrow
+                            arrow = line.rfind("->")
+                            before = line[2:arrow]
+                            after = line[arrow + 2:]
+                            next_node_id = after.lstrip()
+                            if (arrow > 2 and before[:1].isspace() and before[-1].isspace()
+                                    and after[:1].isspace()
+                                    and (next_node_id[:1] in "QR" and next_node_id[1:].rstrip(suffix_chars).isdecimal()
+                                         or next_node_id[:1] == INCLUDE_PREFIX and len(next_node_id) > 1)):
+                                answer_text = before.strip()
+                                if not answer_text and len(before) >= 3:
+                                    # An all-whitespace answer text keeps a single
+                                    # character, as the original line pattern did
+                                    answer_text = before[-2]
+                                if answer_text:
+                                    add_answer_text(intern(answer_text, answer_text))
+                                    add_answer_line(line_num)
+                                    target_ids.append(next_node_id)
+                                    answer_count += 1
+                                    continue
+                    
+                    # Question or result line: "Q1: text" / "R1: text"
+                    elif lead == "Q" or lead == "R":
+                        colon = line.find(":")
+                        node_id = line[:colon]
+                        if colon > 1 and line[colon + 1:colon + 2].isspace() and node_id[1:].rstrip(suffix_chars).isdecimal():
+                            if current >= 0:
+                                answer_counts[current] = answer_count
+                            
+                            flags = (FLAG_DEFINED | FLAG_RESULT) if lead == "R" else FLAG_DEFINED
+                            node_index = index.get(node_id)
+                            if node_index is None:
+                                node_index = index[node_id] = len(node_ids)
+                                node_ids.append(node_id)
+                                node_texts.append(line[colon + 1:].lstrip())
+                                node_flags.append(flags)
+                                answer_starts.append(len(target_ids))
+                                answer_counts.append(0)
+                                node_lines.append(line_num)
+                            else:
+                                # A repeated ID replaces the earlier definition
+                                tree.duplicates.append((node_id, node_lines[node_index], line_num))
+                                node_texts[node_index] = line[colon + 1:].lstrip()
+                                node_flags[node_index] = flags
+                                answer_starts[node_index] = len(target_ids)
+                                answer_counts[node_index] = 0
+                                node_lines[node_index] = line_num
+                            
+                            if lead == "R":
+                                current = -1
+                            else:
+                                current = node_index
+                                answer_count = 0
+                                if tree.start_node_id is None:
+                                    tree.start_node_id = node_id
+                            continue
+                    
+                    # If we get here, the line format is invalid
+                    raise TreeFormatError(f"Invalid line format at line {line_num}: {line}", line_num)
                 
-                # If we get here, the line format is invalid
-                raise ValueError(f"Invalid line format at line {line_num}: {line}")
+                if not block:
+                    break
     
     except FileNotFoundError:
         print(f"Error: File not found: {file_path}")
         raise
     
-    if not tree.nodes:
+    if current >= 0:
+        answer_counts[current] = answer_count
+    tree.defined_count = len(node_ids)
+    
+    if not tree.defined_count:
         raise ValueError("No valid nodes found in the file")
+    tree.source_path = os.path.abspath(file_path)
+    
+    # Resolve answer targets to node indices, adding placeholders for undefined IDs
+    try:
+        tree.answer_targets = array('I', map(index.__getitem__, target_ids))
+    except KeyError:
+        tree.answer_targets = array('I', map(tree._reserve, target_ids))
     
     return tree
 
@@ -262,80 +788,55 @@ def get_user_input(options_count: int) -> Union[int, str]:
 import datetime
 import os
 
-def generate_mermaid_diagram(tree: DecisionTree) -> str:
+def generate_mermaid_diagram(session: NavigationSession) -> str:
     """
     Generate a Mermaid flowchart diagram from the decision path.
     
+    The diagram is assembled from fragments cached by the session, so only
+    the steps taken since the last call are rendered.
+    
     Args:
-        tree: The decision tree with the current path
+        session: The navigation session with the current path
     
     Returns:
         Mermaid diagram code as a string
     """
-    if not tree.current_path:
-        return "graph TD\n    A[No decision path]"
-    
-    # Start with the graph definition
-    mermaid_code = ["graph TD"]
-    
-    # Define node IDs and labels
-    node_definitions = []
-    connections = []
-    current_nodes = []
-    result_nodes = []
-    
-    # Create a sanitized ID for each node
-    def sanitize_id(text):
-        return "".join(c if c.isalnum() else "_" for c in text)
-    
-    # Process each node in the path
-    prev_node_id = None
-    for i, (node, answer) in enumerate(tree.current_path):
-        # Create a unique ID for this node
-        node_id = f"node_{sanitize_id(node.id)}"
-        
-        # Add to current nodes list
-        current_nodes.append(node_id)
-        
-        # If it's a result node, add to result nodes list
-        if node.is_result:
-            result_nodes.append(node_id)
-        
-        # Define the node with its text
-        node_text = node.text.replace('"', "'")
-        node_definitions.append(f'    {node_id}["{node_text}"]')
-        
-        # If there's a previous node and an answer, create a connection
-        if prev_node_id and answer:
-            answer_text = answer.replace('"', "'")
-            connections.append(f'    {prev_node_id} -->|"{answer_text}"| {node_id}')
-        
-        prev_node_id = node_id
+    return session.get_mermaid_diagram()
+
+
+def format_path_markdown(session: NavigationSession, input_file: str = None,
+                         date: Optional[datetime.datetime] = None) -> str:
+    """
+    Format the current decision path as a Markdown report.
     
-    # Add node definitions and connections to the diagram
-    mermaid_code.extend(node_definitions)
-    mermaid_code.extend(connections)
+    Args:
+        session: The navigation session with the current path
+        input_file: The input file path used to generate the decision tree
+        date: When the path was taken (default: now)
     
-    # Add styling
-    mermaid_code.append("")
-    mermaid_code.append("    classDef default fill:#f9f9f9,stroke:#333,stroke-width:1px;")
-    mermaid_code.append("    classDef current fill:#d4f4ff,stroke:#0077b6,stroke-width:2px;")
-    mermaid_code.append("    classDef result fill:#d8f3dc,stroke:#2d6a4f,stroke-width:2px;")
+    Returns:
+        The report with the path as a tree and as a Mermaid diagram
+    """
+    date = date or datetime.datetime.now()
+    lines = ["# Decision Path Analysis\n\n"]
+    if input_file:
+        lines.append(f"Generated from: `{input_file}`  \n")
+    lines.append(f"Date: {date.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
     
-    # Apply styles
-    if current_nodes:
-        mermaid_code.append(f"    class {','.join(current_nodes)} current;")
-    if result_nodes:
-        mermaid_code.append(f"    class {','.join(result_nodes)} result;")
+    lines.append("## Decision Path Tree\n\n")
+    lines.append(f"```\n{session.get_path_display(colored=False)}\n```\n\n")
     
-    return "\n".join(mermaid_code)
+    lines.append("## Visual Diagram\n\n")
+    lines.append(f"```mermaid\n{generate_mermaid_diagram(session)}\n```\n")
+    return "".join(lines)
 
-def save_path_to_file(tree: DecisionTree, input_file: str = None, filename: str = None) -> str:
+
+def save_path_to_file(session: NavigationSession, input_file: str = None, filename: str = None) -> str:
     """
     Save the current decision path to a Markdown file with a timestamp.
     
     Args:
-        tree: The decision tree with the current path
+        session: The navigation session with the current path
         input_file: The input file path used to generate the decision tree
         filename: Optional filename to save to
     
@@ -353,32 +854,8 @@ def save_path_to_file(tree: DecisionTree, input_file: str = None, filename: str
         if filename is None:
             filename = f"decision_path_{timestamp}.md"
     
-    # Generate Mermaid diagram
-    mermaid_diagram = generate_mermaid_diagram(tree)
-    
-    # Remove ANSI color codes for file output
-    def strip_ansi_codes(text):
-        return text.replace(Colors.YELLOW, '').replace(Colors.CYAN, '').replace(Colors.GREEN, '')\
-                  .replace(Colors.BLUE, '').replace(Colors.RED, '').replace(Colors.HEADER, '')\
-                  .replace(Colors.BOLD, '').replace(Colors.UNDERLINE, '').replace(Colors.ENDC, '')
-    
-    clean_path_display = strip_ansi_codes(tree.get_path_display())
-    
     with open(filename, 'w', encoding='utf-8') as file:
-        file.write("# Decision Path Analysis\n\n")
-        if input_file:
-            file.write(f"Generated from: `{input_file}`  \n")
-        file.write(f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
-        file.write("## Decision Path Tree\n\n")
-        file.write("```\n")
-        file.write(clean_path_display)
-        file.write("\n```\n\n")
-        
-        file.write("## Visual Diagram\n\n")
-        file.write("```mermaid\n")
-        file.write(mermaid_diagram)
-        file.write("\n```\n")
+        file.write(format_path_markdown(session, input_file))
     
     print(f"\nDecision path saved to: {filename}")
     return filename
@@ -398,7 +875,18 @@ def display_help():
 def main():
     """Main function to run the decision tree navigator."""
     parser = argparse.ArgumentParser(description="Decision Tree Navigator")
-    parser.add_argument("file", help="Path to the decision tree file")
+    parser.add_argument("file", nargs="+",
+                        help="Path to the decision tree file (several files or directories with --check)")
+    parser.add_argument("--compile", action="store_true",
+                        help="Compile the file to a binary sidecar for fast loading and exit")
+    parser.add_argument("--check", action="store_true",
+                        help="Check the files for structural problems and exit")
+    parser.add_argument("--jobs", type=int, help="Number of parallel processes used by --check")
+    parser.add_argument("--paths-to", metavar="NODE_ID",
+                        help="List the answer paths that lead to a result and exit")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of paths listed by --paths-to")
+    parser.add_argument("--log", metavar="LOG_FILE",
+                        help="Append saved paths to this decision log instead of writing a Markdown file each")
     parser.add_argument("--version", action="version", version="Decision Tree Navigator v0.1.0")
     
     if len(sys.argv) == 1:
@@ -407,8 +895,31 @@ def main():
     
     args = parser.parse_args()
     
+    # Imported here because these modules build on the classes defined above
+    from compiled_tree import compile_tree, load_tree
+    
+    if args.check:
+        from tree_validator import check_files
+        sys.exit(1 if check_files(args.file, args.jobs) else 0)
+    
+    if len(args.file) > 1:
+        parser.error("only one decision tree file can be navigated at a time")
+    args.file = args.file[0]
+    
     try:
-        tree = parse_file(args.file)
+        if args.compile:
+            output_path = compile_tree(args.file)
+            print(f"{Colors.GREEN}Compiled tree written to: {output_path}{Colors.ENDC}")
+            return
+        tree = load_tree(args.file)
+        if args.paths_to:
+            from tree_index import print_paths
+            print_paths(tree, args.paths_to, args.limit)
+            return
+        if args.log:
+            from decision_log import DecisionLog, get_tree_hash
+            decision_log = DecisionLog(args.log)
+            tree_hash = get_tree_hash(args.file)
     except (FileNotFoundError, ValueError) as e:
         print(f"{Colors.RED}Error: {str(e)}{Colors.ENDC}")
         sys.exit(1)
@@ -417,8 +928,9 @@ def main():
     print(f"{Colors.BOLD}{Colors.HEADER}{'DECISION TREE NAVIGATOR'.center(60)}{Colors.ENDC}")
     print("=" * 60)
     print(f"\n{Colors.BOLD}Loaded:{Colors.ENDC} {Colors.CYAN}{args.file}{Colors.ENDC}")
-    print(f"{Colors.BOLD}Tree contains:{Colors.ENDC} {Colors.YELLOW}{sum(1 for node in tree.nodes.values() if not node.is_result)}{Colors.ENDC} questions and "
-          f"{Colors.YELLOW}{sum(1 for node in tree.nodes.values() if node.is_result)}{Colors.ENDC} possible outcomes")
+    question_count, result_count = tree.get_node_counts()
+    print(f"{Colors.BOLD}Tree contains:{Colors.ENDC} {Colors.YELLOW}{question_count}{Colors.ENDC} questions and "
+          f"{Colors.YELLOW}{result_count}{Colors.ENDC} possible outcomes")
     print(f"\n{Colors.BOLD}This interactive tool will guide you through a series of questions.{Colors.ENDC}")
     print(f"Your answers will determine the path through the decision tree.")
     print(f"\n{Colors.BOLD}At any point, you can:{Colors.ENDC}")
@@ -430,25 +942,31 @@ def main():
     print(f"\n{Colors.BOLD}{Colors.GREEN}Let's begin!{Colors.ENDC}")
     print("=" * 60)
     
-    tree.navigate_to_start()
+    session = NavigationSession(tree)
+    session.navigate_to_start()
     
     while True:
-        current_node = tree.get_current_node()
+        current_node = session.get_current_node()
         display_options(current_node)
         
         if current_node.is_result:
             print(f"\n{Colors.BOLD}{Colors.BLUE}Your complete decision path:{Colors.ENDC}")
-            print(tree.get_path_display())
+            print(session.get_path_display())
             
             choice = input(f"\n{Colors.BOLD}What would you like to do next? ({Colors.CYAN}save{Colors.ENDC}{Colors.BOLD}/{Colors.CYAN}restart{Colors.ENDC}{Colors.BOLD}/{Colors.CYAN}exit{Colors.ENDC}{Colors.BOLD}):{Colors.ENDC} ").strip().lower()
             if choice == 'restart':
-                tree.navigate_to_start()
+                session.navigate_to_start()
                 continue
             elif choice == 'save':
-                save_path_to_file(tree, args.file)
+                if args.log:
+                    # Buffered with other paths; the flush timer writes it within a second
+                    decision_log.append_session(session, tree_hash)
+                    print(f"\nDecision path added to: {args.log}")
+                else:
+                    save_path_to_file(session, args.file)
                 choice = input(f"\n{Colors.BOLD}What would you like to do next? ({Colors.CYAN}restart{Colors.ENDC}{Colors.BOLD}/{Colors.CYAN}exit{Colors.ENDC}{Colors.BOLD}):{Colors.ENDC} ").strip().lower()
                 if choice == 'restart':
-                    tree.navigate_to_start()
+                    session.navigate_to_start()
                     continue
                 else:
                     break
@@ -458,15 +976,18 @@ def main():
         user_input = get_user_input(len(current_node.answers))
         
         if isinstance(user_input, int):
-            tree.select_answer(user_input)
+            try:
+                session.select_answer(user_input)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"{Colors.RED}Error: {str(e)}{Colors.ENDC}")
         elif user_input == 'back':
-            if not tree.go_back():
+            if not session.go_back():
                 print("Already at the first question")
         elif user_input == 'restart':
-            tree.navigate_to_start()
+            session.navigate_to_start()
         elif user_input == 'tree':
             print("\nYour current decision path:")
-            print(tree.get_path_display())
+            print(session.get_path_display())
         elif user_input == 'help':
             display_help()
         elif user_input == 'exit':
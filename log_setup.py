@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Log Setup - Non-blocking, structured logging for the command-line tools and the Streamlit app.
+
+``setup_logging`` gives a logger a single ``QueueHandler``. Logging a record
+only puts it on an unbounded in-memory queue, so the caller never waits for
+a disk or terminal. A ``QueueListener`` thread formats the records and
+writes them to the configured sinks. The queue is drained when the process
+exits.
+
+Records are written as one JSON object per line by default. Besides the
+time, level, logger and message, every field passed with ``extra=`` is
+included, so callers can log timings as numbers, e.g.
+``logger.info("Reply received", extra={"duration_ms": 812.4})``. Each record
+also carries ``queue_ms``, the time it waited in the queue.
+
+Sinks, level and format are configured with environment variables, falling
+back to the defaults of each program:
+
+- ``DECISION_TREE_LOG_SINKS``: comma-separated list of ``file:<path>``,
+  ``stderr``, ``stdout`` or ``none``
+- ``DECISION_TREE_LOG_LEVEL``: a level name such as ``DEBUG`` or ``WARNING``
+- ``DECISION_TREE_LOG_FORMAT``: ``json`` or ``text``
+"""
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import datetime
+import threading
+import logging.handlers
+from typing import Dict, List, Optional
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_STANDARD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one line of JSON, including the fields passed with ``extra=``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                    .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            "queue_ms": round((time.time() - record.created) * 1000, 3),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class _StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the extra fields and the exception separate from the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve everything that may not survive the trip to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def create_sinks(spec: str, formatter: logging.Formatter) -> List[logging.Handler]:
+    """
+    Create the handlers for a sink specification.
+
+    Args:
+        spec: Comma-separated list of ``file:<path>``, ``stderr``, ``stdout`` or ``none``
+        formatter: Formatter used by every handler
+
+    Returns:
+        The handlers
+
+    Raises:
+        ValueError: If a sink is not recognized
+    """
+    handlers: List[logging.Handler] = []
+    for sink in (part.strip() for part in spec.split(",")):
+        if not sink or sink == "none":
+            continue
+        if sink.startswith("file:"):
+            # The file is created when the first record is written
+            handler: logging.Handler = logging.FileHandler(sink[5:], encoding="utf-8", delay=True)
+        elif sink == "stderr":
+            handler = logging.StreamHandler(sys.stderr)
+        elif sink == "stdout":
+            handler = logging.StreamHandler(sys.stdout)
+        else:
+            raise ValueError(f"Unknown log sink: {sink}")
+        handler.setFormatter(formatter)
+        handlers.append(handler)
+    return handlers
+
+
+def setup_logging(name: str, default_file: Optional[str] = None, default_level: int = logging.INFO) -> logging.Logger:
+    """
+    Configure a logger to write through a background thread.
+
+    Calling it again for the same logger returns the logger unchanged, so it
+    is safe in scripts that Streamlit runs again on every interaction.
+
+    Args:
+        name: Logger name
+        default_file: Log file used when DECISION_TREE_LOG_SINKS is not set
+            (default: standard error)
+        default_level: Level used when DECISION_TREE_LOG_LEVEL is not set
+
+    Returns:
+        The configured logger
+
+    Raises:
+        ValueError: If the environment names an unknown sink, level or format
+    """
+    logger = logging.getLogger(name)
+    with _lock:
+        if name in _listeners:
+            return logger
+
+        level_name = os.environ.get("DECISION_TREE_LOG_LEVEL")
+        level = logging.getLevelName(level_name.upper()) if level_name else default_level
+        if not isinstance(level, int):
+            raise ValueError(f"Unknown log level: {level_name}")
+        fmt = os.environ.get("DECISION_TREE_LOG_FORMAT", "json").lower()
+        if fmt not in ("json", "text"):
+            raise ValueError(f"Unknown log format: {fmt}")
+        formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+        default_sinks = f"file:{default_file}" if default_file else "stderr"
+        handlers = create_sinks(os.environ.get("DECISION_TREE_LOG_SINKS", default_sinks), formatter)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners[name] = listener
+
+        logger.handlers = [_StructuredQueueHandler(log_queue)]
+        logger.setLevel(level)
+        logger.propagate = False
+        return logger
+
+
+@atexit.register
+def shutdown_logging():
+    """Write the records still queued and stop the background threads."""
+    with _lock:
+        listeners = list(_listeners.values())
+        _listeners.clear()
+    for listener in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
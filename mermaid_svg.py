@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Mermaid SVG Renderer - Server-side rendering of the navigator's Mermaid diagrams.
+
+The Streamlit app used to download mermaid.js from a CDN and lay out the
+diagram in every browser on every rerun. This module renders the Mermaid
+subset produced by generate_mermaid_diagram and tree_export in pure Python:
+
+- ``graph TD`` / ``graph TB`` / ``flowchart TD`` headers
+- node definitions ``id["label"]`` or ``id[label]``, optionally ``:::class``
+- edges ``a --> b`` and ``a -->|"label"| b``
+- ``classDef name fill:...,stroke:...;`` and ``class a,b name;``
+
+Nodes are placed in layers by longest path from the roots, ordered within
+each layer by the average position of their parents, and edges are drawn as
+straight arrows with their labels at the midpoint.
+
+Rendered SVG is kept in a process-wide LRU cache keyed by the SHA-256 of the
+diagram source, so users on the same path share one rendering.
+"""
+import os
+import re
+import sys
+import html
+import hashlib
+import argparse
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Default number of cached diagrams, overridable with DECISION_TREE_SVG_CACHE_SIZE
+DEFAULT_SVG_CACHE_SIZE = 512
+
+FONT_SIZE = 13
+CHAR_WIDTH = 7.0        # Approximate width of one character at FONT_SIZE
+LINE_HEIGHT = 17
+NODE_WRAP = 32          # Characters per line in node labels
+EDGE_WRAP = 24          # Characters per line in edge labels
+NODE_PADDING_X = 12
+NODE_PADDING_Y = 8
+NODE_GAP = 30
+LAYER_GAP = 70
+MARGIN = 16
+
+DEFAULT_STYLE = {"fill": "#f9f9f9", "stroke": "#333", "stroke-width": "1px"}
+
+_NODE_RE = re.compile(r'^([A-Za-z0-9_]+)\[(?:"([^"]*)"|([^\]]*))\](?::::([A-Za-z0-9_]+))?;?$')
+_EDGE_RE = re.compile(r'^([A-Za-z0-9_]+)\s*-->\s*(?:\|"?([^|"]*)"?\|\s*)?([A-Za-z0-9_]+);?$')
+_CLASSDEF_RE = re.compile(r'^classDef\s+([A-Za-z0-9_]+)\s+([^;]*);?$')
+_CLASS_RE = re.compile(r'^class\s+([A-Za-z0-9_,]+)\s+([A-Za-z0-9_]+);?$')
+
+
+class MermaidGraph(NamedTuple):
+    """The parts of a Mermaid flowchart needed for layout."""
+    labels: Dict[str, str]                     # Node ID to label, in definition order
+    edges: List[Tuple[str, str, str]]          # (source, target, label)
+    class_defs: Dict[str, Dict[str, str]]      # Class name to style properties
+    node_classes: Dict[str, List[str]]         # Node ID to class names, in order of assignment
+
+
+def parse_mermaid(code: str) -> MermaidGraph:
+    """
+    Parse the supported subset of a Mermaid flowchart.
+
+    Args:
+        code: Mermaid diagram code
+
+    Returns:
+        The parsed graph
+
+    Raises:
+        ValueError: If the diagram uses unsupported syntax
+    """
+    graph = MermaidGraph({}, [], {}, {})
+    lines = [line.strip() for line in code.splitlines()]
+    lines = [line for line in lines if line and not line.startswith("%%")]
+    if not lines or lines[0].split() not in (["graph", "TD"], ["graph", "TB"],
+                                            ["flowchart", "TD"], ["flowchart", "TB"]):
+        raise ValueError("Only top-down Mermaid flowcharts are supported")
+
+    for line in lines[1:]:
+        match = _NODE_RE.match(line)
+        if match:
+            node_id, quoted, plain, class_name = match.groups()
+            graph.labels[node_id] = quoted if quoted is not None else plain.strip()
+            if class_name:
+                graph.node_classes.setdefault(node_id, []).append(class_name)
+            continue
+
+        match = _EDGE_RE.match(line)
+        if match:
+            source, label, target = match.groups()
+            graph.labels.setdefault(source, source)
+            graph.labels.setdefault(target, target)
+            graph.edges.append((source, target, (label or "").strip()))
+            continue
+
+        match = _CLASSDEF_RE.match(line)
+        if match:
+            name, properties = match.groups()
+            style = {}
+            for item in properties.split(","):
+                key, _, value = item.partition(":")
+                if key.strip() and value.strip():
+                    style[key.strip()] = value.strip()
+            graph.class_defs[name] = style
+            continue
+
+        match = _CLASS_RE.match(line)
+        if match:
+            node_ids, name = match.groups()
+            for node_id in node_ids.split(","):
+                graph.node_classes.setdefault(node_id, []).append(name)
+            continue
+
+        raise ValueError(f"Unsupported Mermaid statement: {line}")
+
+    return graph
+
+
+def _assign_layers(graph: MermaidGraph) -> Dict[str, int]:
+    """Place every node one layer below its deepest parent, ignoring edges that close cycles."""
+    children: Dict[str, List[str]] = {node_id: [] for node_id in graph.labels}
+    for source, target, _ in graph.edges:
+        children[source].append(target)
+
+    # Depth-first search for a topological order; edges to nodes on the stack are back edges
+    state: Dict[str, int] = {}
+    order: List[str] = []
+    back_edges = set()
+    for root in graph.labels:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(children[root]))]
+        while stack:
+            node_id, remaining = stack[-1]
+            for child in remaining:
+                if state.get(child) == 1:
+                    back_edges.add((node_id, child))
+                elif child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(children[child])))
+                    break
+            else:
+                state[node_id] = 2
+                order.append(node_id)
+                stack.pop()
+
+    layers = {node_id: 0 for node_id in graph.labels}
+    for node_id in reversed(order):
+        for child in children[node_id]:
+            if (node_id, child) not in back_edges:
+                layers[child] = max(layers[child], layers[node_id] + 1)
+    return layers
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    """Wrap a label into lines."""
+    return textwrap.wrap(text, width) or [""]
+
+
+def _node_style(graph: MermaidGraph, node_id: str) -> Dict[str, str]:
+    """Combine the default style with the node's classes, later classes taking precedence."""
+    style = dict(DEFAULT_STYLE)
+    style.update(graph.class_defs.get("default", {}))
+    for name in graph.node_classes.get(node_id, []):
+        style.update(graph.class_defs.get(name, {}))
+    return style
+
+
+def render_svg(code: str) -> str:
+    """
+    Render a Mermaid flowchart as an SVG document.
+
+    Args:
+        code: Mermaid diagram code
+
+    Returns:
+        The SVG markup
+
+    Raises:
+        ValueError: If the diagram uses unsupported syntax
+    """
+    graph = parse_mermaid(code)
+    layers = _assign_layers(graph)
+
+    # Node sizes
+    node_lines = {node_id: _wrap(label, NODE_WRAP) for node_id, label in graph.labels.items()}
+    sizes = {}
+    for node_id, lines in node_lines.items():
+        width = max(len(line) for line in lines) * CHAR_WIDTH + 2 * NODE_PADDING_X
+        height = len(lines) * LINE_HEIGHT + 2 * NODE_PADDING_Y
+        sizes[node_id] = (width, height)
+
+    # Order nodes within each layer by the mean position of their parents
+    layer_count = max(layers.values(), default=-1) + 1
+    rows: List[List[str]] = [[] for _ in range(layer_count)]
+    for node_id in graph.labels:
+        rows[layers[node_id]].append(node_id)
+    parents: Dict[str, List[str]] = {node_id: [] for node_id in graph.labels}
+    for source, target, _ in graph.edges:
+        if layers[source] < layers[target]:
+            parents[target].append(source)
+    position: Dict[str, float] = {}
+    for row in rows:
+        def barycenter(node_id: str) -> float:
+            placed = [position[parent] for parent in parents[node_id] if parent in position]
+            return sum(placed) / len(placed) if placed else float("inf")
+        row.sort(key=barycenter)
+        for i, node_id in enumerate(row):
+            position[node_id] = i
+
+    # Edge labels need vertical room between layers
+    label_lines = [_wrap(label, EDGE_WRAP) if label else [] for _, _, label in graph.edges]
+    layer_gap = LAYER_GAP + max((len(lines) for lines in label_lines), default=0) * LINE_HEIGHT
+
+    # Coordinates: rows are centred on the widest row
+    row_widths = [sum(sizes[n][0] for n in row) + NODE_GAP * (len(row) - 1) for row in rows]
+    total_width = max(row_widths, default=0) + 2 * MARGIN
+    centers: Dict[str, Tuple[float, float]] = {}
+    y = MARGIN
+    for row, row_width in zip(rows, row_widths):
+        row_height = max(sizes[n][1] for n in row)
+        x = (total_width - row_width) / 2
+        for node_id in row:
+            width, _ = sizes[node_id]
+            centers[node_id] = (x + width / 2, y + row_height / 2)
+            x += width + NODE_GAP
+        y += row_height + layer_gap
+    total_height = y - layer_gap + MARGIN if rows else 2 * MARGIN
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{total_width:.0f}" height="{total_height:.0f}" '
+        f'viewBox="0 0 {total_width:.0f} {total_height:.0f}" font-family="sans-serif" font-size="{FONT_SIZE}">',
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" '
+        'orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" fill="#333"/></marker></defs>',
+    ]
+
+    # Edges first so that nodes and labels are drawn on top
+    for (source, target, _), lines in zip(graph.edges, label_lines):
+        (x1, y1), (x2, y2) = centers[source], centers[target]
+        y1 += sizes[source][1] / 2 if y2 >= y1 else -sizes[source][1] / 2
+        y2 -= sizes[target][1] / 2 if y2 >= y1 else -sizes[target][1] / 2
+        out.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+                   f'stroke="#333" stroke-width="1.5" marker-end="url(#arrow)"/>')
+        if lines:
+            width = max(len(line) for line in lines) * CHAR_WIDTH + 8
+            height = len(lines) * LINE_HEIGHT + 4
+            mx, my = (x1 + x2) / 2, (y1 + y2) / 2
+            out.append(f'<rect x="{mx - width / 2:.1f}" y="{my - height / 2:.1f}" width="{width:.1f}" '
+                       f'height="{height:.1f}" fill="#ffffff" opacity="0.9"/>')
+            out.append(_text_block(lines, mx, my, "#555"))
+
+    for node_id, (cx, cy) in centers.items():
+        width, height = sizes[node_id]
+        style = _node_style(graph, node_id)
+        dash = style.get("stroke-dasharray")
+        out.append(
+            f'<rect x="{cx - width / 2:.1f}" y="{cy - height / 2:.1f}" width="{width:.1f}" height="{height:.1f}" '
+            f'rx="5" fill="{html.escape(style["fill"])}" stroke="{html.escape(style["stroke"])}" '
+            f'stroke-width="{html.escape(style["stroke-width"]).replace("px", "")}"'
+            + (f' stroke-dasharray="{html.escape(dash)}"' if dash else "") + '/>')
+        out.append(_text_block(node_lines[node_id], cx, cy, "#000"))
+
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+def _text_block(lines: List[str], cx: float, cy: float, color: str) -> str:
+    """Render centred multi-line text."""
+    top = cy - (len(lines) - 1) * LINE_HEIGHT / 2
+    spans = "".join(
+        f'<tspan x="{cx:.1f}" y="{top + i * LINE_HEIGHT:.1f}">{html.escape(line)}</tspan>'
+        for i, line in enumerate(lines))
+    return f'<text text-anchor="middle" dominant-baseline="central" fill="{color}">{spans}</text>'
+
+
+class SvgCache:
+    """A thread-safe LRU cache of rendered diagrams keyed by the hash of their source."""
+
+    def __init__(self, max_entries: int = DEFAULT_SVG_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of rendered diagrams to keep
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code: str) -> str:
+        """
+        Get the SVG of a diagram, rendering it on a cache miss.
+
+        Args:
+            code: Mermaid diagram code
+
+        Returns:
+            The SVG markup
+
+        Raises:
+            ValueError: If the diagram uses unsupported syntax
+        """
+        key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return svg
+            self.misses += 1
+
+        # Rendering is deterministic, so a concurrent miss at worst renders twice
+        svg = render_svg(code)
+
+        with self._lock:
+            self._entries[key] = svg
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return svg
+
+    def clear(self):
+        """Remove all cached diagrams."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, evictions, entries and max_entries
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+_shared_cache: Optional[SvgCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_svg_cache() -> SvgCache:
+    """
+    Get the process-wide SVG cache, creating it on first use.
+
+    The number of cached diagrams is read from the DECISION_TREE_SVG_CACHE_SIZE
+    environment variable (default: 512).
+
+    Returns:
+        The shared SvgCache instance
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            size = int(os.environ.get("DECISION_TREE_SVG_CACHE_SIZE", DEFAULT_SVG_CACHE_SIZE))
+            _shared_cache = SvgCache(size)
+        return _shared_cache
+
+
+def main():
+    """Render a Mermaid file to SVG from the command line."""
+    parser = argparse.ArgumentParser(description="Render a decision tree Mermaid diagram to SVG")
+    parser.add_argument("input", help="Mermaid file (.mmd), or - for standard input")
+    parser.add_argument("--output", help="Output SVG file (default: standard output)")
+    args = parser.parse_args()
+
+    try:
+        if args.input == "-":
+            code = sys.stdin.read()
+        else:
+            with open(args.input, encoding="utf-8") as file:
+                code = file.read()
+        svg = render_svg(code)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                file.write(svg)
+            print(f"SVG written to: {args.output}")
+        else:
+            print(svg)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,66 +8,225 @@ import json
 import datetime
 import argparse
 import logging
-import re
-import ollama  # The Python client for Ollama
+import time
 
-# Configure logging
-logging.basicConfig(
-    filename='ollama_decision_tree.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+from context_window import ContextWindow
+from ollama_pool import EndpointPool, DEFAULT_RETRIES, DEFAULT_TIMEOUT, parse_hosts
+from conversation_tree import (ConversationTree, ReplyStreamer, REPLY_SCHEMA, REPLY_INSTRUCTIONS,
+                               parse_reply, render_reply)
+from response_cache import ResponseCache, make_key
+from log_setup import setup_logging
+
+# Configured by main with setup_logging; records are written by a background thread
 logger = logging.getLogger('ollama_decision_tree')
 
 # Default model
 DEFAULT_MODEL = "llama3.2"
 
+# Default token budget for the messages sent with each request
+DEFAULT_CONTEXT_TOKENS = 4096
+
 class OllamaClient:
     """Handles communication with the Ollama service."""
     
-    def __init__(self, model=DEFAULT_MODEL):
+    def __init__(self, model=DEFAULT_MODEL, host=None, context_tokens=None, cache=None, options=None,
+                 structured=True, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
         """
         Initialize the Ollama client.
         
         Args:
             model: The Ollama model to use
+            host: URL of the Ollama server, or several separated by commas
+                (default: OLLAMA_HOST or http://localhost:11434)
+            context_tokens: Token budget for the messages sent with each request
+                (default: send the whole conversation)
+            cache: Optional ResponseCache for replies to identical requests
+            options: Model options such as temperature, sent with every request
+            structured: Whether to ask for replies matching REPLY_SCHEMA and
+                build the decision tree from them as they arrive
+            timeout: Seconds to wait for each read from the server
+            retries: Times a request that failed with a transient error is sent again
         """
         self.model = model
+        self.host = host
+        self.client = EndpointPool(parse_hosts(host), timeout=timeout, retries=retries)
+        self.cache = cache
+        self.options = options
+        self.format = REPLY_SCHEMA if structured else None
+        self.tree = ConversationTree()
         self.conversation = []
-        logger.info(f"Initialized OllamaClient with model: {model}")
+        self.pinned = 0  # Leading messages always sent, see pin_conversation
+        self.context = ContextWindow(context_tokens) if context_tokens else None
+        self.last_stats = {}
+        logger.info("Initialized OllamaClient with model: %s", model,
+                    extra={"model": model, "endpoints": len(self.client.endpoints)})
         
-    def send_message(self, message):
+    def pin_conversation(self):
+        """Always send the messages so far (e.g. the instructions), however long the conversation gets."""
+        self.pinned = len(self.conversation)
+    
+    def get_request_messages(self):
+        """
+        Get the messages to send for the next request.
+        
+        Without a context budget this is the whole conversation. With one,
+        the pinned messages and the tree built so far are always sent,
+        followed by as many recent turns as fit in the budget.
+        
+        Returns:
+            List of chat messages
+        """
+        if self.context is None:
+            return self.conversation
+        tree = self.extract_decision_tree()
+        tree_text = format_decision_tree(tree) if tree["nodes"] else None
+        return self.context.build(self.conversation, self.pinned, tree_text)
+    
+    def send_message(self, message, stream=False, on_token=None):
         """
         Send a message to Ollama and get the response.
         
+        Structured replies are JSON: the question or recommendation they hold
+        is added to the decision tree, and the conversation keeps the text
+        shown to the user (see render_reply).
+        
+        In streaming mode the reply is passed to on_token piece by piece as it
+        is generated; for structured replies these are the pieces of the text
+        shown to the user, decoded from the JSON as it arrives. Pressing Ctrl-C
+        while waiting cancels the request. The conversation and the tree are
+        only changed once the reply is complete, so after a cancellation or an
+        error they are left as they were before the call.
+        
         Args:
             message: The message to send
+            stream: Whether to stream the reply as it is generated
+            on_token: Function called with each piece of a streamed reply
             
         Returns:
             The response from Ollama
+            
+        Raises:
+            KeyboardInterrupt: If the request was cancelled with Ctrl-C
+            ollama.ResponseError: If the server rejected the request
+            ConnectionError: If no server could be reached, after retries
+            httpx.TransportError: If the request timed out, after retries
         """
+        # The conversation and the tree are only changed once every step has
+        # succeeded; on failure the conversation is cut back to this length
+        conversation_length = len(self.conversation)
+        start = time.perf_counter()
         try:
             # Add user message to conversation
             self.conversation.append({"role": "user", "content": message})
-            logger.info(f"Sending message to Ollama model {self.model}")
             
-            # Send to Ollama
-            response = ollama.chat(
-                model=self.model,
-                messages=self.conversation
-            )
+            first_token = None
+            messages = self.get_request_messages()
+            logger.debug("Sending message to Ollama model %s", self.model,
+                         extra={"model": self.model, "messages": len(messages), "stream": stream})
+            cache_key = make_key(self.model, messages, self.options, self.format) if self.cache else None
+            cached = self.cache.get(cache_key) if cache_key else None
+            streamer = ReplyStreamer() if self.format is not None else None
+            if cached is not None:
+                content = cached["content"]
+                final = None
+                first_token = time.perf_counter() - start
+            elif stream:
+                # Send to Ollama and collect the reply as it arrives
+                parts = []
+                final = None
+                chunks = self.client.chat(model=self.model, messages=messages, stream=True,
+                                          format=self.format, options=self.options)
+                try:
+                    for chunk in chunks:
+                        content = chunk['message']['content']
+                        if content:
+                            if first_token is None:
+                                first_token = time.perf_counter() - start
+                            parts.append(content)
+                            if on_token:
+                                # Structured replies show their text, not the JSON
+                                text = streamer.feed(content) if streamer else content
+                                if text:
+                                    on_token(text)
+                        if chunk.get('done'):
+                            final = chunk
+                finally:
+                    # Closing the stream drops the connection, which stops generation on the server
+                    chunks.close()
+                content = "".join(parts)
+            else:
+                # Send to Ollama
+                final = self.client.chat(model=self.model, messages=messages, format=self.format,
+                                         options=self.options)
+                content = final['message']['content']
             
-            # Add assistant response to conversation
-            assistant_message = response['message']
-            self.conversation.append(assistant_message)
+            raw_content = content
+            reply = parse_reply(content) if self.format is not None else None
+            if reply is not None:
+                content = render_reply(reply)
+            if stream and on_token and (cached is not None or (streamer is not None and not streamer.emitted)):
+                on_token(content)
             
-            logger.info("Received response from Ollama")
-            return assistant_message['content']
+            stats = self._make_stats(final, time.perf_counter() - start, first_token)
+            stats["cached"] = cached is not None
+            if self.context is not None:
+                stats.update(self.context.last_report)
+            if cache_key and cached is None:
+                self.cache.put(cache_key, raw_content, stats)
             
+            # Every step succeeded: add the reply to the tree and the conversation
+            if reply is not None:
+                self.tree.add_reply(message, reply)
+            self.conversation.append({"role": "assistant", "content": content})
+            self.last_stats = stats
+            
+            logger.info("Received response from Ollama in %.2fs", stats["total_seconds"], extra={
+                "model": self.model,
+                "duration_ms": round(stats["total_seconds"] * 1000, 3),
+                "first_token_ms": (round(stats["time_to_first_token"] * 1000, 3)
+                                   if stats["time_to_first_token"] is not None else None),
+                "prompt_eval_count": stats["prompt_eval_count"],
+                "prompt_eval_ms": stats["prompt_eval_duration"] / 1e6,
+                "eval_count": stats["eval_count"],
+                "tokens_per_second": round(stats["tokens_per_second"], 2),
+                "cached": stats["cached"],
+                "messages_sent": len(messages),
+            })
+            return content
+            
+        except KeyboardInterrupt:
+            del self.conversation[conversation_length:]
+            logger.info("Request to Ollama cancelled by the user",
+                        extra={"model": self.model, "duration_ms": round((time.perf_counter() - start) * 1000, 3)})
+            raise
         except Exception as e:
-            error_msg = f"Error communicating with Ollama: {str(e)}"
-            logger.error(error_msg)
-            return f"Error: {str(e)}"
+            # Leave the conversation as it was, so the message can be sent again
+            del self.conversation[conversation_length:]
+            logger.error("Error communicating with Ollama: %s", e,
+                         extra={"model": self.model, "error_type": type(e).__name__,
+                                "duration_ms": round((time.perf_counter() - start) * 1000, 3)})
+            raise
+    
+    @staticmethod
+    def _make_stats(final, total_seconds, first_token):
+        """
+        Collect the timing statistics of a reply.
+        
+        Args:
+            final: The final response chunk, holding Ollama's counters
+            total_seconds: Wall-clock time of the request
+            first_token: Seconds until the first piece of a streamed reply arrived
+            
+        Returns:
+            Dictionary of timing statistics
+        """
+        stats = {"total_seconds": total_seconds, "time_to_first_token": first_token}
+        for key in ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration"):
+            stats[key] = (final.get(key) if final is not None else None) or 0
+        # Ollama reports durations in nanoseconds
+        stats["tokens_per_second"] = (stats["eval_count"] / (stats["eval_duration"] / 1e9)
+                                      if stats["eval_duration"] else 0.0)
+        return stats
     
     def save_conversation(self, filename=None):
         """
@@ -95,75 +254,24 @@ class OllamaClient:
         try:
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2)
-            logger.info(f"Saved conversation to {filename}")
+            logger.info("Saved conversation to %s", filename, extra={"messages": len(self.conversation)})
             return filename
         except Exception as e:
-            error_msg = f"Error saving conversation: {str(e)}"
-            logger.error(error_msg)
+            logger.error("Error saving conversation: %s", e, extra={"path": filename})
             return None
     
     def extract_decision_tree(self):
         """
-        Extract a decision tree structure from the conversation.
+        Get the decision tree built from the replies so far.
         
-        This is a simple extraction that looks for patterns in the LLM responses
-        that might indicate questions and options.
+        The tree grows as each structured reply arrives, so this does not
+        scan the conversation. Answers that have not been explored yet lead
+        to placeholder results.
         
         Returns:
             A dictionary representing the decision tree structure
         """
-        tree = {
-            "nodes": {},
-            "current_id": 1,
-            "result_id": 1
-        }
-        
-        # Process each message in the conversation
-        for i, msg in enumerate(self.conversation):
-            if msg["role"] != "assistant":
-                continue
-                
-            content = msg["content"]
-            
-            # Look for question patterns
-            question_match = re.search(r'(?:QUESTION:|(?:\d+\.\s*)?([^?]+\?))', content)
-            if question_match:
-                question_text = question_match.group(1) if question_match.group(1) else question_match.group(0)
-                question_text = question_text.strip()
-                
-                # Create a question node
-                node_id = f"Q{tree['current_id']}"
-                tree["nodes"][node_id] = {
-                    "text": question_text,
-                    "is_result": False,
-                    "answers": []
-                }
-                
-                # Look for options/answers
-                options = re.findall(r'(?:OPTION\s*\d+:|(?:\d+\.\s*))([^.?!]+)[.?!]?', content)
-                
-                for option in options:
-                    option_text = option.strip()
-                    
-                    # For simplicity, create a result node for each option
-                    result_id = f"R{tree['result_id']}"
-                    tree["nodes"][result_id] = {
-                        "text": f"Result for: {option_text}",
-                        "is_result": True,
-                        "answers": []
-                    }
-                    
-                    # Add the option to the question node
-                    tree["nodes"][node_id]["answers"].append({
-                        "text": option_text,
-                        "next_node_id": result_id
-                    })
-                    
-                    tree["result_id"] += 1
-                
-                tree["current_id"] += 1
-        
-        return tree
+        return self.tree.to_dict()
     
     def save_decision_tree(self, tree=None, filename=None):
         """
@@ -185,35 +293,115 @@ class OllamaClient:
         
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                # Write each node
-                for node_id, node in tree["nodes"].items():
-                    # Write the node text
-                    f.write(f"{node_id}: {node['text']}\n")
-                    
-                    # Write the answers if not a result node
-                    if not node["is_result"]:
-                        for answer in node["answers"]:
-                            f.write(f"A: {answer['text']} -> {answer['next_node_id']}\n")
-                    
-                    # Add a blank line between nodes
-                    f.write("\n")
+                f.write(format_decision_tree(tree))
             
-            logger.info(f"Saved decision tree to {filename}")
+            logger.info("Saved decision tree to %s", filename, extra={"nodes": len(tree["nodes"])})
             return filename
         except Exception as e:
-            error_msg = f"Error saving decision tree: {str(e)}"
-            logger.error(error_msg)
+            logger.error("Error saving decision tree: %s", e, extra={"path": filename})
             return None
 
 
+def format_decision_tree(tree):
+    """
+    Format a decision tree structure in the format read by decision_tree.py.
+    
+    Args:
+        tree: The decision tree structure from extract_decision_tree
+        
+    Returns:
+        The tree as Q/A text
+    """
+    lines = []
+    for node_id, node in tree["nodes"].items():
+        # Write the node text
+        lines.append(f"{node_id}: {node['text']}")
+        
+        # Write the answers if not a result node
+        if not node["is_result"]:
+            for answer in node["answers"]:
+                lines.append(f"A: {answer['text']} -> {answer['next_node_id']}")
+        
+        # Add a blank line between nodes
+        lines.append("")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def chat(client, message, stream=True):
+    """
+    Send a message and print the reply, streaming it if requested.
+    
+    Ctrl-C while the reply is being generated cancels it and leaves the
+    conversation unchanged. So does an error, which is printed instead of
+    a reply.
+    
+    Args:
+        client: The OllamaClient to use
+        message: The message to send
+        stream: Whether to print the reply as it is generated
+        
+    Returns:
+        True if a reply was received, False if the request was cancelled or failed
+    """
+    print("\nAssistant: ", end="", flush=True)
+    try:
+        if stream:
+            response = client.send_message(message, stream=True,
+                                           on_token=lambda text: print(text, end="", flush=True))
+            print()
+        else:
+            response = client.send_message(message)
+            print(response)
+    except KeyboardInterrupt:
+        print("\n[Generation cancelled]")
+        return False
+    except Exception as e:
+        print(f"\nError: {str(e)}")
+        return False
+    
+    stats = client.last_stats
+    if stats.get("cached"):
+        print(f"(cached reply, {stats['total_seconds'] * 1000:.1f} ms)")
+        return True
+    details = []
+    if stream and stats.get("time_to_first_token") is not None:
+        details.append(f"first token after {stats['time_to_first_token']:.2f}s")
+        details.append(f"{stats['tokens_per_second']:.1f} tokens/s")
+    details.append(f"prompt: {stats.get('prompt_eval_count', 0)} tokens evaluated in "
+                   f"{stats.get('prompt_eval_duration', 0) / 1e9:.2f}s")
+    if "messages_sent" in stats:
+        details.append(f"sent {stats['messages_sent']} of {stats['messages_total']} messages")
+    print(f"({', '.join(details)})")
+    return True
+
+
 def main():
     """Main function to run the Ollama Decision Tree Generator."""
     parser = argparse.ArgumentParser(description="Ollama Decision Tree Generator")
     parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Ollama model to use (default: {DEFAULT_MODEL})")
     parser.add_argument("--save", action="store_true", help="Save conversation on exit")
     parser.add_argument("--export-tree", action="store_true", help="Export decision tree on exit")
+    parser.add_argument("--host", help="URL of the Ollama server, or several separated by commas (default: OLLAMA_HOST or http://localhost:11434)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Seconds to wait for each read from the server (default: {DEFAULT_TIMEOUT:.0f})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"Times a request that failed with a transient error is sent again (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for complete replies instead of streaming them")
+    parser.add_argument("--no-cache", action="store_true", help="Always ask the model instead of reusing cached replies")
+    parser.add_argument("--cache-dir", help="Directory of the reply cache (default: ~/.cache/decision-tree/ollama)")
+    parser.add_argument("--free-text", action="store_true",
+                        help="Let the model reply in free text instead of JSON (the tree is not built)")
+    parser.add_argument("--context-tokens", type=int, default=DEFAULT_CONTEXT_TOKENS,
+                        help=f"Token budget for the messages sent with each request, 0 for no limit "
+                             f"(default: {DEFAULT_CONTEXT_TOKENS})")
     args = parser.parse_args()
     
+    try:
+        setup_logging('ollama_decision_tree', 'ollama_decision_tree.log', logging.INFO)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    
     print("\n" + "=" * 60)
     print("OLLAMA DECISION TREE GENERATOR".center(60))
     print("=" * 60)
@@ -224,7 +412,9 @@ def main():
     
     # Initialize Ollama client
     try:
-        client = OllamaClient(model=args.model)
+        cache = None if args.no_cache else ResponseCache(args.cache_dir)
+        client = OllamaClient(model=args.model, host=args.host, context_tokens=args.context_tokens, cache=cache,
+                              structured=not args.free_text, timeout=args.timeout, retries=args.retries)
     except Exception as e:
         print(f"Error initializing Ollama client: {str(e)}")
         print("Make sure Ollama is installed and running.")
@@ -237,11 +427,15 @@ def main():
     For each step, present a clear question and 2-4 possible answers.
     Let's start by asking what topic or problem the decision tree should address.
     """
+    if not args.free_text:
+        initial_prompt += REPLY_INSTRUCTIONS
     
     # Send initial prompt
     print("\nInitializing conversation with Ollama...")
-    response = client.send_message(initial_prompt)
-    print("\nAssistant:", response)
+    if not chat(client, initial_prompt, not args.no_stream):
+        sys.exit(1)
+    # The instructions and the first reply are sent with every request
+    client.pin_conversation()
     
     # Main conversation loop
     while True:
@@ -285,8 +479,12 @@ def main():
             print("  help - Show this help message")
             continue
             
-        response = client.send_message(user_input)
-        print("\nAssistant:", response)
+        chat(client, user_input, not args.no_stream)
+    
+    if client.cache is not None:
+        cache_stats = client.cache.stats()
+        print(f"\nReply cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({client.cache.cache_dir})")
     
     print("\nThank you for using the Ollama Decision Tree Generator!")
 
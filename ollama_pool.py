@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Ollama Pool - A client layer over one or more Ollama servers.
+
+``EndpointPool`` keeps one ``ollama.Client`` (and, when used from async code,
+one ``ollama.AsyncClient``) per server. Each of them holds a pool of
+persistent HTTP connections. Every request:
+
+- is sent to the healthy endpoint with the fewest requests in flight, ties
+  broken by the lower recent latency
+- has a connect timeout and a read timeout, so a hung server cannot stall
+  the caller forever
+- is retried on connection errors, timeouts and 429/5xx responses, after a
+  randomly jittered exponential backoff, on whichever endpoint is then least
+  loaded
+
+An endpoint that fails is skipped for a cooldown period while others are
+available. Streamed replies are retried only until their first chunk
+arrives; a stream that breaks later raises, since part of the reply has
+already been delivered.
+
+Errors that are not transient (e.g. an unknown model) are raised at once.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import ollama
+
+# Seconds to wait for a connection and for each read from the server
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_TIMEOUT = 300.0
+
+DEFAULT_RETRIES = 3
+
+# Backoff before retry n is uniform in [0, min(MAX_BACKOFF, BACKOFF * 2**n)]
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 10.0
+
+# Seconds a failed endpoint is skipped while others are available
+DEFAULT_COOLDOWN = 15.0
+
+# Weight of the newest request in an endpoint's average latency
+LATENCY_SMOOTHING = 0.2
+
+
+def parse_hosts(hosts: Optional[str]) -> List[Optional[str]]:
+    """
+    Split a comma-separated list of server URLs.
+
+    Args:
+        hosts: URLs such as ``http://gpu1:11434,http://gpu2:11434``, or None
+
+    Returns:
+        The URLs, or ``[None]`` for the default server (OLLAMA_HOST or
+        http://localhost:11434)
+    """
+    urls = [host.strip() for host in (hosts or "").split(",") if host.strip()]
+    return urls or [None]
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether a failed request may succeed if sent again.
+
+    Args:
+        error: The exception raised by the request
+
+    Returns:
+        True for connection errors, timeouts, and 429 or 5xx responses
+    """
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+class Endpoint:
+    """One Ollama server with its clients and load statistics."""
+
+    def __init__(self, host: Optional[str], timeout: float, connect_timeout: float):
+        """
+        Initialize the endpoint.
+
+        Args:
+            host: URL of the server, or None for the default server
+            timeout: Seconds to wait for each read from the server
+            connect_timeout: Seconds to wait for a connection
+        """
+        self.host = host
+        self.name = host or os.environ.get("OLLAMA_HOST") or "http://localhost:11434"
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.client = ollama.Client(host, timeout=self.timeout)
+        self._async_client: Optional[ollama.AsyncClient] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.latency = 0.0       # Moving average of request seconds
+        self.down_until = 0.0    # time.monotonic() until which the endpoint is skipped
+
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        """The endpoint's async client, created on first use."""
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient(self.host, timeout=self.timeout)
+        return self._async_client
+
+
+class EndpointPool:
+    """Routes chat requests over several Ollama servers with timeouts and retries."""
+
+    def __init__(self, hosts: Optional[List[Optional[str]]] = None, timeout: float = DEFAULT_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, max_backoff: float = DEFAULT_MAX_BACKOFF,
+                 cooldown: float = DEFAULT_COOLDOWN):
+        """
+        Initialize the pool.
+
+        Args:
+            hosts: Server URLs (default: the default server only)
+            timeout: Seconds to wait for each read from a server
+            connect_timeout: Seconds to wait for a connection
+            retries: Times a failed request is sent again
+            backoff: Base of the exponential backoff, in seconds
+            max_backoff: Upper limit of the backoff, in seconds
+            cooldown: Seconds a failed endpoint is skipped while others are available
+        """
+        self.endpoints = [Endpoint(host, timeout, connect_timeout) for host in (hosts or [None])]
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cooldown = cooldown
+        self.retried = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> Endpoint:
+        """Pick the least loaded healthy endpoint and count a request in flight on it."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.down_until <= now]
+            if not candidates:
+                # Everything failed recently: try the one that has rested longest
+                candidates = [min(self.endpoints, key=lambda endpoint: endpoint.down_until)]
+            endpoint = min(candidates, key=lambda endpoint: (endpoint.in_flight, endpoint.latency))
+            endpoint.in_flight += 1
+            return endpoint
+
+    def _release(self, endpoint: Endpoint, seconds: float, error: Optional[BaseException] = None):
+        """Record the outcome of a request on an endpoint."""
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            if error is not None:
+                endpoint.failures += 1
+                if is_retryable(error):
+                    endpoint.down_until = time.monotonic() + self.cooldown
+            else:
+                endpoint.down_until = 0.0
+                endpoint.latency += LATENCY_SMOOTHING * (seconds - endpoint.latency)
+
+    def _get_delay(self, attempt: int) -> float:
+        """Get the jittered backoff before a retry."""
+        with self._lock:
+            self.retried += 1
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def chat(self, **kwargs) -> Any:
+        """
+        Send a chat request, with the arguments of ``ollama.Client.chat``.
+
+        Args:
+            **kwargs: Arguments of ollama.Client.chat
+
+        Returns:
+            The response, or an iterator of response chunks if ``stream`` is True
+
+        Raises:
+            ollama.ResponseError: If the server rejected the request
+            ConnectionError: If no endpoint could be reached
+            httpx.TransportError: If the request timed out or the connection broke
+        """
+        if kwargs.get("stream"):
+            return self._stream_chat(kwargs)
+        for attempt in range(self.retries + 1):
+            endpoint = self._acquire()
+            start = time.monotonic()
+            try:
+                response = endpoint.client.chat(**kwargs)
+            except Exception as e:
+                self._release(endpoint, time.monotonic() - start, e)
+                if not is_retryable(e) or attempt == self.retries:
+                    raise
+                time.sleep(self._get_delay(attempt))
+                continue
+            except BaseException:
+                self._release(endpoint, time.monotonic() - start)
+                raise
+            self._release(endpoint, time.monotonic() - start)
+            return response
+
+    def _stream_chat(self, kwargs: Dict[str, Any]) -> Iterator[Any]:
+        """Generator behind streamed chat requests; retries until the first chunk arrives."""
+        for attempt in range(self.retries + 1):
+            endpoint = self._acquire()
+            start = time.monotonic()
+            chunks = endpoint.client.chat(**kwargs)
+            try:
+                first = next(chunks)
+                break
+            except StopIteration:
+                self._release(endpoint, time.monotonic() - start)
+                return
+            except Exception as e:
+                chunks.close()
+                self._release(endpoint, time.monotonic() - start, e)
+                if not is_retryable(e) or attempt == self.retries:
+                    raise
+                time.sleep(self._get_delay(attempt))
+            except BaseException:
+                # Cancelled (e.g. Ctrl-C) while waiting for the first chunk
+                chunks.close()
+                self._release(endpoint, time.monotonic() - start)
+                raise
+
+        error = None
+        try:
+            yield first
+            yield from chunks
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also runs when the caller closes the stream to cancel the request
+            chunks.close()
+            self._release(endpoint, time.monotonic() - start, error)
+
+    async def async_chat(self, **kwargs) -> Any:
+        """
+        Send a chat request from async code, with the arguments of ``ollama.AsyncClient.chat``.
+
+        Streaming is not supported.
+
+        Args:
+            **kwargs: Arguments of ollama.AsyncClient.chat
+
+        Returns:
+            The response
+
+        Raises:
+            ollama.ResponseError: If the server rejected the request
+            ConnectionError: If no endpoint could be reached
+            httpx.TransportError: If the request timed out or the connection broke
+        """
+        for attempt in range(self.retries + 1):
+            endpoint = self._acquire()
+            start = time.monotonic()
+            try:
+                response = await endpoint.async_client.chat(**kwargs)
+            except Exception as e:
+                self._release(endpoint, time.monotonic() - start, e)
+                if not is_retryable(e) or attempt == self.retries:
+                    raise
+                await asyncio.sleep(self._get_delay(attempt))
+                continue
+            except BaseException:
+                self._release(endpoint, time.monotonic() - start)
+                raise
+            self._release(endpoint, time.monotonic() - start)
+            return response
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get the statistics of every endpoint.
+
+        Returns:
+            One dictionary per endpoint with name, requests, failures,
+            in_flight and latency (seconds)
+        """
+        with self._lock:
+            return [{"name": endpoint.name, "requests": endpoint.requests, "failures": endpoint.failures,
+                     "in_flight": endpoint.in_flight, "latency": endpoint.latency}
+                    for endpoint in self.endpoints]
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Ollama Stub Server - A stand-in for the Ollama HTTP API for trying the generator offline.
+
+Implements enough of ``/api/chat`` for ollama_decision_tree.py and
+tree_builder.py: blocking and streaming (newline-delimited JSON) replies, with
+timing fields in the final chunk. Replies are canned decision tree questions,
+generated word by word with a configurable delay so streaming and
+cancellation can be exercised without a model. Requests with a JSON schema in
+``format`` get a JSON reply that matches the schema. Setting ``failures``
+makes the next chat requests fail with 503, to exercise retries.
+
+Usage:
+    python ollama_stub.py --port 11500 --delay 0.05
+    python ollama_decision_tree.py --host http://127.0.0.1:11500
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+DEFAULT_PORT = 11500
+
+
+def make_reply(messages: List[Dict]) -> str:
+    """
+    Build a canned assistant reply for a conversation.
+
+    Args:
+        messages: The chat messages sent by the client
+
+    Returns:
+        A question with numbered options, mentioning the last user message
+    """
+    last = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    topic = " ".join(last.split()[:8]) or "your decision"
+    turn = sum(1 for m in messages if m.get("role") == "user")
+    return (f"QUESTION: Regarding {topic}, what matters most to you at step {turn}?\n"
+            f"1. Cost\n2. Time\n3. Quality")
+
+
+def make_structured_reply(schema, messages: List[Dict]) -> str:
+    """
+    Build a canned JSON reply matching a JSON schema.
+
+    Objects get all their properties, arrays get three items (within
+    minItems/maxItems), strings with an enum get the first value and other
+    strings a short text mentioning the property and the last user message.
+
+    Args:
+        schema: The JSON schema from the request's ``format``, or ``"json"``
+        messages: The chat messages sent by the client
+
+    Returns:
+        The reply as JSON text
+    """
+    last = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    topic = " ".join(last.split()[:6]) or "your decision"
+
+    def build(node, name: str, position: int):
+        kind = node.get("type")
+        if "enum" in node:
+            return node["enum"][0]
+        if kind == "object":
+            return {key: build(value, key, 0) for key, value in node.get("properties", {}).items()}
+        if kind == "array":
+            count = min(max(3, node.get("minItems", 0)), node.get("maxItems", 3))
+            return [build(node.get("items", {"type": "string"}), name, i + 1) for i in range(count)]
+        if kind in ("integer", "number"):
+            return position
+        if kind == "boolean":
+            return False
+        suffix = f" {position}" if position else ""
+        return f"{name.replace('_', ' ').capitalize()}{suffix} for {topic}"
+
+    if not isinstance(schema, dict):
+        return json.dumps({"reply": make_reply(messages)})
+    return json.dumps(build(schema, "text", 0))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the chat endpoint."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Keep the console quiet."""
+
+    def _send_json(self, status: int, data: Dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-stub"})
+        elif self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model_name}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/api/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            fail = server.failures > 0
+            if fail:
+                server.failures -= 1
+        if fail:
+            self._send_json(503, {"error": "server busy"})
+            return
+        started = time.perf_counter_ns()
+        messages = request.get("messages", [])
+        if request.get("format"):
+            reply = make_structured_reply(request["format"], messages)
+        else:
+            reply = make_reply(messages)
+        words = reply.split(" ")
+        model = request.get("model", server.model_name)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+
+        def final_fields(elapsed_ns: int) -> Dict:
+            return {
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": elapsed_ns,
+                "load_duration": 0,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": prompt_tokens * 100_000,
+                "eval_count": len(words),
+                "eval_duration": max(elapsed_ns, 1),
+            }
+
+        if not request.get("stream", True):
+            time.sleep(server.delay * len(words))
+            data = {"model": model, "created_at": "", "message": {"role": "assistant", "content": reply}}
+            data.update(final_fields(time.perf_counter_ns() - started))
+            self._send_json(200, data)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                time.sleep(server.delay)
+                chunk = {"model": model, "created_at": "", "done": False,
+                         "message": {"role": "assistant", "content": word if i == 0 else " " + word}}
+                self._write_chunk(json.dumps(chunk) + "\n")
+            final = {"model": model, "created_at": "", "message": {"role": "assistant", "content": ""}}
+            final.update(final_fields(time.perf_counter_ns() - started))
+            self._write_chunk(json.dumps(final) + "\n")
+            self._write_chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the request
+            with server.lock:
+                server.cancelled_count += 1
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub's settings and counters."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = DEFAULT_PORT, delay: float = 0.0, model_name: str = "stub"):
+        """
+        Initialize the server.
+
+        Args:
+            port: Port to listen on (0 picks a free port)
+            delay: Seconds to wait before each generated word
+            model_name: Model name reported by /api/tags
+        """
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.delay = delay
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.cancelled_count = 0
+        self.failures = 0  # Number of upcoming chat requests answered with 503
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> threading.Thread:
+        """Serve requests in a background thread."""
+        thread = threading.Thread(target=self.serve_forever, name="ollama-stub", daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    """Run the stub server from the command line."""
+    parser = argparse.ArgumentParser(description="Stand-in Ollama server for offline testing")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--delay", type=float, default=0.05, help="Seconds per generated word (default: 0.05)")
+    args = parser.parse_args()
+
+    server = StubServer(args.port, args.delay)
+    print(f"Stub Ollama server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Response Cache - A persistent, size-bounded cache of model replies.
+
+Generating a reply costs seconds of local GPU/CPU time, and scripted runs of
+the generator send the same prompts again and again. Replies are stored on
+disk, one JSON file per entry, keyed by the SHA-256 of the model name, the
+request options and the normalized message list. Whitespace differences in
+the messages do not change the key.
+
+A hit touches the entry's modification time. When the cache grows past its
+size limit, the least recently used entries are deleted until it is back
+under the low-water mark. Entries are written atomically, so several
+processes can share one cache directory.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+# Default size limit, overridable with DECISION_TREE_LLM_CACHE_MB
+DEFAULT_CACHE_MB = 100
+
+# Fraction of the limit the cache shrinks to when it is exceeded
+LOW_WATER = 0.9
+
+
+def get_default_cache_dir() -> str:
+    """
+    Get the default cache directory.
+
+    Returns:
+        ``$XDG_CACHE_HOME/decision-tree/ollama``, or ``~/.cache/decision-tree/ollama``
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "decision-tree", "ollama")
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Normalize chat messages for hashing.
+
+    Only the role and content are kept, line endings are unified and trailing
+    whitespace is removed from every line.
+
+    Args:
+        messages: Chat messages
+
+    Returns:
+        The normalized messages
+    """
+    normalized = []
+    for message in messages:
+        content = str(message.get("content", "")).replace("\r\n", "\n")
+        content = "\n".join(line.rstrip() for line in content.strip().split("\n"))
+        normalized.append({"role": message.get("role", ""), "content": content})
+    return normalized
+
+
+def make_key(model: str, messages: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None,
+             format: Any = None) -> str:
+    """
+    Build the cache key of a request.
+
+    Args:
+        model: Model name
+        messages: Chat messages sent to the model
+        options: Model options such as temperature
+        format: Output format constraint (``json`` or a JSON schema)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    data = {"model": model, "options": options or {}, "format": format or "",
+            "messages": normalize_messages(messages)}
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """An on-disk LRU cache of model replies."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Open a cache directory, creating it if needed.
+
+        Args:
+            cache_dir: Directory holding the entries (default: get_default_cache_dir())
+            max_bytes: Size limit in bytes (default: DECISION_TREE_LLM_CACHE_MB or 100 MB)
+        """
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("DECISION_TREE_LLM_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024)
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.current_bytes = sum(size for _, _, size in self._scan())
+
+    def _path(self, key: str) -> str:
+        """Path of the file holding an entry; entries are spread over 256 subdirectories."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _scan(self) -> List[tuple]:
+        """List the entries as (mtime, path, size) tuples."""
+        entries = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a reply.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            The stored entry with ``content`` and ``stats``, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, content: str, stats: Optional[Dict[str, Any]] = None):
+        """
+        Store a reply, evicting least recently used entries over the size limit.
+
+        Args:
+            key: Key from make_key
+            content: The reply text
+            stats: Timing statistics of the original request
+        """
+        path = self._path(key)
+        data = json.dumps({"content": content, "stats": stats or {}, "created": time.time()},
+                          ensure_ascii=False).encode("utf-8")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        with self._lock:
+            self.writes += 1
+            self.current_bytes += len(data) - previous
+            over = self.current_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """Delete the least recently used entries until the cache is under the low-water mark."""
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * LOW_WATER)
+        evicted = 0
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.current_bytes = total
+            self.evictions += evicted
+
+    def clear(self):
+        """Delete all entries."""
+        for _, path, _ in self._scan():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self.current_bytes = 0
+
+    def count(self) -> int:
+        """
+        Count the stored entries.
+
+        Returns:
+            Number of cached replies
+        """
+        return len(self._scan())
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, writes, evictions, bytes and max_bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def main():
+    """Inspect or clear the response cache from the command line."""
+    parser = argparse.ArgumentParser(description="Inspect the cache of Ollama replies")
+    parser.add_argument("--cache-dir", help=f"Cache directory (default: {get_default_cache_dir()})")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached replies")
+    args = parser.parse_args()
+
+    try:
+        cache = ResponseCache(args.cache_dir)
+    except OSError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.cache_dir}")
+        return
+    print(f"{cache.cache_dir}: {cache.count()} replies, "
+          f"{cache.current_bytes / 1048576:.1f} of {cache.max_bytes / 1048576:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
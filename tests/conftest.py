@@ -0,0 +1,5 @@
+"""Make the modules in the repository root importable when running pytest directly."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
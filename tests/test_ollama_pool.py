@@ -0,0 +1,74 @@
+"""Tests for the client pool, run against the stub server."""
+import ollama
+import pytest
+
+from ollama_pool import EndpointPool
+from ollama_stub import StubServer
+
+MESSAGES = [{"role": "user", "content": "Pick a pet"}]
+
+
+@pytest.fixture
+def make_server():
+    """Start stub servers on free ports and stop them after the test."""
+    servers = []
+
+    def start(failures: int = 0) -> StubServer:
+        server = StubServer(port=0)
+        server.failures = failures
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_retries_after_503(make_server):
+    server = make_server(failures=1)
+    pool = EndpointPool([server.url], retries=2, backoff=0)
+
+    response = pool.chat(model="stub", messages=MESSAGES)
+
+    assert response["message"]["content"]
+    assert server.request_count == 2
+    assert pool.retried == 1
+    assert pool.stats()[0]["failures"] == 1
+
+
+def test_retries_streamed_request_after_503(make_server):
+    server = make_server(failures=1)
+    pool = EndpointPool([server.url], retries=1, backoff=0)
+
+    chunks = list(pool.chat(model="stub", messages=MESSAGES, stream=True))
+
+    assert "".join(chunk["message"]["content"] for chunk in chunks)
+    assert chunks[-1]["done"]
+    assert server.request_count == 2
+
+
+def test_fails_over_to_second_endpoint(make_server):
+    failing = make_server(failures=10)
+    healthy = make_server()
+    pool = EndpointPool([failing.url, healthy.url], retries=1, backoff=0, cooldown=60)
+
+    pool.chat(model="stub", messages=MESSAGES)
+    # The failed endpoint is skipped while it cools down
+    pool.chat(model="stub", messages=MESSAGES)
+
+    assert failing.request_count == 1
+    assert healthy.request_count == 2
+    assert [endpoint["failures"] for endpoint in pool.stats()] == [1, 0]
+
+
+def test_gives_up_after_retries(make_server):
+    server = make_server(failures=10)
+    pool = EndpointPool([server.url], retries=1, backoff=0)
+
+    with pytest.raises(ollama.ResponseError) as error:
+        pool.chat(model="stub", messages=MESSAGES)
+
+    assert error.value.status_code == 503
+    assert server.request_count == 2
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Tree Batch - Generate decision trees for a list of topics without supervision.
+
+Reads one topic per line from a topics file (blank lines and lines starting
+with ``#`` are ignored) and builds a tree for each with tree_builder. Several
+topics are generated at once. All of them share one client pool and one limit
+on requests in flight, sized to the number of requests the Ollama servers
+handle in parallel, so the servers stay busy without queueing requests.
+
+Each tree is checked with tree_validator and written to the output
+directory as ``<topic>-decision-tree.txt``; a tree with structural errors is
+written to ``<topic>-decision-tree.txt.invalid`` instead. A line with the
+topic's latency and generation speed is printed as each topic finishes,
+followed by a throughput summary. Topics whose tree file already exists are
+skipped, and interrupted topics continue from their checkpoints, so a batch
+can simply be run again after a failure; invalid trees are generated again.
+
+Usage:
+    python tree_batch.py topics.txt --output-dir trees --max-nodes 100
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ollama_decision_tree import DEFAULT_MODEL, format_decision_tree
+from ollama_pool import EndpointPool, parse_hosts
+from response_cache import ResponseCache
+from tree_builder import TreeBuilder, CHECKPOINT_SUFFIX, DEFAULT_MAX_DEPTH, DEFAULT_MAX_NODES, slugify
+from tree_validator import check_file, ERROR
+
+# Ollama's default number of parallel requests per model
+DEFAULT_SERVER_PARALLEL = 4
+
+# Added to the tree file name of a tree that failed validation
+INVALID_SUFFIX = ".invalid"
+
+
+class TopicResult(NamedTuple):
+    """Outcome of generating the tree for one topic."""
+    topic: str
+    path: str
+    status: str              # "ok", "invalid", "failed" or "skipped"
+    seconds: float
+    questions: int
+    results: int
+    requests: int
+    eval_count: int          # Tokens generated
+    tokens_per_second: float
+    error: Optional[str]
+
+
+def read_topics(file_path: str) -> List[str]:
+    """
+    Read the topics file.
+
+    Args:
+        file_path: Path to the file, one topic per line
+
+    Returns:
+        The topics, without blank lines and comments
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    with open(file_path, encoding="utf-8") as file:
+        lines = [line.strip() for line in file]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def get_server_parallelism() -> int:
+    """
+    Get the number of requests the Ollama server handles in parallel.
+
+    The API does not report it, so the server's own setting is read from
+    OLLAMA_NUM_PARALLEL, which is set when the server runs on this machine.
+
+    Returns:
+        OLLAMA_NUM_PARALLEL, or DEFAULT_SERVER_PARALLEL if it is not set
+    """
+    try:
+        return max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", DEFAULT_SERVER_PARALLEL)))
+    except ValueError:
+        return DEFAULT_SERVER_PARALLEL
+
+
+def get_output_paths(topics: List[str], output_dir: str) -> List[str]:
+    """
+    Choose a distinct tree file name for every topic.
+
+    Args:
+        topics: The topics
+        output_dir: Directory the trees are written to
+
+    Returns:
+        One path per topic; topics with the same name stem get a numbered suffix
+    """
+    paths = []
+    used = set()
+    for topic in topics:
+        stem = slugify(topic)
+        name, n = stem, 2
+        while name in used:
+            name = f"{stem}-{n}"
+            n += 1
+        used.add(name)
+        paths.append(os.path.join(output_dir, f"{name}-decision-tree.txt"))
+    return paths
+
+
+async def generate_topic(topic: str, path: str, client: EndpointPool, semaphore: asyncio.Semaphore,
+                         settings: Dict[str, Any]) -> TopicResult:
+    """
+    Generate, validate and write the tree for one topic.
+
+    The tree is written to a temporary file and validated there, so ``path``
+    only ever holds a valid tree.
+
+    Args:
+        topic: What the decision tree is about
+        path: Output tree file
+        client: Client pool shared by all topics
+        semaphore: Limit on requests in flight shared by all topics
+        settings: Other TreeBuilder arguments (model, max_depth, max_nodes, cache)
+
+    Returns:
+        The topic's result
+    """
+    checkpoint = f"{path}{CHECKPOINT_SUFFIX}"
+    start = time.perf_counter()
+    builder = None
+    try:
+        if os.path.exists(checkpoint):
+            builder = TreeBuilder.from_checkpoint(checkpoint, semaphore=semaphore, cache=settings.get("cache"))
+        else:
+            builder = TreeBuilder(topic, checkpoint_path=checkpoint, semaphore=semaphore, **settings)
+        tree = await builder.build(client=client)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(format_decision_tree(tree))
+            _, issues = check_file(temp_path)
+            errors = [issue for issue in issues if issue.severity == ERROR]
+            if errors:
+                # Kept for inspection under another name, so the next run generates it again
+                path = f"{path}{INVALID_SUFFIX}"
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        status, error = ("invalid", str(errors[0])) if errors else ("ok", None)
+    except Exception as e:
+        status, error = "failed", str(e)
+
+    stats = builder.stats if builder is not None else {}
+    eval_count = stats.get("eval_count", 0)
+    eval_duration = stats.get("eval_duration", 0)
+    return TopicResult(
+        topic, path, status, time.perf_counter() - start,
+        builder.question_count if builder is not None else 0,
+        builder.result_count if builder is not None else 0,
+        stats.get("requests", 0), eval_count,
+        eval_count / (eval_duration / 1e9) if eval_duration else 0.0,
+        error,
+    )
+
+
+async def run_batch(topics: List[str], output_dir: str, workers: int, host: Optional[str] = None,
+                    on_result=None, client: Optional[EndpointPool] = None, **settings) -> List[TopicResult]:
+    """
+    Generate the trees for a list of topics.
+
+    Args:
+        topics: The topics
+        output_dir: Directory the trees are written to
+        workers: Number of requests in flight, and of topics generated at once
+        host: URL of the Ollama server, or several separated by commas
+            (default: OLLAMA_HOST or http://localhost:11434)
+        on_result: Function called with each TopicResult as its topic finishes
+        client: Client pool to send the requests through (default: a new pool for ``host``)
+        **settings: Other TreeBuilder arguments (model, max_depth, max_nodes, cache)
+
+    Returns:
+        One result per topic, in the order of the topics
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    client = client or EndpointPool(parse_hosts(host))
+    semaphore = asyncio.Semaphore(workers)
+    queue: asyncio.Queue = asyncio.Queue()
+    results: List[Optional[TopicResult]] = [None] * len(topics)
+    for item in enumerate(zip(topics, get_output_paths(topics, output_dir))):
+        queue.put_nowait(item)
+
+    async def worker():
+        while not queue.empty():
+            position, (topic, path) = queue.get_nowait()
+            if os.path.exists(path):
+                result = TopicResult(topic, path, "skipped", 0.0, 0, 0, 0, 0, 0.0, None)
+            else:
+                result = await generate_topic(topic, path, client, semaphore, settings)
+            results[position] = result
+            if on_result:
+                on_result(result)
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(topics)))))
+    return results
+
+
+def summarize(results: List[TopicResult], elapsed: float) -> Dict[str, Any]:
+    """
+    Compute the throughput summary of a batch.
+
+    Args:
+        results: The topic results
+        elapsed: Wall-clock seconds of the batch
+
+    Returns:
+        Dictionary of counts, latencies and throughput
+    """
+    generated = [result for result in results if result.status in ("ok", "invalid")]
+    latencies = sorted(result.seconds for result in generated)
+    eval_count = sum(result.eval_count for result in results)
+    return {
+        "topics": len(results),
+        "ok": sum(1 for result in results if result.status == "ok"),
+        "invalid": sum(1 for result in results if result.status == "invalid"),
+        "failed": sum(1 for result in results if result.status == "failed"),
+        "skipped": sum(1 for result in results if result.status == "skipped"),
+        "seconds": elapsed,
+        "requests": sum(result.requests for result in results),
+        "nodes": sum(result.questions + result.results for result in generated),
+        "eval_count": eval_count,
+        "tokens_per_second": eval_count / elapsed if elapsed else 0.0,
+        "trees_per_minute": len(generated) / elapsed * 60 if elapsed else 0.0,
+        "median_latency": latencies[len(latencies) // 2] if latencies else 0.0,
+        "max_latency": latencies[-1] if latencies else 0.0,
+    }
+
+
+def main():
+    """Generate decision trees for a topics file from the command line."""
+    parser = argparse.ArgumentParser(description="Generate decision trees for every topic in a file with Ollama")
+    parser.add_argument("topics", help="File with one topic per line")
+    parser.add_argument("--output-dir", "-o", default=".", help="Directory for the tree files (default: .)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Ollama model to use (default: {DEFAULT_MODEL})")
+    parser.add_argument("--host", help="URL of the Ollama server, or several separated by commas (default: OLLAMA_HOST or http://localhost:11434)")
+    parser.add_argument("--workers", type=int,
+                        help=f"Requests in flight (default: OLLAMA_NUM_PARALLEL or {DEFAULT_SERVER_PARALLEL}, "
+                             f"per server)")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                        help=f"Number of levels per tree (default: {DEFAULT_MAX_DEPTH})")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES,
+                        help=f"Maximum number of nodes per tree (default: {DEFAULT_MAX_NODES})")
+    parser.add_argument("--report", help="Also write the per-topic results and summary to this JSON file")
+    parser.add_argument("--no-cache", action="store_true", help="Always ask the model instead of reusing cached replies")
+    parser.add_argument("--cache-dir", help="Directory of the reply cache (default: ~/.cache/decision-tree/ollama)")
+    args = parser.parse_args()
+
+    try:
+        topics = read_topics(args.topics)
+        cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    except OSError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    if not topics:
+        print(f"Error: No topics found in {args.topics}")
+        sys.exit(1)
+    hosts = parse_hosts(args.host)
+    client = EndpointPool(hosts)
+    workers = args.workers or get_server_parallelism() * len(hosts)
+    print(f"Generating {len(topics)} trees with {args.model}, {workers} requests in flight")
+
+    finished = 0
+
+    def report(result: TopicResult):
+        nonlocal finished
+        finished += 1
+        line = f"[{finished}/{len(topics)}] {result.status:<7} {result.path}"
+        if result.status in ("ok", "invalid"):
+            line += (f": {result.questions + result.results} nodes in {result.seconds:.1f}s, "
+                     f"{result.tokens_per_second:.1f} tokens/s")
+        if result.error:
+            line += f" ({result.error})"
+        print(line)
+
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(run_batch(topics, args.output_dir, workers, on_result=report, client=client,
+                                        model=args.model, max_depth=args.max_depth,
+                                        max_nodes=args.max_nodes, cache=cache))
+    except KeyboardInterrupt:
+        print("\nInterrupted. Run the same command again to continue.")
+        sys.exit(1)
+    summary = summarize(results, time.perf_counter() - start)
+
+    print(f"\n{summary['ok']} ok, {summary['invalid']} invalid, {summary['failed']} failed, "
+          f"{summary['skipped']} skipped in {summary['seconds']:.1f}s")
+    print(f"{summary['nodes']} nodes from {summary['requests']} requests: "
+          f"{summary['trees_per_minute']:.1f} trees/min, {summary['tokens_per_second']:.1f} tokens/s overall, "
+          f"latency median {summary['median_latency']:.1f}s, max {summary['max_latency']:.1f}s")
+    if len(hosts) > 1:
+        for endpoint in client.stats():
+            print(f"  {endpoint['name']}: {endpoint['requests']} requests, {endpoint['failures']} failed, "
+                  f"{endpoint['latency']:.2f}s average latency")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump({"summary": summary, "topics": [result._asdict() for result in results]}, file, indent=2)
+        print(f"Report written to {args.report}")
+
+    sys.exit(1 if summary["failed"] or summary["invalid"] else 0)
+
+
+if __name__ == "__main__":
+    main()
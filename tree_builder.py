@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Tree Builder - Generate a complete decision tree about a topic with Ollama.
+
+The interactive generator builds a tree one chat turn at a time, with a
+person typing every step. The builder asks the model for each node on its
+own: given the topic and the answers that lead to a node, the model writes
+the next question with its answers, or a final recommendation. The tree is
+expanded breadth first. All open branches of a level are requested
+concurrently through an ollama_pool.EndpointPool, with at most ``concurrency``
+requests in flight, so a 200-node tree takes minutes rather than hours.
+
+Replies are requested as JSON matching a schema, so no free-text parsing is
+needed. Node IDs are assigned in breadth-first order once a level is
+complete, so the output does not depend on the order in which replies
+arrive.
+
+After every reply the state is written to a JSON checkpoint. An interrupted
+or failed run continues from the checkpoint with ``--resume``, and only the
+missing nodes are requested again. The finished tree is written in the Q/A
+format read by decision_tree.py.
+
+Usage:
+    python tree_builder.py "Should I move abroad?" --max-nodes 200 --concurrency 8
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from conversation_tree import clean_text
+from ollama_decision_tree import DEFAULT_MODEL, format_decision_tree
+from ollama_pool import EndpointPool, parse_hosts
+from response_cache import ResponseCache, make_key
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_DEPTH = 4
+DEFAULT_MAX_NODES = 200
+
+# Appended to the output file name to get the default checkpoint file
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+# Answers per question the model is asked for
+MIN_ANSWERS = 2
+MAX_ANSWERS = 4
+
+SYSTEM_PROMPT = (
+    "You are a decision tree creation assistant. You write one node of a decision tree at a time. "
+    "Questions are short and concrete, answers are a few words each, and recommendations are one or "
+    "two sentences that follow from the answers given."
+)
+
+# Reply schema for nodes that may be questions or results
+NODE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "kind": {"type": "string", "enum": ["question", "result"]},
+        "text": {"type": "string"},
+        "answers": {"type": "array", "items": {"type": "string"}, "minItems": 0, "maxItems": MAX_ANSWERS},
+    },
+    "required": ["kind", "text", "answers"],
+}
+
+# Reply schema for nodes that must be results
+RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {"text": {"type": "string"}},
+    "required": ["text"],
+}
+
+
+def parse_node_reply(content: str, final: bool) -> Dict[str, Any]:
+    """
+    Check and normalize the JSON reply for one node.
+
+    Args:
+        content: The reply text
+        final: Whether the node was requested as a result
+
+    Returns:
+        Dictionary with ``kind``, ``text`` and ``answers``
+
+    Raises:
+        ValueError: If the reply is not valid JSON or misses required fields
+    """
+    data = json.loads(content)
+    if not isinstance(data, dict) or not isinstance(data.get("text"), str) or not clean_text(data["text"]):
+        raise ValueError("Reply has no text")
+    text = clean_text(data["text"])
+    if final or data.get("kind") == "result":
+        return {"kind": "result", "text": text, "answers": []}
+
+    answers = []
+    for answer in data.get("answers") or []:
+        answer = clean_text(str(answer))
+        if answer and answer not in answers:
+            answers.append(answer)
+    if len(answers) < MIN_ANSWERS:
+        raise ValueError(f"Question has {len(answers)} answers")
+    return {"kind": "question", "text": text, "answers": answers[:MAX_ANSWERS]}
+
+
+def slugify(text: str) -> str:
+    """
+    Turn a topic into a file name stem.
+
+    Args:
+        text: The topic
+
+    Returns:
+        Lowercase words joined by hyphens
+    """
+    return "-".join(re.findall(r"[a-z0-9]+", text.lower())[:8]) or "topic"
+
+
+class TreeBuilder:
+    """Builds a decision tree breadth first with concurrent Ollama requests."""
+
+    def __init__(self, topic: str, model: str = DEFAULT_MODEL, host: Optional[str] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_depth: int = DEFAULT_MAX_DEPTH,
+                 max_nodes: int = DEFAULT_MAX_NODES, options: Optional[Dict[str, Any]] = None,
+                 cache: Optional[ResponseCache] = None, checkpoint_path: Optional[str] = None,
+                 retries: int = 2, semaphore: Optional[asyncio.Semaphore] = None):
+        """
+        Initialize the builder.
+
+        Args:
+            topic: What the decision tree is about
+            model: The Ollama model to use
+            host: URL of the Ollama server, or several separated by commas
+                (default: OLLAMA_HOST or http://localhost:11434)
+            concurrency: Maximum number of requests in flight
+            max_depth: Number of levels; nodes on the last level are results
+            max_nodes: Maximum number of nodes in the tree
+            options: Model options such as temperature
+            cache: Optional ResponseCache for replies to identical requests
+            checkpoint_path: JSON file the state is saved to after every reply
+            retries: Times an invalid reply is requested again
+            semaphore: Limit on requests in flight shared with other builders
+                (default: a limit of ``concurrency`` for this builder alone)
+        """
+        if max_depth < 2:
+            raise ValueError("max_depth must be at least 2")
+        if max_nodes < 1 + MIN_ANSWERS:
+            raise ValueError(f"max_nodes must be at least {1 + MIN_ANSWERS}")
+        self.topic = topic
+        self.model = model
+        self.host = host
+        self.concurrency = max(1, concurrency)
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.options = options
+        self.cache = cache
+        self.checkpoint_path = checkpoint_path
+        self.retries = retries
+        self.semaphore = semaphore
+
+        # The tree, in the structure used by format_decision_tree
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.parents: Dict[str, Tuple[str, int]] = {}
+        self.question_count = 0
+        self.result_count = 0
+        # Nodes of the level being expanded, and their replies by position
+        self.pending: List[Dict[str, Any]] = [{"parent": None, "answer": 0, "depth": 1}]
+        self.replies: Dict[int, Dict[str, Any]] = {}
+        self.allocated = 1  # Nodes created or pending
+        self.stats = {"requests": 0, "cached": 0, "eval_count": 0, "eval_duration": 0, "seconds": 0.0}
+
+    @property
+    def done(self) -> bool:
+        """Whether every branch ends in a result."""
+        return not self.pending
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the builder state for a checkpoint.
+
+        Returns:
+            JSON-serializable dictionary
+        """
+        return {
+            "topic": self.topic,
+            "model": self.model,
+            "max_depth": self.max_depth,
+            "max_nodes": self.max_nodes,
+            "nodes": self.nodes,
+            "parents": self.parents,
+            "question_count": self.question_count,
+            "result_count": self.result_count,
+            "pending": self.pending,
+            "replies": {str(position): reply for position, reply in self.replies.items()},
+            "allocated": self.allocated,
+            "stats": self.stats,
+        }
+
+    def save_checkpoint(self):
+        """Write the state to the checkpoint file, replacing it atomically."""
+        if not self.checkpoint_path:
+            return
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file)
+        os.replace(temp_path, self.checkpoint_path)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint_path: str, **kwargs) -> "TreeBuilder":
+        """
+        Restore a builder from a checkpoint file.
+
+        Args:
+            checkpoint_path: Path to the checkpoint
+            **kwargs: Other TreeBuilder arguments (host, concurrency, cache, ...)
+
+        Returns:
+            The restored builder, saving further progress to the same file
+
+        Raises:
+            FileNotFoundError: If the checkpoint doesn't exist
+            ValueError: If the checkpoint is not valid JSON
+        """
+        with open(checkpoint_path, encoding="utf-8") as file:
+            state = json.load(file)
+        kwargs.setdefault("model", state["model"])
+        builder = cls(state["topic"], max_depth=state["max_depth"], max_nodes=state["max_nodes"],
+                      checkpoint_path=checkpoint_path, **kwargs)
+        builder.nodes = state["nodes"]
+        builder.parents = {node_id: tuple(parent) for node_id, parent in state["parents"].items()}
+        builder.question_count = state["question_count"]
+        builder.result_count = state["result_count"]
+        builder.pending = state["pending"]
+        builder.replies = {int(position): reply for position, reply in state["replies"].items()}
+        builder.allocated = state["allocated"]
+        builder.stats.update(state["stats"])
+        return builder
+
+    def get_path(self, entry: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """
+        Get the questions and answers leading to a pending node.
+
+        Args:
+            entry: The pending node
+
+        Returns:
+            List of (question text, answer text) pairs, starting at the root
+        """
+        path = []
+        parent, answer = entry["parent"], entry["answer"]
+        while parent is not None:
+            node = self.nodes[parent]
+            path.append((node["text"], node["answers"][answer]["text"]))
+            parent, answer = self.parents.get(parent, (None, 0))
+        path.reverse()
+        return path
+
+    def get_messages(self, entry: Dict[str, Any], final: bool) -> List[Dict[str, str]]:
+        """
+        Build the request for one node.
+
+        Args:
+            entry: The pending node
+            final: Whether the node must be a result
+
+        Returns:
+            The chat messages
+        """
+        lines = [f"Topic: {self.topic}", ""]
+        path = self.get_path(entry)
+        if path:
+            lines.append("Answers given so far:")
+            lines.extend(f"{i}. {question} -> {answer}" for i, (question, answer) in enumerate(path, 1))
+            lines.append("")
+        if final:
+            lines.append("The decision is made. Write the final recommendation for these answers as the text.")
+        elif not path:
+            lines.append(f"Write the first question to ask, with {MIN_ANSWERS} to {MAX_ANSWERS} short answers.")
+        else:
+            lines.append(f"Write the next question to ask, with {MIN_ANSWERS} to {MAX_ANSWERS} short answers, "
+                         "as a question. If the answers so far settle the decision, write the final "
+                         "recommendation instead, as a result without answers.")
+        return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "\n".join(lines)}]
+
+    async def request_node(self, client: EndpointPool, semaphore: asyncio.Semaphore,
+                           entry: Dict[str, Any], final: bool) -> Dict[str, Any]:
+        """
+        Ask the model for one node.
+
+        Args:
+            client: The client pool to send requests through
+            semaphore: Limits the number of requests in flight
+            entry: The pending node
+            final: Whether the node must be a result
+
+        Returns:
+            The parsed reply, see parse_node_reply
+
+        Raises:
+            ValueError: If the model gave no valid reply after all retries
+        """
+        schema = RESULT_SCHEMA if final else NODE_SCHEMA
+        messages = self.get_messages(entry, final)
+        key = make_key(self.model, messages, self.options, schema) if self.cache else None
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            try:
+                reply = parse_node_reply(cached["content"], final)
+                self.stats["cached"] += 1
+                return reply
+            except ValueError:
+                pass
+
+        error = None
+        for _ in range(self.retries + 1):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.async_chat(model=self.model, messages=messages, format=schema,
+                                                   options=self.options)
+                self.stats["seconds"] += time.perf_counter() - start
+            self.stats["requests"] += 1
+            self.stats["eval_count"] += response.get("eval_count") or 0
+            self.stats["eval_duration"] += response.get("eval_duration") or 0
+            content = response["message"]["content"]
+            try:
+                reply = parse_node_reply(content, final)
+            except ValueError as e:
+                error = e
+                continue
+            if key:
+                self.cache.put(key, content)
+            return reply
+        raise ValueError(f"No valid reply for the node after {self.retries + 1} attempts: {error}")
+
+    async def _request_all(self, client: EndpointPool, positions: List[int], final: Callable[[int], bool]):
+        """Request the nodes at the given pending positions concurrently, saving each reply as it arrives."""
+        semaphore = self.semaphore or asyncio.Semaphore(self.concurrency)
+
+        async def run(position: int):
+            reply = await self.request_node(client, semaphore, self.pending[position], final(position))
+            self.replies[position] = reply
+            self.save_checkpoint()
+
+        results = await asyncio.gather(*(run(position) for position in positions), return_exceptions=True)
+        # Let every request finish before reporting a failure, so no reply is lost
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def expand_level(self, client: EndpointPool) -> Dict[str, int]:
+        """
+        Request every pending node of the current level and add them to the tree.
+
+        Args:
+            client: The client pool to send requests through
+
+        Returns:
+            Dictionary with the level's depth and its question and result counts
+        """
+        depth = self.pending[0]["depth"]
+
+        def is_final(position: int) -> bool:
+            return self.pending[position]["depth"] >= self.max_depth
+
+        missing = [position for position in range(len(self.pending)) if position not in self.replies]
+        await self._request_all(client, missing, is_final)
+
+        # Questions whose answers no longer fit in the node budget become results
+        allocated = self.allocated
+        too_big = []
+        for position in range(len(self.pending)):
+            reply = self.replies[position]
+            if reply["kind"] == "question":
+                room = self.max_nodes - allocated
+                if room < MIN_ANSWERS:
+                    too_big.append(position)
+                else:
+                    reply["answers"] = reply["answers"][:room]
+                    allocated += len(reply["answers"])
+        if too_big:
+            for position in too_big:
+                del self.replies[position]
+            await self._request_all(client, too_big, lambda position: True)
+
+        # Assign IDs in breadth-first order and link the nodes to their parents
+        next_level = []
+        for position, entry in enumerate(self.pending):
+            reply = self.replies[position]
+            if reply["kind"] == "question":
+                self.question_count += 1
+                node_id = f"Q{self.question_count}"
+                self.nodes[node_id] = {
+                    "text": reply["text"],
+                    "is_result": False,
+                    "answers": [{"text": answer, "next_node_id": None} for answer in reply["answers"]],
+                }
+                next_level.extend({"parent": node_id, "answer": i, "depth": depth + 1}
+                                  for i in range(len(reply["answers"])))
+            else:
+                self.result_count += 1
+                node_id = f"R{self.result_count}"
+                self.nodes[node_id] = {"text": reply["text"], "is_result": True, "answers": []}
+            if entry["parent"] is not None:
+                self.parents[node_id] = (entry["parent"], entry["answer"])
+                self.nodes[entry["parent"]]["answers"][entry["answer"]]["next_node_id"] = node_id
+
+        questions = sum(1 for reply in self.replies.values() if reply["kind"] == "question")
+        level = {"depth": depth, "questions": questions, "results": len(self.pending) - questions}
+        self.allocated = allocated
+        self.pending = next_level
+        self.replies = {}
+        self.save_checkpoint()
+        return level
+
+    async def build(self, on_level: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    client: Optional[EndpointPool] = None) -> Dict[str, Any]:
+        """
+        Expand levels until every branch ends in a result.
+
+        Args:
+            on_level: Function called with the counts and duration of each finished level
+            client: Client pool to send the requests through (default: a new pool for ``host``)
+
+        Returns:
+            The tree, in the structure used by format_decision_tree
+        """
+        client = client or EndpointPool(parse_hosts(self.host))
+        while self.pending:
+            start = time.perf_counter()
+            level = await self.expand_level(client)
+            level["seconds"] = time.perf_counter() - start
+            if on_level:
+                on_level(level)
+        return self.get_tree()
+
+    def get_tree(self) -> Dict[str, Any]:
+        """
+        Get the tree built so far.
+
+        Returns:
+            The tree, in the structure used by format_decision_tree
+        """
+        return {"nodes": self.nodes}
+
+
+def main():
+    """Build a decision tree from the command line."""
+    parser = argparse.ArgumentParser(description="Generate a complete decision tree about a topic with Ollama")
+    parser.add_argument("topic", nargs="?", help="What the decision tree is about")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Ollama model to use (default: {DEFAULT_MODEL})")
+    parser.add_argument("--host", help="URL of the Ollama server, or several separated by commas (default: OLLAMA_HOST or http://localhost:11434)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum number of requests in flight (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                        help=f"Number of levels, the last one holding results (default: {DEFAULT_MAX_DEPTH})")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES,
+                        help=f"Maximum number of nodes (default: {DEFAULT_MAX_NODES})")
+    parser.add_argument("--output", "-o", help="Output tree file (default: <topic>-decision-tree.txt)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint file")
+    parser.add_argument("--no-cache", action="store_true", help="Always ask the model instead of reusing cached replies")
+    parser.add_argument("--cache-dir", help="Directory of the reply cache (default: ~/.cache/decision-tree/ollama)")
+    args = parser.parse_args()
+
+    if not args.topic and not (args.resume and args.checkpoint):
+        parser.error("a topic is required unless --resume is given with --checkpoint")
+    # With --resume --checkpoint the topic comes from the checkpoint, so the
+    # default output is only known once it is loaded
+    output = args.output or (f"{slugify(args.topic)}-decision-tree.txt" if args.topic else None)
+    checkpoint = args.checkpoint or f"{output}{CHECKPOINT_SUFFIX}"
+
+    try:
+        cache = None if args.no_cache else ResponseCache(args.cache_dir)
+        settings = dict(host=args.host, concurrency=args.concurrency, cache=cache)
+        if args.resume:
+            builder = TreeBuilder.from_checkpoint(checkpoint, **settings)
+            print(f"Resuming '{builder.topic}' from {checkpoint}: {len(builder.nodes)} nodes done, "
+                  f"{len(builder.pending)} pending")
+        else:
+            builder = TreeBuilder(args.topic, model=args.model, max_depth=args.max_depth,
+                                  max_nodes=args.max_nodes, checkpoint_path=checkpoint, **settings)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    if output is None:
+        if checkpoint.endswith(CHECKPOINT_SUFFIX) and len(checkpoint) > len(CHECKPOINT_SUFFIX):
+            output = checkpoint[:-len(CHECKPOINT_SUFFIX)]
+        else:
+            output = f"{slugify(builder.topic)}-decision-tree.txt"
+
+    def report(level):
+        print(f"Level {level['depth']}: {level['questions']} questions, {level['results']} results "
+              f"in {level['seconds']:.1f}s")
+
+    start = time.perf_counter()
+    try:
+        tree = asyncio.run(builder.build(report))
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Continue with: python tree_builder.py --resume --checkpoint {checkpoint}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        print(f"Progress is saved. Continue with: python tree_builder.py --resume --checkpoint {checkpoint}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    with open(output, "w", encoding="utf-8") as file:
+        file.write(format_decision_tree(tree))
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    stats = builder.stats
+    tokens_per_second = stats["eval_count"] / (stats["eval_duration"] / 1e9) if stats["eval_duration"] else 0.0
+    print(f"\nWrote {output}: {builder.question_count} questions, {builder.result_count} results")
+    print(f"{stats['requests']} requests ({stats['cached']} cached replies) in {elapsed:.1f}s, "
+          f"{tokens_per_second:.1f} tokens/s")
+    print(f"Navigate it with: python decision_tree.py {output}")
+
+
+if __name__ == "__main__":
+    main()
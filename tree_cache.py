@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Shared Tree Cache - A process-wide, size-bounded cache of loaded decision trees.
+
+Every Streamlit session that loads the same file would otherwise parse it again
+and keep a private copy. Trees in this cache are shared between sessions and
+must be treated as read-only; each session keeps its own navigation state.
+
+Entries are keyed by (absolute path, mtime, size, content hash), so an edited
+file is loaded afresh while unchanged files are parsed once per process. When
+the estimated memory of the cached trees exceeds the budget, the least
+recently used trees are evicted.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from decision_tree import DecisionTree
+from compiled_tree import load_tree
+
+# Default memory budget, overridable with the DECISION_TREE_CACHE_MB environment variable
+DEFAULT_CACHE_MB = 256
+
+CacheKey = Tuple[str, int, int, str]
+
+
+def get_cache_key(file_path: str) -> CacheKey:
+    """
+    Build the cache key of a decision tree file.
+
+    Args:
+        file_path: Path to the decision tree file
+
+    Returns:
+        An (absolute path, mtime in ns, size, SHA-256 hex digest) tuple
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        stat = os.fstat(file.fileno())
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, digest.hexdigest()
+
+
+class TreeCache:
+    """A thread-safe LRU cache of read-only decision trees with a memory budget."""
+
+    def __init__(self, max_bytes: int, loader: Callable[[str], DecisionTree] = load_tree):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget for cached trees, in bytes
+            loader: Function used to load a tree on a cache miss
+        """
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[DecisionTree, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[CacheKey, threading.Lock] = {}
+        self._latest: Dict[str, CacheKey] = {}  # Absolute path to the key of its newest cached version
+
+    def get(self, file_path: str) -> DecisionTree:
+        """
+        Get the tree for a file, loading it if it is not cached.
+
+        Concurrent requests for the same uncached file wait for a single load.
+
+        Args:
+            file_path: Path to the decision tree file
+
+        Returns:
+            The shared, read-only decision tree
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ValueError: If the file format is invalid
+        """
+        key = get_cache_key(file_path)
+
+        with self._lock:
+            tree = self._lookup(key)
+            if tree is not None:
+                self.hits += 1
+                return tree
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                tree = self._lookup(key)
+                if tree is not None:
+                    self.hits += 1
+                    return tree
+                self.misses += 1
+
+            try:
+                tree = self.loader(file_path)
+                self._store(key, tree)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+        return tree
+
+    def put(self, key: CacheKey, tree: DecisionTree) -> DecisionTree:
+        """
+        Add a tree that was loaded elsewhere, replacing older versions of its file.
+
+        Used by the tree catalog, which has already parsed a changed file, so
+        that the file is not parsed again on the next get.
+
+        Args:
+            key: Cache key of the file version the tree was loaded from
+            tree: The loaded tree
+
+        Returns:
+            The cached tree for the key, which is ``tree`` unless that
+            version of the file was already cached
+        """
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+        self._store(key, tree)
+        return tree
+
+    def latest(self, file_path: str) -> Optional[DecisionTree]:
+        """
+        Get the newest cached version of a file without reading the file.
+
+        Sessions call this on every rerun to find out whether their tree has
+        been replaced by a reload, so it must stay cheap.
+
+        Args:
+            file_path: Path to the decision tree file
+
+        Returns:
+            The newest cached tree, or None if the file is not cached
+        """
+        with self._lock:
+            key = self._latest.get(os.path.abspath(file_path))
+            entry = self._entries.get(key) if key is not None else None
+            return entry[0] if entry is not None else None
+
+    def _lookup(self, key: CacheKey) -> Optional[DecisionTree]:
+        """Return a cached tree and mark it as most recently used. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key: CacheKey, tree: DecisionTree):
+        """Insert a tree and evict least recently used entries over the budget."""
+        size = tree.estimate_memory()
+        with self._lock:
+            # Older versions of the same file will never be requested again
+            for stale_key in [k for k in self._entries if k[0] == key[0]]:
+                self._remove(stale_key)
+
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (tree, size)
+            self._latest[key[0]] = key
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def update_size(self, tree: DecisionTree):
+        """
+        Re-estimate the memory of a cached tree that has grown.
+
+        Trees grow in place when included files are added to them, which
+        leaves the size recorded when they were cached out of date.
+
+        Args:
+            tree: A tree returned by get
+        """
+        size = tree.estimate_memory()
+        with self._lock:
+            for key, (cached, previous_size) in self._entries.items():
+                if cached is tree:
+                    self._entries[key] = (tree, size)
+                    self.current_bytes += size - previous_size
+                    break
+            else:
+                return
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        """Remove an entry. Caller holds the lock."""
+        _, size = self._entries.pop(key)
+        self.current_bytes -= size
+        if self._latest.get(key[0]) == key:
+            del self._latest[key[0]]
+
+    def clear(self):
+        """Remove all cached trees."""
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, evictions, entries, bytes and max_bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_shared_cache: Optional[TreeCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> TreeCache:
+    """
+    Get the process-wide tree cache, creating it on first use.
+
+    The memory budget is read from the DECISION_TREE_CACHE_MB environment
+    variable (default: 256 MB).
+
+    Returns:
+        The shared TreeCache instance
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            max_mb = float(os.environ.get("DECISION_TREE_CACHE_MB", DEFAULT_CACHE_MB))
+            _shared_cache = TreeCache(int(max_mb * 1024 * 1024))
+        return _shared_cache
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Tree Catalog - An index of the decision tree files available to the navigator.
+
+The Streamlit sidebar used to glob ``*.txt`` on every rerun and could not
+tell decision trees from other text files until a user tried to load one.
+The catalog scans the configured directories in a background thread and
+keeps metadata for every file: whether it parses, its question and result
+counts, the number of structural errors, how long it took to parse and its
+content hash. A file is parsed again only when its modification time or size
+changes, so rescans of an unchanged directory cost one stat per file.
+
+Listeners registered with ``add_listener`` are called from the background
+thread whenever a known file changes, with the tree that was just parsed,
+which the Streamlit app uses to reload edited trees while users are
+navigating them without parsing them a second time.
+"""
+import os
+import sys
+import glob
+import time
+import hashlib
+import argparse
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from decision_tree import DecisionTree
+from compiled_tree import load_tree
+from tree_validator import validate_tree, ERROR
+
+# Seconds between background rescans
+DEFAULT_SCAN_INTERVAL = 5.0
+
+
+class CatalogEntry(NamedTuple):
+    """Metadata about one candidate decision tree file."""
+    path: str
+    mtime_ns: int
+    size: int
+    sha256: str
+    valid: bool              # Whether the file parses as a decision tree
+    question_count: int
+    result_count: int
+    error_count: int         # Structural errors found by tree_validator
+    parse_seconds: float
+    error: Optional[str]     # Parse error message of invalid files
+
+
+def probe_file(file_path: str, loader: Callable[[str], DecisionTree] = load_tree) -> CatalogEntry:
+    """
+    Parse a file and collect its catalog metadata.
+
+    Args:
+        file_path: Path to the candidate decision tree file
+        loader: Function used to load the tree
+
+    Returns:
+        The catalog entry, with ``valid`` False if the file does not parse
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    return load_and_probe(file_path, loader)[0]
+
+
+def load_and_probe(file_path: str,
+                   loader: Callable[[str], DecisionTree] = load_tree) -> Tuple[CatalogEntry, Optional[DecisionTree]]:
+    """
+    Parse a file and collect its catalog metadata, keeping the parsed tree.
+
+    Args:
+        file_path: Path to the candidate decision tree file
+        loader: Function used to load the tree
+
+    Returns:
+        The catalog entry and the tree, which is None if the file does not parse
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+
+    start = time.perf_counter()
+    try:
+        tree = loader(file_path)
+    except ValueError as e:
+        return CatalogEntry(file_path, stat.st_mtime_ns, stat.st_size, digest.hexdigest(),
+                            False, 0, 0, 0, time.perf_counter() - start, str(e)), None
+    parse_seconds = time.perf_counter() - start
+
+    question_count, result_count = tree.get_node_counts()
+    error_count = sum(1 for issue in validate_tree(tree) if issue.severity == ERROR)
+    return CatalogEntry(file_path, stat.st_mtime_ns, stat.st_size, digest.hexdigest(),
+                        True, question_count, result_count, error_count, parse_seconds, None), tree
+
+
+class TreeCatalog:
+    """A thread-safe catalog of decision tree files, refreshed in the background."""
+
+    def __init__(self, directories: List[str], pattern: str = "*.txt",
+                 interval: float = DEFAULT_SCAN_INTERVAL,
+                 loader: Callable[[str], DecisionTree] = load_tree):
+        """
+        Initialize the catalog.
+
+        Args:
+            directories: Directories to scan
+            pattern: Glob pattern of candidate files within each directory
+            interval: Seconds between background rescans
+            loader: Function used to load trees when probing files
+        """
+        self.directories = list(directories)
+        self.pattern = pattern
+        self.interval = interval
+        self.loader = loader
+        self.scans = 0
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[CatalogEntry, Optional[DecisionTree]], None]] = []
+
+    def add_listener(self, listener: Callable[[CatalogEntry, Optional[DecisionTree]], None]):
+        """
+        Register a function called with the new entry whenever a known file changes.
+
+        Listeners run on the thread that calls refresh, after the catalog has
+        been updated. Exceptions raised by a listener are ignored.
+
+        Args:
+            listener: Function taking the changed CatalogEntry and the tree
+                parsed while probing it (None if the file does not parse)
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def refresh(self) -> int:
+        """
+        Rescan the directories and probe new or changed files.
+
+        Returns:
+            Number of files that were added, changed or removed
+        """
+        paths = []
+        for directory in self.directories:
+            paths.extend(os.path.normpath(path) for path in glob.glob(os.path.join(directory, self.pattern)))
+
+        with self._lock:
+            known = dict(self._entries)
+
+        updated: Dict[str, CatalogEntry] = {}
+        # Trees of changed files, only kept until the listeners have seen them
+        changed_trees: Dict[str, Optional[DecisionTree]] = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = known.get(path)
+            if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                try:
+                    updated[path], tree = load_and_probe(path, self.loader)
+                except OSError:
+                    continue
+                if entry is not None:
+                    changed_trees[path] = tree
+
+        removed = set(known) - set(paths)
+        with self._lock:
+            self._entries.update(updated)
+            for path in removed:
+                self._entries.pop(path, None)
+            self.scans += 1
+            listeners = list(self._listeners)
+        self._ready.set()
+
+        for path, tree in changed_trees.items():
+            for listener in listeners:
+                try:
+                    listener(updated[path], tree)
+                except Exception:
+                    pass
+        return len(updated) + len(removed)
+
+    def start(self):
+        """Start rescanning in a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="tree-catalog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """Background loop: rescan until stopped."""
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                # A failed scan must not kill the worker; the next scan retries
+                self._ready.set()
+            self._stop.wait(self.interval)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the first scan to finish.
+
+        Args:
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            True if at least one scan has finished
+        """
+        return self._ready.wait(timeout)
+
+    def entries(self) -> List[CatalogEntry]:
+        """
+        Get all catalog entries.
+
+        Returns:
+            Entries sorted by path
+        """
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda entry: entry.path)
+
+    def get(self, file_path: str) -> Optional[CatalogEntry]:
+        """
+        Get the entry of one file.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            The entry, or None if the file is not in the catalog
+        """
+        with self._lock:
+            return self._entries.get(os.path.normpath(file_path))
+
+    def valid_files(self) -> List[str]:
+        """
+        Get the files that parse as decision trees.
+
+        Returns:
+            Paths sorted alphabetically
+        """
+        return [entry.path for entry in self.entries() if entry.valid]
+
+
+_shared_catalog: Optional[TreeCatalog] = None
+_shared_catalog_lock = threading.Lock()
+
+
+def get_shared_catalog() -> TreeCatalog:
+    """
+    Get the process-wide catalog, creating and starting it on first use.
+
+    The directories to scan are read from the DECISION_TREE_DIRS environment
+    variable (separated by os.pathsep, default: the current directory).
+
+    Returns:
+        The shared TreeCatalog instance
+    """
+    global _shared_catalog
+    with _shared_catalog_lock:
+        if _shared_catalog is None:
+            directories = os.environ.get("DECISION_TREE_DIRS", ".").split(os.pathsep)
+            _shared_catalog = TreeCatalog([d for d in directories if d])
+            _shared_catalog.start()
+        return _shared_catalog
+
+
+def main():
+    """Print the catalog of decision tree files from the command line."""
+    parser = argparse.ArgumentParser(description="List the decision tree files in one or more directories")
+    parser.add_argument("directories", nargs="*", default=["."], help="Directories to scan (default: .)")
+    parser.add_argument("--pattern", default="*.txt", help="Glob pattern of candidate files (default: *.txt)")
+    args = parser.parse_args()
+
+    catalog = TreeCatalog(args.directories, args.pattern)
+    catalog.refresh()
+    entries = catalog.entries()
+    if not entries:
+        print("No candidate files found")
+        sys.exit(1)
+
+    for entry in entries:
+        if entry.valid:
+            print(f"{entry.path}: {entry.question_count} questions, {entry.result_count} results, "
+                  f"{entry.error_count} errors, parsed in {entry.parse_seconds * 1000:.1f} ms")
+        else:
+            print(f"{entry.path}: not a decision tree ({entry.error})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Tree Compactor - Merge identical results and subtrees of a decision tree.
+
+Generated trees, and many hand-written ones, repeat the same structure: the
+same result text at the end of many branches, or the same follow-up question
+with the same answers below several questions. ``compact_tree`` hash-conses
+the tree bottom-up. Each node gets a structural key made of its kind, its
+text and its answers with their (already merged) targets. Nodes with equal
+keys are merged into one, which turns the tree into a DAG with a single
+copy of every distinct subtree.
+
+Answers keep their order, so every path of answer indices leads to a node
+with the same text as before. The start node keeps its ID, and merged nodes
+keep the ID of their first occurrence in the file. Answers pointing to
+undefined nodes or included files are kept as they are. A node reached by an
+answer leading back up the path (the target of a cycle) is never merged;
+other nodes on a cycle may be.
+
+The compacted tree is written from the node arrays alone, so the layout of
+the original file (spacing, blank lines, node order and replaced definitions
+of repeated IDs) is not kept.
+
+Usage:
+    python tree_compactor.py food_safety.txt --output food_safety.compact.txt
+    python tree_compactor.py food_safety.txt --in-place
+"""
+import os
+import sys
+import argparse
+from array import array
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from decision_tree import DecisionTree, FLAG_DEFINED, FLAG_RESULT, parse_file
+
+
+class CompactionReport(NamedTuple):
+    """Size of a tree before and after compaction."""
+    nodes_before: int          # Defined nodes
+    nodes_after: int
+    results_merged: int
+    questions_merged: int
+    memory_before: int         # Estimated bytes, see DecisionTree.estimate_memory
+    memory_after: int
+
+
+def find_duplicates(tree: DecisionTree) -> array:
+    """
+    Find the node every node is merged into.
+
+    Nodes are visited in depth-first post-order, so the targets of a node are
+    merged before the node's own key is built.
+
+    Args:
+        tree: The decision tree
+
+    Returns:
+        For every node index, the index of the node that represents it
+    """
+    node_count = len(tree.node_ids)
+    flags = tree.node_flags
+    starts = tree.answer_starts
+    counts = tree.answer_counts
+    targets = tree.answer_targets
+    texts = tree.answer_texts
+
+    canonical = array('I', range(node_count))
+    seen: Dict[Tuple, int] = {}
+    # 0 = unvisited, 1 = on the current path, 2 = done
+    state = bytearray(node_count)
+    # Nodes reached by an answer leading back up the path; they stay distinct
+    pinned = bytearray(node_count)
+
+    roots = [tree.index_of(tree.start_node_id)] if tree.start_node_id is not None else []
+    roots.extend(range(node_count))
+    for root in roots:
+        if state[root] or not flags[root] & FLAG_DEFINED:
+            continue
+        stack_nodes = array('I', [root])
+        stack_answers = array('I', [starts[root]])
+        state[root] = 1
+        while stack_nodes:
+            index = stack_nodes[-1]
+            answer = stack_answers[-1]
+            if answer < starts[index] + counts[index]:
+                stack_answers[-1] = answer + 1
+                target = targets[answer]
+                if not flags[target] & FLAG_DEFINED:
+                    continue
+                if state[target] == 1:
+                    pinned[target] = 1
+                elif state[target] == 0:
+                    state[target] = 1
+                    stack_nodes.append(target)
+                    stack_answers.append(starts[target])
+                continue
+
+            state[index] = 2
+            stack_nodes.pop()
+            stack_answers.pop()
+            if pinned[index]:
+                continue
+            start = starts[index]
+            end = start + counts[index]
+            key = (flags[index], tree.node_texts[index],
+                   tuple(texts[start:end]), tuple(map(canonical.__getitem__, targets[start:end])))
+            representative = seen.setdefault(key, index)
+            if representative != index:
+                canonical[index] = representative
+
+    # Represent every group by its first node in the file
+    first: Dict[int, int] = {}
+    for index in range(node_count):
+        first.setdefault(canonical[index], index)
+    for index in range(node_count):
+        canonical[index] = first[canonical[index]]
+    return canonical
+
+
+def compact_tree(tree: DecisionTree) -> Tuple[DecisionTree, CompactionReport]:
+    """
+    Build a copy of a tree with identical results and subtrees merged.
+
+    Args:
+        tree: The decision tree; it is not changed
+
+    Returns:
+        The compacted tree and a report of the reduction
+    """
+    canonical = find_duplicates(tree)
+    start = tree.index_of(tree.start_node_id) if tree.start_node_id is not None else None
+    if start is not None and canonical[start] != start:
+        # Keep the start node's ID: make it the representative of its group
+        previous = canonical[start]
+        for index, representative in enumerate(canonical):
+            if representative == previous:
+                canonical[index] = start
+
+    flags = tree.node_flags
+    kept = [index for index in range(len(flags))
+            if canonical[index] == index and flags[index] & FLAG_DEFINED]
+    if start is not None:
+        kept.remove(start)
+        kept.insert(0, start)
+
+    compacted = DecisionTree()
+    compacted.start_node_id = tree.start_node_id
+    node_ids = tree.node_ids
+    reserve = compacted._reserve
+    intern = compacted._strings.setdefault
+    for index in kept:
+        new_index = reserve(node_ids[index])
+        start = tree.answer_starts[index]
+        end = start + tree.answer_counts[index]
+        compacted.node_texts[new_index] = tree.node_texts[index]
+        compacted.node_flags[new_index] = flags[index]
+        compacted.answer_starts[new_index] = len(compacted.answer_texts)
+        compacted.answer_counts[new_index] = end - start
+        compacted.node_lines[new_index] = tree.node_lines[index]
+        for text, target in zip(tree.answer_texts[start:end], tree.answer_targets[start:end]):
+            compacted.answer_texts.append(intern(text, text))
+            compacted.answer_targets.append(reserve(node_ids[canonical[target]]))
+            compacted.answer_lines.append(0)
+    compacted.defined_count = len(kept)
+
+    merged = [index for index in range(len(flags))
+              if canonical[index] != index and flags[index] & FLAG_DEFINED]
+    results_merged = sum(1 for index in merged if flags[index] & FLAG_RESULT)
+    report = CompactionReport(
+        tree.defined_count, compacted.defined_count,
+        results_merged, len(merged) - results_merged,
+        tree.estimate_memory(), compacted.estimate_memory(),
+    )
+    return compacted, report
+
+
+def write_tree(tree: DecisionTree, file_path: str) -> int:
+    """
+    Write a tree in the Q/A format, replacing the file atomically.
+
+    Only nodes and answers are written; the layout of the source file is not kept.
+
+    Args:
+        tree: The decision tree
+        file_path: Output file
+
+    Returns:
+        Size of the written file in bytes
+    """
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for index in range(len(tree.node_ids)):
+                if not tree.node_flags[index] & FLAG_DEFINED:
+                    continue
+                lines = [f"{tree.node_ids[index]}: {tree.node_texts[index]}"]
+                start = tree.answer_starts[index]
+                for answer in range(start, start + tree.answer_counts[index]):
+                    lines.append(f"A: {tree.answer_texts[answer]} -> {tree.node_ids[tree.answer_targets[answer]]}")
+                lines.append("\n")
+                file.write("\n".join(lines))
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return os.path.getsize(file_path)
+
+
+def main():
+    """Compact a decision tree file from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Merge identical results and subtrees of a decision tree",
+        epilog="The tree is written from its nodes and answers only; the layout of the file is not kept.")
+    parser.add_argument("file", help="Decision tree file")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--output", "-o", help="Write the compacted tree to this file")
+    output.add_argument("--in-place", action="store_true",
+                        help="Replace the file with the compacted tree, dropping its layout")
+    args = parser.parse_args()
+
+    try:
+        # Parsed rather than loaded from a compiled sidecar, whose memory is
+        # estimated differently, so that both estimates compare like with like
+        tree = parse_file(args.file)
+        compacted, report = compact_tree(tree)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+    removed = report.nodes_before - report.nodes_after
+    print(f"{report.nodes_before} nodes -> {report.nodes_after} "
+          f"({removed} merged: {report.results_merged} results, {report.questions_merged} questions)")
+    print(f"Memory: {report.memory_before / 1024:.1f} KB -> {report.memory_after / 1024:.1f} KB")
+
+    output_path: Optional[str] = args.file if args.in_place else args.output
+    if args.in_place:
+        print(f"Warning: rewriting {args.file} in place; its layout is not kept")
+    if output_path:
+        size_before = os.path.getsize(args.file)
+        size_after = write_tree(compacted, output_path)
+        print(f"File: {size_before} bytes -> {size_after} bytes "
+              f"({1 - size_after / size_before if size_before else 0:.1%} smaller), written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
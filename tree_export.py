@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Tree Export - Write a whole decision tree as a Mermaid or Graphviz (DOT) graph.
+
+generate_mermaid_diagram only draws the current path. This module exports the
+full graph for review. It walks the tree once, breadth-first from the start
+node (or from a chosen subtree root), and writes every node and answer
+straight to the output stream, so nothing but a visited bitmap and the
+traversal queue is held in memory. Nodes shared by several questions are
+written once, with an edge from each question that leads to them. Answers
+leading to an included file end at a placeholder node for that file; the
+included file is not loaded.
+
+With a depth limit, questions at the limit are drawn as truncated and their
+answers are not followed. Because the walk is breadth-first, every node is
+expanded at its shallowest depth.
+"""
+import sys
+import argparse
+from collections import deque
+from typing import Optional, TextIO, Tuple
+
+from decision_tree import DecisionTree, FLAG_DEFINED, FLAG_RESULT, _sanitize_id
+from tree_include import is_include
+
+FORMATS = ("mermaid", "dot")
+
+_MERMAID_HEADER = """graph TD
+    classDef default fill:#f9f9f9,stroke:#333,stroke-width:1px;
+    classDef current fill:#d4f4ff,stroke:#0077b6,stroke-width:2px;
+    classDef result fill:#d8f3dc,stroke:#2d6a4f,stroke-width:2px;
+    classDef truncated fill:#fff3cd,stroke:#b08900,stroke-width:1px,stroke-dasharray:4 2;
+    classDef missing fill:#f8d7da,stroke:#842029,stroke-width:1px,stroke-dasharray:4 2;
+    classDef include fill:#e7e1f5,stroke:#5a3e99,stroke-width:1px,stroke-dasharray:4 2;
+"""
+
+_DOT_HEADER = """digraph DecisionTree {
+    rankdir=TB;
+    node [shape=box, style="rounded,filled", fillcolor="#f9f9f9", color="#333333"];
+"""
+
+_DOT_STYLES = {
+    "current": ' fillcolor="#d4f4ff", color="#0077b6", penwidth=2',
+    "result": ' fillcolor="#d8f3dc", color="#2d6a4f", penwidth=2',
+    "truncated": ' fillcolor="#fff3cd", color="#b08900", style="rounded,filled,dashed"',
+    "missing": ' fillcolor="#f8d7da", color="#842029", style="rounded,filled,dashed"',
+    "include": ' fillcolor="#e7e1f5", color="#5a3e99", style="rounded,filled,dashed"',
+}
+
+
+def _mermaid_text(text: str) -> str:
+    """Make text safe inside a quoted Mermaid label."""
+    return text.replace('"', "'")
+
+
+def _dot_text(text: str) -> str:
+    """Make text safe inside a quoted DOT string."""
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def export_tree(tree: DecisionTree, stream: TextIO, fmt: str = "mermaid",
+                root_id: Optional[str] = None, max_depth: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Write a decision tree, or one of its subtrees, as a graph.
+
+    Args:
+        tree: The decision tree to export
+        stream: Text stream the graph is written to
+        fmt: Output format, ``mermaid`` or ``dot``
+        root_id: ID of the subtree root (default: the start node)
+        max_depth: Number of answer levels to follow below the root (default: all)
+
+    Returns:
+        A (node count, edge count) tuple of what was written
+
+    Raises:
+        ValueError: If the format is unknown, the tree is empty or the root is not defined
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if root_id is None:
+        root_id = tree.start_node_id
+        if root_id is None:
+            raise ValueError("Decision tree has no start node")
+    root = tree.index_of(root_id)
+    if root is None or not tree.node_flags[root] & FLAG_DEFINED:
+        raise ValueError(f"Node not found: {root_id}")
+
+    node_ids = tree.node_ids
+    node_texts = tree.node_texts
+    flags = tree.node_flags
+    starts = tree.answer_starts
+    counts = tree.answer_counts
+    targets = tree.answer_targets
+    answer_texts = tree.answer_texts
+    write = stream.write
+    mermaid = fmt == "mermaid"
+
+    def write_node(index: int, style: Optional[str]):
+        node_id = node_ids[index]
+        if flags[index] & FLAG_DEFINED:
+            text = f"{node_id}: {node_texts[index]}"
+        elif style == "include":
+            text = f"{node_id[1:]} (included file)"
+        else:
+            text = f"{node_id} (undefined)"
+        if mermaid:
+            suffix = f":::{style}" if style else ""
+            write(f'    node_{_sanitize_id(node_id)}["{_mermaid_text(text)}"]{suffix}\n')
+        else:
+            write(f'    "{_dot_text(node_id)}" [label="{_dot_text(text)}"{"," + _DOT_STYLES[style] if style else ""}];\n')
+
+    def write_edge(source: int, answer: int):
+        source_id = node_ids[source]
+        target_id = node_ids[targets[answer]]
+        if mermaid:
+            write(f'    node_{_sanitize_id(source_id)} -->|"{_mermaid_text(answer_texts[answer])}"| '
+                  f'node_{_sanitize_id(target_id)}\n')
+        else:
+            write(f'    "{_dot_text(source_id)}" -> "{_dot_text(target_id)}" '
+                  f'[label="{_dot_text(answer_texts[answer])}"];\n')
+
+    write(_MERMAID_HEADER if mermaid else _DOT_HEADER)
+
+    # 1 = written; nodes are written when first discovered and expanded when dequeued
+    visited = bytearray(len(flags))
+    visited[root] = 1
+    node_count = 1
+    edge_count = 0
+    if flags[root] & FLAG_RESULT:
+        write_node(root, "result")
+    elif max_depth is not None and max_depth <= 0 and counts[root]:
+        write_node(root, "truncated")
+    else:
+        write_node(root, "current")
+
+    queue = deque([root])
+    depth = 0
+    while queue and (max_depth is None or depth < max_depth):
+        # Process one level at a time so that the depth of each node is known
+        for _ in range(len(queue)):
+            index = queue.popleft()
+            for answer in range(starts[index], starts[index] + counts[index]):
+                target = targets[answer]
+                if not visited[target]:
+                    visited[target] = 1
+                    node_count += 1
+                    if not flags[target] & FLAG_DEFINED:
+                        style = "include" if is_include(node_ids[target]) else "missing"
+                    elif flags[target] & FLAG_RESULT:
+                        style = "result"
+                    elif max_depth is not None and depth + 1 >= max_depth and counts[target]:
+                        style = "truncated"
+                    else:
+                        style = None
+                    write_node(target, style)
+                    if flags[target] & FLAG_DEFINED and not flags[target] & FLAG_RESULT:
+                        queue.append(target)
+                write_edge(index, answer)
+                edge_count += 1
+        depth += 1
+
+    if not mermaid:
+        write("}\n")
+    return node_count, edge_count
+
+
+def main():
+    """Export decision trees from the command line."""
+    parser = argparse.ArgumentParser(description="Export a whole decision tree as a Mermaid or Graphviz graph")
+    parser.add_argument("file", help="Path to the decision tree file")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Output format (default: from the output file extension, otherwise mermaid)")
+    parser.add_argument("--output", help="Output file (default: standard output)")
+    parser.add_argument("--root", help="ID of the node to export the subtree of (default: the start node)")
+    parser.add_argument("--max-depth", type=int, help="Number of answer levels to follow below the root")
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "dot" if args.output and args.output.endswith((".dot", ".gv")) else "mermaid"
+
+    # Imported here because compiled_tree builds on decision_tree
+    from compiled_tree import load_tree
+
+    try:
+        tree = load_tree(args.file)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                nodes, edges = export_tree(tree, file, fmt, args.root, args.max_depth)
+            print(f"Exported {nodes} nodes and {edges} answers to: {args.output}")
+        else:
+            export_tree(tree, sys.stdout, fmt, args.root, args.max_depth)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Tree Includes - Subtrees kept in separate files and loaded on first visit.
+
+An answer can lead to another decision tree file instead of a node of the
+same file:
+
+    A: Keep it in the fridge -> @storage/fridge.txt
+
+The path after ``@`` is relative to the file that contains the answer. The
+included file is an ordinary decision tree; its first question (or its only
+result) takes the place of the ``@`` target. Only the top-level file is
+parsed when a tree is opened. An included file is loaded the first time
+someone selects an answer leading into it. Its nodes are then added to the
+tree, so later visits cost nothing:
+
+- the node ``@storage/fridge.txt`` becomes the included file's first node
+- its other nodes are added as ``<id>@storage/fridge.txt``, e.g. ``Q2@storage/fridge.txt``
+- ``@`` targets inside an included file may include further files
+
+Included files are loaded through the process-wide tree cache, so every tree
+and session that includes the same file shares one parsed copy. Each file is
+added to a tree at most once, under its ``@`` ID, so included files may lead
+back to files above them without being expanded again. Only a file that
+includes itself is rejected, with ValueError when the answer leading into it
+is selected. ``find_include_cycles`` lists
+the include cycles of a tree up front, for the validator.
+"""
+import os
+import threading
+from typing import Dict, List, Set
+
+from decision_tree import DecisionTree, FLAG_DEFINED, INCLUDE_PREFIX, is_valid_node_id
+
+_lock = threading.Lock()
+
+
+def is_include(node_id: str) -> bool:
+    """
+    Check whether a node ID refers to an included file.
+
+    Args:
+        node_id: The node ID
+
+    Returns:
+        True for ``@<path>`` IDs
+    """
+    return node_id.startswith(INCLUDE_PREFIX)
+
+
+def get_include_path(tree: DecisionTree, node_id: str) -> str:
+    """
+    Get the file an include ID refers to.
+
+    Args:
+        tree: The tree containing the ID
+        node_id: An ``@<path>`` ID, relative to the tree's file
+
+    Returns:
+        The normalized absolute path of the included file
+    """
+    base = os.path.dirname(tree.source_path) if tree.source_path else os.getcwd()
+    return os.path.abspath(os.path.join(base, node_id[len(INCLUDE_PREFIX):]))
+
+
+def get_included_files(tree: DecisionTree) -> Set[str]:
+    """
+    Get the files a tree's own answers include.
+
+    Args:
+        tree: The decision tree
+
+    Returns:
+        Normalized absolute paths of the included files
+    """
+    return {get_include_path(tree, tree.node_ids[tree.answer_targets[answer]])
+            for index in range(len(tree.node_ids))
+            if tree.node_flags[index] & FLAG_DEFINED and is_valid_node_id(tree.node_ids[index])
+            for answer in range(tree.answer_starts[index], tree.answer_starts[index] + tree.answer_counts[index])
+            if is_include(tree.node_ids[tree.answer_targets[answer]])}
+
+
+def find_include_cycles(tree: DecisionTree) -> List[List[str]]:
+    """
+    Find chains of included files that lead back to a file on the chain.
+
+    Included files are loaded through the tree cache; files that are missing
+    or invalid are skipped.
+
+    Args:
+        tree: The top-level decision tree
+
+    Returns:
+        One chain of absolute paths per cycle, from the top-level file to the
+        file that is included again
+    """
+    # Imported here because tree_cache builds on decision_tree
+    from tree_cache import get_shared_cache
+
+    if not tree.source_path:
+        return []
+    root = os.path.abspath(tree.source_path)
+    edges: Dict[str, List[str]] = {root: sorted(get_included_files(tree))}
+    cycles: List[List[str]] = []
+    # Depth-first search over files: the current chain and the next include of each file on it
+    chain = [root]
+    positions = [0]
+    done: Set[str] = set()
+    while chain:
+        path = chain[-1]
+        targets = edges[path]
+        if positions[-1] == len(targets):
+            done.add(path)
+            chain.pop()
+            positions.pop()
+            continue
+        target = targets[positions[-1]]
+        positions[-1] += 1
+        if target in chain:
+            cycles.append(chain + [target])
+        elif target not in done:
+            if target not in edges:
+                try:
+                    edges[target] = sorted(get_included_files(get_shared_cache().get(target)))
+                except (OSError, ValueError):
+                    edges[target] = []
+            chain.append(target)
+            positions.append(0)
+    return cycles
+
+
+def resolve_include(tree: DecisionTree, index: int):
+    """
+    Load the file behind an include node and add its nodes to the tree.
+
+    Safe to call from several threads; the file is added once.
+
+    Args:
+        tree: The tree containing the include node
+        index: Node index of an undefined ``@<path>`` node
+
+    Raises:
+        FileNotFoundError: If the included file doesn't exist
+        ValueError: If the included file is invalid, has no nodes, or
+            includes itself
+    """
+    # Imported here because tree_cache builds on decision_tree
+    from tree_cache import get_shared_cache
+
+    include_id = tree.node_ids[index]
+    path = get_include_path(tree, include_id)
+    try:
+        fragment = get_shared_cache().get(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Included file not found: {path}") from None
+    except ValueError as e:
+        raise ValueError(f"Invalid included file {path}: {str(e)}") from None
+
+    # Only the fragment's own nodes are copied, in case it was navigated
+    # directly and has had files included into it
+    node_count = len(fragment.node_ids)
+    own = [i for i in range(node_count)
+           if fragment.node_flags[i] & FLAG_DEFINED and is_valid_node_id(fragment.node_ids[i])]
+    if not own:
+        raise ValueError(f"Included file has no nodes: {path}")
+    source = os.path.abspath(tree.source_path) if tree.source_path else None
+    if path in get_included_files(fragment) or (path == source and path in get_included_files(tree)):
+        # The file would be expanded inside itself; a node ID should be used instead
+        raise ValueError(f"Included file includes itself: {path}")
+    entry = fragment.index_of(fragment.start_node_id) if fragment.start_node_id is not None else own[0]
+    root = os.path.dirname(tree.source_path) if tree.source_path else os.getcwd()
+
+    def map_id(i: int) -> str:
+        node_id = fragment.node_ids[i]
+        if i == entry:
+            return include_id
+        if is_include(node_id):
+            # Make the path relative to the top-level file
+            target = get_include_path(fragment, node_id)
+            return INCLUDE_PREFIX + os.path.relpath(target, root).replace(os.sep, "/")
+        return f"{node_id}{include_id}"
+
+    with _lock:
+        if tree.node_flags[index] & FLAG_DEFINED:
+            return
+
+        # Add the answers and placeholders first and the entry node last, so
+        # that other threads only see the entry once everything behind it exists
+        intern = tree._strings.setdefault
+        for i in sorted(own, key=lambda i: i == entry):
+            target_index = tree._reserve(map_id(i)) if i != entry else index
+            start = len(tree.answer_texts)
+            for answer in range(fragment.answer_starts[i], fragment.answer_starts[i] + fragment.answer_counts[i]):
+                text = fragment.answer_texts[answer]
+                tree.answer_texts.append(intern(text, text))
+                tree.answer_targets.append(tree._reserve(map_id(fragment.answer_targets[answer])))
+                tree.answer_lines.append(0)
+            tree.node_texts[target_index] = fragment.node_texts[i]
+            tree.answer_starts[target_index] = start
+            tree.answer_counts[target_index] = fragment.answer_counts[i]
+            tree.node_lines[target_index] = 0
+            tree.node_flags[target_index] = fragment.node_flags[i]
+        tree.defined_count += len(own)
+        # The tree may be shared through the cache, whose memory budget must see it grow
+        get_shared_cache().update_size(tree)
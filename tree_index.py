@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Reachability Index - Answer "how does someone end up at this result?" without brute force.
+
+The index is built once per tree in O(nodes + edges) plus the size of the
+reachability sets:
+
+- a reverse-edge table listing the answers that lead into every node
+- a topological order of the nodes reachable from the start node
+- the number of distinct start-to-node paths for every node, by dynamic
+  programming over that order, so paths are counted without enumerating them
+- for every node, the set of results reachable from it, stored as a bitmap
+  over result numbers so that a reachability query is a single byte lookup
+
+Paths are enumerated lazily by walking the reverse edges backwards from a
+result. Only predecessors that are themselves reachable from the start node
+are followed, so the walk never explores a dead end.
+
+The index requires the part of the tree reachable from the start node to be
+acyclic; use ``decision_tree.py --check`` to find cycles.
+"""
+import sys
+import argparse
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from decision_tree import DecisionTree, FLAG_DEFINED, FLAG_RESULT
+
+# A path as (node_id, answer_text) steps; the first step has no answer
+Path = List[Tuple[str, Optional[str]]]
+
+
+class ReachabilityIndex:
+    """Reverse-edge and path-count index over a decision tree."""
+
+    def __init__(self, tree: DecisionTree):
+        """
+        Build the index.
+
+        Args:
+            tree: The decision tree to index
+
+        Raises:
+            ValueError: If the tree has no start node or contains a reachable cycle
+        """
+        if tree.start_node_id is None:
+            raise ValueError("Decision tree has no start node")
+
+        self.tree = tree
+        self.root = tree.index_of(tree.start_node_id)
+        flags = tree.node_flags
+        starts = tree.answer_starts
+        counts = tree.answer_counts
+        targets = tree.answer_targets
+        node_count = len(flags)
+
+        # Source node of every live answer, and the reverse-edge table in CSR form
+        self.answer_sources = array('i', [-1]) * len(targets)
+        in_degree = array('I', [0]) * (node_count + 1)
+        for index in range(node_count):
+            if flags[index] & FLAG_DEFINED:
+                for answer in range(starts[index], starts[index] + counts[index]):
+                    self.answer_sources[answer] = index
+                    in_degree[targets[answer] + 1] += 1
+        for index in range(node_count):
+            in_degree[index + 1] += in_degree[index]
+        self.reverse_starts = in_degree
+        self.reverse_answers = array('I', [0]) * in_degree[node_count]
+        fill = array('I', in_degree[:node_count])
+        for answer, source in enumerate(self.answer_sources):
+            if source >= 0:
+                target = targets[answer]
+                self.reverse_answers[fill[target]] = answer
+                fill[target] += 1
+
+        # Topological order of the nodes reachable from the start node (DFS post-order, reversed)
+        order = self._topological_order()
+
+        # Path counts from the start node
+        self.path_counts = [0] * node_count
+        self.path_counts[self.root] = 1
+        for index in order:
+            paths = self.path_counts[index]
+            for answer in range(starts[index], starts[index] + counts[index]):
+                target = targets[answer]
+                if flags[target] & FLAG_DEFINED:
+                    self.path_counts[target] += paths
+
+        # Number the results in topological (reverse DFS postorder) order. In a
+        # pure tree the nodes below a node then follow it without gaps, so its
+        # results are contiguous and the bitmaps stay small
+        self.result_numbers: Dict[int, int] = {}
+        for index in order:
+            if flags[index] & FLAG_RESULT:
+                self.result_numbers[index] = len(self.result_numbers)
+        self.results = array('I', sorted(self.result_numbers, key=self.result_numbers.__getitem__))
+
+        # Reachable results of every node as (lowest result number, bitmask relative to it).
+        # Masks are kept relative so their size follows the span of results below the node.
+        masks: Dict[int, Tuple[int, int]] = {}
+        self._reach: Dict[int, Tuple[int, bytes]] = {}
+        for index in reversed(order):
+            if flags[index] & FLAG_RESULT:
+                low, mask = self.result_numbers[index], 1
+            else:
+                low, mask = 0, 0
+                for answer in range(starts[index], starts[index] + counts[index]):
+                    child = masks.get(targets[answer])
+                    if child is None or not child[1]:
+                        continue
+                    child_low, child_mask = child
+                    if not mask:
+                        low, mask = child_low, child_mask
+                    elif child_low >= low:
+                        mask |= child_mask << (child_low - low)
+                    else:
+                        low, mask = child_low, child_mask | (mask << (low - child_low))
+            masks[index] = (low, mask)
+            self._reach[index] = (low, mask.to_bytes((mask.bit_length() + 7) // 8, "little"))
+
+    def _topological_order(self) -> List[int]:
+        """Order the nodes reachable from the start node so that every answer points forward."""
+        tree = self.tree
+        flags = tree.node_flags
+        starts = tree.answer_starts
+        counts = tree.answer_counts
+        targets = tree.answer_targets
+
+        state = bytearray(len(flags))
+        postorder = []
+        stack_nodes = [self.root]
+        stack_answers = [starts[self.root]]
+        state[self.root] = 1
+        while stack_nodes:
+            index = stack_nodes[-1]
+            answer = stack_answers[-1]
+            if answer < starts[index] + counts[index]:
+                stack_answers[-1] = answer + 1
+                target = targets[answer]
+                if not flags[target] & FLAG_DEFINED:
+                    continue
+                if state[target] == 1:
+                    raise ValueError(
+                        f"Decision tree contains a cycle: {tree.node_ids[index]} -> {tree.node_ids[target]}")
+                if state[target] == 0:
+                    state[target] = 1
+                    stack_nodes.append(target)
+                    stack_answers.append(starts[target])
+            else:
+                state[index] = 2
+                postorder.append(index)
+                stack_nodes.pop()
+                stack_answers.pop()
+
+        postorder.reverse()
+        return postorder
+
+    def _require_index(self, node_id: str) -> int:
+        """Get the node index of a defined node ID."""
+        index = self.tree.index_of(node_id)
+        if index is None or not self.tree.node_flags[index] & FLAG_DEFINED:
+            raise ValueError(f"Node not found: {node_id}")
+        return index
+
+    def count_paths(self, node_id: str) -> int:
+        """
+        Count the distinct paths from the start node to a node.
+
+        Args:
+            node_id: ID of the target node
+
+        Returns:
+            Number of paths, 0 if the node is unreachable
+        """
+        return self.path_counts[self._require_index(node_id)]
+
+    def count_paths_per_result(self) -> Dict[str, int]:
+        """
+        Count the paths leading to every reachable result.
+
+        Returns:
+            Dictionary of result ID to number of paths
+        """
+        node_ids = self.tree.node_ids
+        return {node_ids[index]: self.path_counts[index] for index in self.results}
+
+    def is_reachable(self, node_id: str, result_id: str) -> bool:
+        """
+        Check whether a result can still be reached from a node.
+
+        Args:
+            node_id: ID of the current node
+            result_id: ID of the result
+
+        Returns:
+            True if some sequence of answers leads from the node to the result
+        """
+        reach = self._reach.get(self._require_index(node_id))
+        number = self.result_numbers.get(self._require_index(result_id))
+        if reach is None or number is None:
+            return False
+        low, bitmap = reach
+        offset = number - low
+        if offset < 0 or offset >= len(bitmap) * 8:
+            return False
+        return bool(bitmap[offset >> 3] >> (offset & 7) & 1)
+
+    def reachable_results(self, node_id: str) -> List[str]:
+        """
+        List the results that can be reached from a node.
+
+        Args:
+            node_id: ID of the node
+
+        Returns:
+            Result IDs in result-number order
+        """
+        reach = self._reach.get(self._require_index(node_id))
+        if reach is None:
+            return []
+        low, bitmap = reach
+        mask = int.from_bytes(bitmap, "little")
+        node_ids = self.tree.node_ids
+        results = []
+        while mask:
+            bit = (mask & -mask).bit_length() - 1
+            results.append(node_ids[self.results[low + bit]])
+            mask &= mask - 1
+        return results
+
+    def iter_paths(self, node_id: str) -> Iterator[Path]:
+        """
+        Lazily enumerate the paths from the start node to a node.
+
+        Args:
+            node_id: ID of the target node
+
+        Yields:
+            Each path as a list of (node_id, answer_text) steps, starting at the start node
+        """
+        tree = self.tree
+        target = self._require_index(node_id)
+        if not self.path_counts[target]:
+            return
+
+        reverse_starts = self.reverse_starts
+        reverse_answers = self.reverse_answers
+        sources = self.answer_sources
+        path_counts = self.path_counts
+
+        # Backward DFS: answers[i] is the answer chosen to enter nodes[i]
+        nodes = [target]
+        answers: List[int] = []
+        cursors = [reverse_starts[target]]
+        while nodes:
+            index = nodes[-1]
+            if index == self.root:
+                steps = [(tree.node_ids[self.root], None)]
+                for depth in range(len(answers) - 1, -1, -1):
+                    steps.append((tree.node_ids[nodes[depth]], tree.answer_texts[answers[depth]]))
+                yield steps
+            else:
+                cursor = cursors[-1]
+                while cursor < reverse_starts[index + 1]:
+                    answer = reverse_answers[cursor]
+                    cursor += 1
+                    source = sources[answer]
+                    if source >= 0 and path_counts[source]:
+                        cursors[-1] = cursor
+                        answers.append(answer)
+                        nodes.append(source)
+                        cursors.append(reverse_starts[source])
+                        break
+                else:
+                    cursors[-1] = cursor
+                    self._pop(nodes, answers, cursors)
+                continue
+            self._pop(nodes, answers, cursors)
+
+    @staticmethod
+    def _pop(nodes: List[int], answers: List[int], cursors: List[int]):
+        """Pop one step of the backward DFS."""
+        nodes.pop()
+        cursors.pop()
+        if answers:
+            answers.pop()
+
+
+def format_path(path: Path) -> str:
+    """
+    Format a path for display.
+
+    Args:
+        path: List of (node_id, answer_text) steps
+
+    Returns:
+        A one-line description such as ``Q1 --[Yes]--> Q2 --[No]--> R3``
+    """
+    parts = [path[0][0]]
+    for node_id, answer_text in path[1:]:
+        parts.append(f"--[{answer_text}]--> {node_id}")
+    return " ".join(parts)
+
+
+def print_paths(tree: DecisionTree, node_id: str, limit: Optional[int] = None):
+    """
+    Print the number of paths to a node and list them.
+
+    Args:
+        tree: The decision tree
+        node_id: ID of the target node
+        limit: Maximum number of paths to list
+
+    Raises:
+        ValueError: If the node is unknown or the tree has a reachable cycle
+    """
+    index = ReachabilityIndex(tree)
+    total = index.count_paths(node_id)
+    print(f"{total} path(s) lead to {node_id}")
+    for count, path in enumerate(index.iter_paths(node_id)):
+        if limit is not None and count >= limit:
+            print(f"... {total - limit} more")
+            break
+        print(f"  {format_path(path)}")
+
+
+def main():
+    """Query paths to results from the command line."""
+    parser = argparse.ArgumentParser(description="Find the answer paths that lead to a result")
+    parser.add_argument("file", help="Path to the decision tree file")
+    parser.add_argument("node", nargs="?", help="Result (or question) ID to find paths to")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of paths to list (default: 20)")
+    parser.add_argument("--counts", action="store_true", help="Print the number of paths to every result")
+    args = parser.parse_args()
+
+    # Imported here because compiled_tree builds on decision_tree
+    from compiled_tree import load_tree
+
+    try:
+        tree = load_tree(args.file)
+        if args.counts or not args.node:
+            counts = ReachabilityIndex(tree).count_paths_per_result()
+            for result_id, count in sorted(counts.items(), key=lambda item: -item[1]):
+                print(f"{result_id}: {count}")
+        else:
+            print_paths(tree, args.node, args.limit)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Tree Validator - Structural checks for decision tree files.
+
+parse_file only checks that every line is well formed. This module checks the
+structure of the parsed tree in a single O(nodes + edges) pass and reports
+every problem at once, with source line numbers:
+
+Errors (the navigator can get stuck or fail on them):
+- answers pointing to a node that is never defined, or to an included file
+  that does not exist (included files are only loaded to follow their includes)
+- questions without any answers
+- cycles, i.e. answers leading back to a question already on the path
+- files that include themselves
+
+Warnings:
+- questions and results that cannot be reached from the start node
+- node IDs defined more than once (the last definition wins)
+- include cycles, i.e. included files leading back to a file already on the path
+"""
+import os
+import sys
+import glob
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from decision_tree import DecisionTree, FLAG_DEFINED, FLAG_RESULT
+from tree_include import is_include, get_include_path, find_include_cycles
+
+ERROR = "error"
+WARNING = "warning"
+
+
+class ValidationIssue(NamedTuple):
+    """A single problem found in a decision tree."""
+    severity: str   # ERROR or WARNING
+    line: int       # Source line number, 0 if unknown
+    node_id: str
+    message: str
+
+    def __str__(self) -> str:
+        if self.line:
+            return f"line {self.line}: {self.severity}: {self.message}"
+        return f"{self.severity}: {self.message}"
+
+
+def validate_tree(tree: DecisionTree) -> List[ValidationIssue]:
+    """
+    Check a decision tree for structural problems.
+
+    Args:
+        tree: The decision tree to check
+
+    Returns:
+        All issues found, sorted by line number
+    """
+    issues: List[ValidationIssue] = []
+    node_ids = tree.node_ids
+    flags = tree.node_flags
+    starts = tree.answer_starts
+    counts = tree.answer_counts
+    targets = tree.answer_targets
+    node_lines = tree.node_lines
+    answer_lines = tree.answer_lines
+    node_count = len(flags)
+
+    for node_id, previous_line, line in tree.duplicates:
+        issues.append(ValidationIssue(
+            WARNING, line, node_id,
+            f"Node {node_id} is already defined at line {previous_line}; this definition replaces it"))
+
+    # Answer leading to each included file, for locating include cycles
+    include_answers = {}
+
+    # Dangling answers and questions without answers: one scan over all nodes and edges
+    for index in range(node_count):
+        node_flags = flags[index]
+        if not node_flags & FLAG_DEFINED:
+            continue
+        if node_flags & FLAG_RESULT:
+            continue
+        if not counts[index]:
+            issues.append(ValidationIssue(
+                ERROR, node_lines[index], node_ids[index],
+                f"Question {node_ids[index]} has no answers"))
+        start = starts[index]
+        for answer in range(start, start + counts[index]):
+            target = targets[answer]
+            if not flags[target] & FLAG_DEFINED:
+                if is_include(node_ids[target]):
+                    include_path = get_include_path(tree, node_ids[target])
+                    if os.path.isfile(include_path):
+                        include_answers.setdefault(include_path, (answer, index))
+                        continue
+                    message = f"missing included file {node_ids[target][1:]}"
+                else:
+                    message = f"undefined node {node_ids[target]}"
+                issues.append(ValidationIssue(
+                    ERROR, answer_lines[answer], node_ids[index],
+                    f"Answer '{tree.answer_texts[answer]}' of {node_ids[index]} points to {message}"))
+
+    if include_answers:
+        base = os.path.dirname(os.path.abspath(tree.source_path)) if tree.source_path else os.getcwd()
+        for chain in find_include_cycles(tree):
+            answer, index = include_answers[chain[1]]
+            names = " -> ".join(os.path.relpath(path, base) for path in chain)
+            if chain[-1] == chain[-2]:
+                issues.append(ValidationIssue(
+                    ERROR, answer_lines[answer], node_ids[index],
+                    f"File {os.path.relpath(chain[-1], base)} includes itself: {names}"))
+            else:
+                issues.append(ValidationIssue(
+                    WARNING, answer_lines[answer], node_ids[index],
+                    f"Include cycle: {names}"))
+
+    if tree.start_node_id is None:
+        issues.append(ValidationIssue(ERROR, 0, "", "Decision tree has no questions"))
+        return sorted(issues, key=lambda issue: issue.line)
+
+    # Depth-first search from the start node: 0 = unvisited, 1 = on the current path, 2 = done
+    state = bytearray(node_count)
+    root = tree.index_of(tree.start_node_id)
+    stack_nodes = array('I', [root])
+    stack_answers = array('I', [starts[root]])
+    state[root] = 1
+
+    while stack_nodes:
+        index = stack_nodes[-1]
+        answer = stack_answers[-1]
+        if answer < starts[index] + counts[index]:
+            stack_answers[-1] = answer + 1
+            target = targets[answer]
+            if not flags[target] & FLAG_DEFINED:
+                continue
+            if state[target] == 1:
+                issues.append(ValidationIssue(
+                    ERROR, answer_lines[answer], node_ids[index],
+                    f"Answer '{tree.answer_texts[answer]}' of {node_ids[index]} leads back to "
+                    f"{node_ids[target]}, creating a cycle"))
+            elif state[target] == 0:
+                state[target] = 1
+                stack_nodes.append(target)
+                stack_answers.append(starts[target])
+        else:
+            state[index] = 2
+            stack_nodes.pop()
+            stack_answers.pop()
+
+    for index in range(node_count):
+        if flags[index] & FLAG_DEFINED and not state[index]:
+            kind = "Result" if flags[index] & FLAG_RESULT else "Question"
+            issues.append(ValidationIssue(
+                WARNING, node_lines[index], node_ids[index],
+                f"{kind} {node_ids[index]} cannot be reached from the start node {tree.start_node_id}"))
+
+    return sorted(issues, key=lambda issue: issue.line)
+
+
+def check_file(file_path: str) -> Tuple[str, List[ValidationIssue]]:
+    """
+    Parse and validate one decision tree file.
+
+    Format errors reported by the parser are returned as a single error issue.
+
+    Args:
+        file_path: Path to the decision tree file
+
+    Returns:
+        A (file_path, issues) tuple
+    """
+    # Imported here so that worker processes only load what they need
+    from compiled_tree import load_tree
+
+    try:
+        tree = load_tree(file_path)
+    except (OSError, ValueError) as e:
+        return file_path, [ValidationIssue(ERROR, getattr(e, "line_num", 0), "", str(e))]
+    return file_path, validate_tree(tree)
+
+
+def collect_files(paths: List[str]) -> List[str]:
+    """
+    Expand directories into the decision tree files they contain.
+
+    Args:
+        paths: File and directory paths
+
+    Returns:
+        File paths, with each directory replaced by its ``*.txt`` files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.txt"))))
+        else:
+            files.append(path)
+    return files
+
+
+def check_files(paths: List[str], jobs: Optional[int] = None) -> int:
+    """
+    Validate files and directories, printing a report for each file.
+
+    Several files are checked in parallel worker processes.
+
+    Args:
+        paths: File and directory paths
+        jobs: Number of worker processes (default: number of CPUs)
+
+    Returns:
+        Number of files with errors
+    """
+    files = collect_files(paths)
+    failed = 0
+
+    if len(files) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(check_file, files))
+    else:
+        results = [check_file(file_path) for file_path in files]
+
+    for file_path, issues in results:
+        errors = sum(1 for issue in issues if issue.severity == ERROR)
+        warnings = len(issues) - errors
+        status = "FAILED" if errors else "OK"
+        print(f"{file_path}: {status} ({errors} errors, {warnings} warnings)")
+        for issue in issues:
+            print(f"  {issue}")
+        if errors:
+            failed += 1
+
+    return failed
+
+
+def main():
+    """Validate decision tree files from the command line."""
+    parser = argparse.ArgumentParser(description="Check decision tree files for structural problems")
+    parser.add_argument("paths", nargs="+", help="Decision tree files or directories of *.txt files")
+    parser.add_argument("--jobs", type=int, help="Number of parallel worker processes")
+    args = parser.parse_args()
+    sys.exit(1 if check_files(args.paths, args.jobs) else 0)
+
+
+if __name__ == "__main__":
+    main()